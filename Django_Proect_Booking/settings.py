@@ -55,7 +55,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'rente.middleware.JWTAuthenticationMiddleware'
+    'rente.middleware.InstrumentationMiddleware',
+    'rente.middleware.JWTAuthenticationMiddleware',
+    'rente.middleware.PrimaryStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'Django_Proect_Booking.urls'
@@ -67,7 +69,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rente.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated'
@@ -75,6 +77,50 @@ REST_FRAMEWORK = {
 }
 
 
+# Списки через values() без ModelSerializer на каждую строку (rente.fast_serializers)
+FAST_LIST_SERIALIZERS = env.bool('FAST_LIST_SERIALIZERS', default=True)
+
+# Метрики запросов по маршрутам (rente.metrics), /api/admin/metrics/ в формате Prometheus.
+# SLOW_REQUEST_MS > 0 — запросы дольше порога пишутся в лог со списком SQL
+INSTRUMENTATION = {
+    'ENABLED': env.bool('INSTRUMENTATION_ENABLED', default=True),
+    'SLOW_REQUEST_MS': env.int('SLOW_REQUEST_MS', default=0),
+}
+
+# Буферизованная запись просмотров объявлений (rente.buffers)
+VIEW_COUNTER = {
+    'BATCH_SIZE': env.int('VIEW_COUNTER_BATCH_SIZE', default=500),
+    'FLUSH_INTERVAL_MS': env.int('VIEW_COUNTER_FLUSH_INTERVAL_MS', default=1000),
+}
+
+# Буферизованная запись истории поиска
+SEARCH_LOG = {
+    'BATCH_SIZE': env.int('SEARCH_LOG_BATCH_SIZE', default=500),
+    'FLUSH_INTERVAL_MS': env.int('SEARCH_LOG_FLUSH_INTERVAL_MS', default=1000),
+    'DEDUPE_SECONDS': env.int('SEARCH_LOG_DEDUPE_SECONDS', default=300),
+}
+
+# Кэш ответов списка и карточки объявлений (rente.cache).
+# BACKEND: 'locmem' — LRU в памяти процесса, 'django' — CACHES[CACHE_ALIAS].
+# С 'locmem' изменение сбрасывает кэш только в своём процессе: остальные
+# воркеры отдают старые ответы до TIMEOUT секунд. При нескольких воркерах
+# нужен 'django' с общим кэшем (Redis, Memcached).
+LISTING_RESPONSE_CACHE = {
+    'ENABLED': env.bool('LISTING_CACHE_ENABLED', default=True),
+    'BACKEND': env.str('LISTING_CACHE_BACKEND', default='locmem'),
+    'CACHE_ALIAS': env.str('LISTING_CACHE_ALIAS', default='default'),
+    'TIMEOUT': env.int('LISTING_CACHE_TIMEOUT', default=60),
+    'MAX_ENTRIES': env.int('LISTING_CACHE_MAX_ENTRIES', default=1024),
+}
+
+# Единый выпуск access-токена при параллельных обновлениях (rente.tokens).
+# BACKEND: 'locmem' — внутри процесса, 'django' — через CACHES[CACHE_ALIAS]
+JWT_REFRESH_COALESCING = {
+    'BACKEND': env.str('JWT_REFRESH_BACKEND', default='locmem'),
+    'CACHE_ALIAS': env.str('JWT_REFRESH_CACHE_ALIAS', default='default'),
+    'WINDOW': env.int('JWT_REFRESH_WINDOW', default=10),
+}
+
 
 TEMPLATES = [
     {
@@ -99,6 +145,9 @@ WSGI_APPLICATION = 'Django_Proect_Booking.wsgi.application'
 
 MYSQL = env.bool('MYSQL', default=False)
 
+# Постоянные соединения: соединение живёт DB_CONN_MAX_AGE секунд и переиспользуется
+# запросами потока, CONN_HEALTH_CHECKS проверяет его перед повторным использованием.
+# Под ASGI оставьте 0: там у каждого запроса свой поток и соединение.
 if MYSQL:
     DATABASES = {
         'default': {
@@ -106,9 +155,14 @@ if MYSQL:
             'NAME': env('MYSQL_DB'),
             'USER': env('MYSQL_USER'),
             'PASSWORD': env('MYSQL_PASSWORD'),
-            'HOST': 'localhost',
-            'PORT': 3306,
-            'OPTIONS': {'init_command': 'SET sql_mode="STRICT_TRANS_TABLES"'},
+            'HOST': env.str('MYSQL_HOST', default='localhost'),
+            'PORT': env.int('MYSQL_PORT', default=3306),
+            'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+            'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=True),
+            'OPTIONS': {
+                'init_command': 'SET sql_mode="STRICT_TRANS_TABLES"',
+                'connect_timeout': env.int('MYSQL_CONNECT_TIMEOUT', default=5),
+            },
         }
     }
 else:
@@ -116,9 +170,55 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=0),
+            'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=False),
+            # Файловая тестовая БД: в in-memory SQLite параллельные соединения
+            # получают "table is locked" вместо ожидания блокировки
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 
+    # Профиль SQLite для работы под нагрузкой: WAL (чтение не ждёт запись),
+    # synchronous=NORMAL, ожидание блокировки вместо "database is locked",
+    # mmap. PRAGMA выполняются при каждом новом соединении.
+    SQLITE_PRODUCTION_OPTIONS = {
+        'init_command': ';'.join([
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            f"PRAGMA busy_timeout={env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000)}",
+            f"PRAGMA mmap_size={env.int('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024)}",
+            f"PRAGMA cache_size=-{env.int('SQLITE_CACHE_SIZE_KB', default=20000)}",
+        ]),
+        # Транзакция сразу берёт блокировку записи, без deadlock при повышении
+        'transaction_mode': 'IMMEDIATE',
+    }
+    if env.bool('SQLITE_PRODUCTION', default=False):
+        DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+
+
+# Реплики для чтения (rente.replicas): DB_REPLICAS — хосты MySQL или файлы SQLite.
+# Чтение объявлений, отзывов и истории идёт на реплики, запись и чтение
+# в течение DB_REPLICA_STICKY_SECONDS после записи пользователя — на default.
+READ_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': env.int('DB_REPLICA_STICKY_SECONDS', default=5),
+    'COOKIE_NAME': 'use_primary',
+}
+for number, replica in enumerate(env.list('DB_REPLICAS', default=[]), start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        **({'HOST': replica} if MYSQL else {'NAME': replica}),
+        # В тестах реплика — та же тестовая БД
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICAS['ALIASES'].append(alias)
+
+DATABASE_ROUTERS = ['rente.replicas.ReplicaRouter']
+
+# Добавляет тестовую БД реплики (ReplicaRoutingTests)
+TEST_RUNNER = 'Django_Proect_Booking.test_runner.TestRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
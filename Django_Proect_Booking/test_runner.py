@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def replica_test_name(database):
+    """Имя тестовой БД реплики рядом с тестовой БД default."""
+    name = database["TEST"].get("NAME")
+    if name is None:
+        # SQLite без TEST NAME создаёт отдельную БД в памяти для каждого алиаса
+        return None if database["ENGINE"].endswith("sqlite3") else f"test_{database['NAME']}_replica"
+    if database["ENGINE"].endswith("sqlite3"):
+        path = Path(name)
+        return path.with_name(f"{path.stem}_replica{path.suffix}")
+    return f"{name}_replica"
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Буферы rente.buffers пишут синхронно, без фоновых потоков: тест,
+    которому нужен буфер, задаёт VIEW_COUNTER / SEARCH_LOG целиком.
+
+    Добавляет алиас replica для ReplicaRoutingTests: отдельная тестовая БД,
+    в которую записи primary не реплицируются (реплика с бесконечным
+    отставанием). В READ_REPLICAS['ALIASES'] не входит, тест включает её
+    через override_settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._buffers = override_settings(**{
+            name: {**getattr(settings, name, {}), "BACKGROUND": False} for name in ("VIEW_COUNTER", "SEARCH_LOG")
+        })
+        self._buffers.enable()
+        default = connections.settings["default"]
+        connections.settings.setdefault("replica", {
+            **default,
+            "TEST": {**default["TEST"], "NAME": replica_test_name(default)},
+        })
+
+    def teardown_test_environment(self, **kwargs):
+        self._buffers.disable()
+        super().teardown_test_environment(**kwargs)
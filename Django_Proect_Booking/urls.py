@@ -18,6 +18,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested.routers import NestedSimpleRouter
 
+from rente import async_views
 from rente.views import (
     RegisterViewSet,
     UserViewSet,
@@ -25,7 +26,7 @@ from rente.views import (
     BookingViewSet,
     ReviewViewSet,
     ViewHistoryViewSet,
-    SearchHistoryViewSet, LogInAPIView, LogOutAPIView
+    SearchHistoryViewSet, LogInAPIView, LogOutAPIView, MetricsAPIView
 )
 
 from rest_framework_simplejwt.views import (
@@ -55,8 +56,19 @@ urlpatterns = [
 
 ]
 
+# Асинхронные представления для чтения (под ASGI)
+urlpatterns += [
+    path('api/async/listings/', async_views.listing_list, name='async-listing-list'),
+    path('api/async/listings/<int:pk>/', async_views.listing_detail, name='async-listing-detail'),
+    path('api/async/listings/<int:pk>/availability/', async_views.listing_availability,
+         name='async-listing-availability'),
+    path('api/async/views/', async_views.view_history, name='async-views'),
+    path('api/async/searches/', async_views.search_history, name='async-searches'),
+]
+
 urlpatterns += [
     path('api/login/', LogInAPIView.as_view(), name='token_obtain_pair'),      # login
     path('api/logout/', LogOutAPIView.as_view(), name='token_refresh'),     # refresh token
+    path('api/admin/metrics/', MetricsAPIView.as_view(), name='metrics'),
 
 ]
\ No newline at end of file
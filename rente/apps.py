@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class RenteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rente'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import install
+        install()
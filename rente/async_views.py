@@ -0,0 +1,119 @@
+"""
+Асинхронные представления для чтения (ASGI): список и карточка объявления,
+календарь занятости, история просмотров и поиска.
+
+DRF не поддерживает async-представления, поэтому это обычные async-представления
+Django с теми же фильтрами, пагинацией и сериализаторами, что и у viewset'ов.
+Запросы к БД выполняются через async ORM (acount, aiterator, afirst), и один
+процесс под uvicorn обслуживает много одновременных медленных чтений.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from .authentication import CachedJWTAuthentication
+from .availability import aoccupancy_calendar
+from .buffers import search_log
+from .filters import filter_listings, calendar_period
+from .models import Listing, ViewHistory, SearchHistory
+from .pagination import KeysetPagination, ListingPagination
+from .replicas import can_read_from_replica, use_replicas
+from .serializers import ListingSerializer, ViewHistorySerializer, SearchHistorySerializer
+
+authentication = CachedJWTAuthentication()
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, safe=False, encoder=JSONEncoder, json_dumps_params={"ensure_ascii": False}
+    )
+
+
+async def authenticate(request):
+    """Пользователь по JWT (cookie или заголовок), иначе по сессии."""
+    result = await authentication.aauthenticate(request)
+    if result is not None:
+        return result[0]
+    return await request.auser()
+
+
+def async_api_view(view):
+    """Только GET, только для авторизованных; APIException превращается в ответ как в DRF."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            if request.method != "GET":
+                raise exceptions.MethodNotAllowed(request.method)
+            request.user = await authenticate(request)
+            if not request.user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+            if not can_read_from_replica(request):
+                return await view(request, *args, **kwargs)
+            with use_replicas():
+                return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            return json_response(detail, status=exc.status_code)
+
+    return wrapper
+
+
+async def paginated_response(pagination, queryset, request, serializer_class):
+    # Пагинатору нужны query_params и build_absolute_uri из Request DRF
+    rows = await pagination.apaginate_queryset(queryset, Request(request))
+    return json_response(pagination.get_paginated_data(serializer_class(rows, many=True).data))
+
+
+def active_listings():
+    return Listing.objects.filter(is_active=True).select_related("owner")
+
+
+async def get_listing(pk):
+    listing = await active_listings().filter(pk=pk).afirst()
+    if listing is None:
+        raise exceptions.NotFound()
+    return listing
+
+
+@async_api_view
+async def listing_list(request):
+    q = request.GET.get("q")
+    if q:
+        await search_log.aput((request.user.pk, q))
+    queryset = filter_listings(active_listings(), request.GET)
+    return await paginated_response(ListingPagination(), queryset, request, ListingSerializer)
+
+
+@async_api_view
+async def listing_detail(request, pk):
+    return json_response(ListingSerializer(await get_listing(pk)).data)
+
+
+@async_api_view
+async def listing_availability(request, pk):
+    listing = await get_listing(pk)
+    start_date, end_date = calendar_period(request.GET)
+    free, occupied = await aoccupancy_calendar(listing.pk, start_date, end_date)
+    return json_response({
+        "listing": listing.pk,
+        "from": start_date,
+        "to": end_date,
+        "free": free,
+        "occupied": occupied,
+    })
+
+
+@async_api_view
+async def view_history(request):
+    queryset = ViewHistory.objects.filter(user=request.user).order_by("-viewed_at", "-id")
+    return await paginated_response(KeysetPagination(), queryset, request, ViewHistorySerializer)
+
+
+@async_api_view
+async def search_history(request):
+    queryset = SearchHistory.objects.filter(user=request.user).order_by("-searched_at", "-id")
+    return await paginated_response(KeysetPagination(), queryset, request, SearchHistorySerializer)
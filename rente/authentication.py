@@ -0,0 +1,90 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import LRUCache
+from .models import User
+from .tokens import TOKEN_USER_CLAIMS
+
+USER_CLAIM_FIELDS = ("id", "username", "email", "role", "is_staff", "is_superuser", "is_active")
+
+# Проверенный токен (jti) -> поля пользователя, до истечения токена
+token_user_cache = LRUCache(getattr(settings, "JWT_USER_CACHE_SIZE", 10_000))
+
+
+def user_from_claims(claims):
+    """Пользователь, собранный из закэшированных полей без запроса к БД."""
+    user = User(**claims)
+    user._state.adding = False
+    user._state.db = "default"
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без повторной проверки токена: если его уже проверил
+    JWTAuthenticationMiddleware, берётся результат с запроса. Пользователь
+    загружается из БД один раз на токен и дальше берётся из token_user_cache.
+    Access-токены RoleRefreshToken несут роль и поля пользователя в подписанных
+    claims: пользователь собирается из них без запроса к БД.
+    Изменения пользователя (блокировка, роль) вступают в силу со следующим
+    access-токеном: при обновлении пользователь читается из БД.
+    """
+
+    def authenticate(self, request):
+        validated_token = getattr(request._request, "_jwt_access_token", None)
+        if validated_token is None:
+            return super().authenticate(request)
+        return self.get_user(validated_token), validated_token
+
+    async def aauthenticate(self, request):
+        """
+        Аутентификация для async-представлений (request — HttpRequest Django).
+        Токен проверяется в event loop, в поток уходит только первая
+        загрузка пользователя по токену.
+        """
+        validated_token = getattr(request, "_jwt_access_token", None)
+        if validated_token is None:
+            header = self.get_header(request)
+            raw_token = self.get_raw_token(header) if header is not None else None
+            if raw_token is None:
+                return None
+            validated_token = self.get_validated_token(raw_token)
+
+        user = self.user_from_token(validated_token)
+        if user is not None:
+            return user, validated_token
+        return await sync_to_async(self.get_user)(validated_token), validated_token
+
+    def cache_key(self, validated_token):
+        return validated_token.get(api_settings.JTI_CLAIM), validated_token.get(api_settings.USER_ID_CLAIM)
+
+    def user_from_token(self, validated_token):
+        """Пользователь из claims токена или token_user_cache; None, если нужен запрос к БД."""
+        if all(claim in validated_token for claim in TOKEN_USER_CLAIMS):
+            user = user_from_claims({
+                api_settings.USER_ID_FIELD: validated_token[api_settings.USER_ID_CLAIM],
+                **{claim: validated_token[claim] for claim in TOKEN_USER_CLAIMS},
+            })
+            if not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            return user
+        claims = token_user_cache.get(self.cache_key(validated_token))
+        return user_from_claims(claims) if claims is not None else None
+
+    def get_user(self, validated_token):
+        user = self.user_from_token(validated_token)
+        if user is not None:
+            return user
+
+        key = self.cache_key(validated_token)
+        user = super().get_user(validated_token)
+        token_user_cache.set(
+            key,
+            {field: getattr(user, field) for field in USER_CLAIM_FIELDS},
+            validated_token["exp"],
+        )
+        return user
@@ -0,0 +1,204 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import F, Exists, OuterRef
+
+from .models import Listing, Booking, ListingOccupancy
+from .stats import invalidate_booking
+
+# Отменённые бронирования даты не занимают
+ACTIVE_STATUSES = (Booking.Status.PENDING, Booking.Status.CONFIRMED)
+YEAR_BYTES = 46  # 366 бит на год
+
+
+class BookingConflict(Exception):
+    pass
+
+
+def overlapping_bookings(listing_id, start_date, end_date):
+    """Активные бронирования объявления, пересекающиеся с периодом (границы включительно)."""
+    return Booking.objects.filter(
+        listing_id=listing_id,
+        status__in=ACTIVE_STATUSES,
+        start_date__lte=end_date,
+        end_date__gte=start_date,
+    )
+
+
+def exclude_booked(queryset, start_date, end_date):
+    """
+    Оставляет объявления, свободные в период: NOT EXISTS по индексу
+    booking_availability_idx, без выборки бронирований в Python.
+    """
+    return queryset.filter(~Exists(overlapping_bookings(OuterRef("pk"), start_date, end_date)))
+
+
+def lock_listing(listing_id):
+    """
+    Блокирует строку объявления до конца транзакции, чтобы проверки
+    пересечений для одного объявления выполнялись по очереди.
+    SQLite не поддерживает SELECT ... FOR UPDATE, там блокировку на запись
+    берёт пустой UPDATE.
+    """
+    listings = Listing.objects.filter(pk=listing_id)
+    if connection.features.has_select_for_update:
+        list(listings.select_for_update().values_list("pk", flat=True))
+    else:
+        listings.update(id=F("id"))
+
+
+def save_booking(serializer, **kwargs):
+    """
+    Сохраняет бронирование из сериализатора, если даты свободны.
+    При пересечении с активным бронированием выбрасывает BookingConflict.
+    """
+    instance = serializer.instance
+    data = serializer.validated_data
+    listing = data.get("listing") or instance.listing
+    start_date = data.get("start_date") or instance.start_date
+    end_date = data.get("end_date") or instance.end_date
+    status = instance.status if instance else Booking.Status.PENDING
+
+    with transaction.atomic():
+        lock_listing(listing.pk)
+        if status in ACTIVE_STATUSES:
+            conflicts = overlapping_bookings(listing.pk, start_date, end_date)
+            if instance is not None:
+                conflicts = conflicts.exclude(pk=instance.pk)
+            if conflicts.exists():
+                raise BookingConflict(listing.pk, start_date, end_date)
+
+        if instance is not None:
+            if instance.status in ACTIVE_STATUSES:
+                mark_occupancy(instance.listing_id, instance.start_date, instance.end_date, occupied=False)
+            # serializer.save меняет тот же объект: старый период пересчитывается отдельно
+            invalidate_booking(instance, instance.status)
+        booking = serializer.save(**kwargs)
+        if booking.status in ACTIVE_STATUSES:
+            mark_occupancy(booking.listing_id, booking.start_date, booking.end_date, occupied=True)
+        invalidate_booking(booking, booking.status)
+        return booking
+
+
+def set_booking_status(booking, status):
+    """
+    Меняет статус бронирования и обновляет календарь занятости.
+    Возврат отменённого бронирования в активное проверяется на пересечения.
+    """
+    with transaction.atomic():
+        lock_listing(booking.listing_id)
+        # Статус перечитывается под блокировкой: параллельный запрос мог его изменить
+        booking.refresh_from_db(fields=["status"])
+        was_active = booking.status in ACTIVE_STATUSES
+        if not was_active and status in ACTIVE_STATUSES:
+            if overlapping_bookings(booking.listing_id, booking.start_date, booking.end_date).exists():
+                raise BookingConflict(booking.listing_id, booking.start_date, booking.end_date)
+        invalidate_booking(booking, booking.status, status)
+        booking.status = status
+        booking.save(update_fields=["status"])
+        if was_active != (status in ACTIVE_STATUSES):
+            mark_occupancy(booking.listing_id, booking.start_date, booking.end_date, occupied=not was_active)
+
+
+def delete_booking(booking):
+    with transaction.atomic():
+        lock_listing(booking.listing_id)
+        if booking.status in ACTIVE_STATUSES:
+            mark_occupancy(booking.listing_id, booking.start_date, booking.end_date, occupied=False)
+        invalidate_booking(booking, booking.status)
+        booking.delete()
+
+
+# Календарь занятости
+
+def _year_mask(year, start_date, end_date):
+    """Битовая маска дней периода, попадающих в year."""
+    first = max(start_date, date(year, 1, 1)) - date(year, 1, 1)
+    last = min(end_date, date(year, 12, 31)) - date(year, 1, 1)
+    return ((1 << (last.days - first.days + 1)) - 1) << first.days
+
+
+def mark_occupancy(listing_id, start_date, end_date, occupied):
+    """
+    Отмечает дни периода занятыми или свободными.
+    Вызывается под блокировкой объявления (lock_listing), поэтому
+    чтение-изменение-запись битовой строки не теряет обновлений.
+    """
+    for year in range(start_date.year, end_date.year + 1):
+        row, _ = ListingOccupancy.objects.get_or_create(
+            listing_id=listing_id, year=year, defaults={"days": bytes(YEAR_BYTES)}
+        )
+        bits = int.from_bytes(row.days, "little")
+        mask = _year_mask(year, start_date, end_date)
+        bits = bits | mask if occupied else bits & ~mask
+        row.days = bits.to_bytes(YEAR_BYTES, "little")
+        row.save(update_fields=["days"])
+
+
+def _occupancy_rows(listing_id, start_date, end_date):
+    return ListingOccupancy.objects.filter(
+        listing_id=listing_id, year__gte=start_date.year, year__lte=end_date.year
+    )
+
+
+def _split_days(years, start_date, end_date):
+    free, occupied = [], []
+    for ordinal in range(start_date.toordinal(), end_date.toordinal() + 1):
+        day = date.fromordinal(ordinal)
+        bits = years.get(day.year, 0)
+        if bits >> (ordinal - date(day.year, 1, 1).toordinal()) & 1:
+            occupied.append(day)
+        else:
+            free.append(day)
+    return free, occupied
+
+
+def occupancy_calendar(listing_id, start_date, end_date):
+    """Возвращает (свободные, занятые) дни периода одним запросом к битовым строкам."""
+    years = {
+        row.year: int.from_bytes(row.days, "little")
+        for row in _occupancy_rows(listing_id, start_date, end_date)
+    }
+    return _split_days(years, start_date, end_date)
+
+
+async def aoccupancy_calendar(listing_id, start_date, end_date):
+    """Асинхронный вариант occupancy_calendar."""
+    years = {
+        row.year: int.from_bytes(row.days, "little")
+        async for row in _occupancy_rows(listing_id, start_date, end_date).aiterator()
+    }
+    return _split_days(years, start_date, end_date)
+
+
+def rebuild_occupancy(batch_size=500):
+    """
+    Пересобирает календари занятости из активных бронирований пачками объявлений.
+    Возвращает количество обработанных объявлений.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        listing_ids = list(
+            Listing.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size]
+        )
+        if not listing_ids:
+            return processed
+
+        calendars = defaultdict(int)
+        bookings = Booking.objects.filter(
+            listing_id__in=listing_ids, status__in=ACTIVE_STATUSES
+        ).values_list("listing_id", "start_date", "end_date")
+        for listing_id, start_date, end_date in bookings.iterator(chunk_size=5000):
+            for year in range(start_date.year, end_date.year + 1):
+                calendars[listing_id, year] |= _year_mask(year, start_date, end_date)
+
+        with transaction.atomic():
+            ListingOccupancy.objects.filter(listing_id__in=listing_ids).delete()
+            ListingOccupancy.objects.bulk_create(
+                ListingOccupancy(listing_id=listing_id, year=year, days=bits.to_bytes(YEAR_BYTES, "little"))
+                for (listing_id, year), bits in calendars.items()
+            )
+        processed += len(listing_ids)
+        last_id = listing_ids[-1]
@@ -0,0 +1,87 @@
+"""
+Вспомогательные функции для замеров производительности (manage.py bench_*).
+Замеры выполняются в отдельной временной БД, рабочие данные не затрагиваются.
+"""
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+@contextmanager
+def benchmark_database(alias="default"):
+    """
+    Создаёт временную БД с применёнными миграциями и удаляет её по выходу.
+    Для SQLite используется файл, чтобы с БД могли работать несколько потоков.
+    """
+    connection = connections[alias]
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    if connection.vendor == "sqlite" and not test_settings.get("NAME"):
+        test_settings["NAME"] = os.path.join(tempfile.gettempdir(), f"rente_benchmark_{os.getpid()}.sqlite3")
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def measure(func, repeat=5):
+    """Выполняет func repeat раз, возвращает статистику в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "min": timings[0],
+        "median": statistics.median(timings),
+        "max": timings[-1],
+    }
+
+
+def percentiles(timings, points=(50, 90, 99)):
+    """Перцентили списка замеров в миллисекундах."""
+    ordered = sorted(timings)
+    result = {}
+    for point in points:
+        index = min(len(ordered) - 1, round(point / 100 * (len(ordered) - 1)))
+        result[f"p{point}"] = ordered[index]
+    result["max"] = ordered[-1]
+    return result
+
+
+def format_timings(timings):
+    return " ".join(f"{name}={value:.2f}ms" for name, value in timings.items())
+
+
+def wsgi_load(handler, environ, requests, threads=16, concurrency=500):
+    """
+    Прогоняет requests запросов через WSGI-обработчик в пуле из threads потоков,
+    не больше concurrency открытых соединений одновременно: лишние ждут потока
+    в очереди, как у WSGI-сервера. Возвращает (задержки в мс, статусы).
+    """
+
+    def request(queued):
+        statuses = []
+        response = handler(dict(environ), lambda status, headers: statuses.append(int(status[:3])))
+        b"".join(response)
+        response.close()
+        return (time.perf_counter() - queued) * 1000, statuses[0]
+
+    connections = threading.BoundedSemaphore(concurrency)
+    futures = []
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for _ in range(requests):
+            connections.acquire()
+            future = executor.submit(request, time.perf_counter())
+            future.add_done_callback(lambda _: connections.release())
+            futures.append(future)
+        results = [future.result() for future in futures]
+    return [timing for timing, _ in results], [status for _, status in results]
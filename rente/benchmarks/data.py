@@ -0,0 +1,97 @@
+import itertools
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from rente.geo import geohash_for
+from rente.models import User, Listing, ViewHistory
+
+WORDS = (
+    "уютная квартира центр дом студия вид море парк метро тихий район балкон "
+    "лофт пентхаус терраса сад бассейн парковка ремонт мебель кухня спальня "
+    "cozy apartment center house studio sea view park metro quiet balcony garden"
+).split()
+SYLLABLES = ("ka", "ro", "mi", "sel", "dan", "vo", "li", "ter", "un", "po", "za", "rek")
+# Словарь с распределением Ципфа: частые слова встречаются почти везде, редкие — единицы раз
+VOCABULARY = WORDS + ["".join(parts) for parts in itertools.product(SYLLABLES, repeat=3)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+CITIES = ("Berlin", "Munich", "Hamburg", "Cologne", "Leipzig", "Dresden", "Bremen", "Bonn")
+# Центры городов (широта, долгота); объявления разбросаны вокруг них на несколько километров
+CITY_CENTERS = {
+    "Berlin": (52.52, 13.405),
+    "Munich": (48.137, 11.575),
+    "Hamburg": (53.551, 9.993),
+    "Cologne": (50.938, 6.96),
+    "Leipzig": (51.34, 12.375),
+    "Dresden": (51.05, 13.738),
+    "Bremen": (53.079, 8.802),
+    "Bonn": (50.737, 7.098),
+}
+
+
+def text(rng, words):
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=words))
+
+
+def get_landlord(username="bench_landlord"):
+    landlord, _ = User.objects.get_or_create(username=username, defaults={"role": User.Role.LANDLORD})
+    return landlord
+
+
+def create_listings(count, batch_size=5000, seed=0, owner=None):
+    """Быстро создаёт count объявлений со случайным текстом через bulk_create."""
+    rng = random.Random(seed)
+    owner = owner or get_landlord()
+    property_types = Listing.PropertyType.values
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        listings = []
+        for _ in range(size):
+            city = rng.choice(CITIES)
+            latitude, longitude = CITY_CENTERS[city]
+            latitude, longitude = rng.gauss(latitude, 0.05), rng.gauss(longitude, 0.08)
+            listings.append(Listing(
+                owner=owner,
+                title=text(rng, 4),
+                description=text(rng, 30),
+                location=city,
+                latitude=latitude,
+                longitude=longitude,
+                geohash=geohash_for(latitude, longitude),
+                price=Decimal(rng.randint(30, 500)),
+                rooms=rng.randint(1, 6),
+                property_type=rng.choice(property_types),
+            ))
+        Listing.objects.bulk_create(listings)
+        created += size
+    return created
+
+
+def random_period(rng, start=date(2026, 1, 1), days=365, max_length=14):
+    check_in = start + timedelta(days=rng.randrange(days))
+    return check_in, check_in + timedelta(days=rng.randint(1, max_length))
+
+
+def create_view_history(count, users, listing_ids, clusters=50, batch_size=5000, seed=0):
+    """
+    count просмотров от users пользователей. Объявления разбиты на clusters групп,
+    каждый пользователь смотрит в основном одну группу — как город или тип жилья.
+    """
+    rng = random.Random(seed)
+    created_users = User.objects.bulk_create(
+        User(username=f"bench_viewer_{seed}_{i}") for i in range(users)
+    )
+    groups = [listing_ids[i::clusters] for i in range(clusters)]
+    interests = [rng.choice(groups) for _ in created_users]
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        views = []
+        for _ in range(size):
+            index = rng.randrange(len(created_users))
+            pool = interests[index] if rng.random() < 0.8 else listing_ids
+            views.append(ViewHistory(user=created_users[index], listing_id=rng.choice(pool)))
+        ViewHistory.objects.bulk_create(views)
+        created += size
+    return [user.pk for user in created_users]
@@ -0,0 +1,161 @@
+"""
+Фабрики factory_boy для синтетических данных и create_dataset: набор данных
+заданного масштаба, созданный через bulk_create.
+
+Объекты строятся фабриками (build_batch, без сохранения) и пишутся пачками;
+post_save не вызывается, поэтому сводки отзывов, календари занятости и
+поисковый индекс пересобираются в конце. С одинаковым seed набор одинаковый.
+"""
+import random
+from datetime import date, timedelta
+from functools import lru_cache
+
+import factory
+import factory.random
+from django.contrib.auth.hashers import make_password
+from factory.django import DjangoModelFactory
+
+from rente.availability import ACTIVE_STATUSES, rebuild_occupancy
+from rente.models import User, Listing, Booking, Review, ViewHistory, SearchHistory
+from rente.ratings import rebuild_ratings
+from rente.search import get_search_backend
+
+from .data import CITIES
+
+# Пароль всех пользователей набора; хэш считается один раз
+PASSWORD = "bench-password"
+
+QUERIES = ("квартира", "студия центр", "дом с садом", "вид на море", "лофт", "balcony", "sea view")
+
+# Количество объектов на единицу масштаба (scale=1 — небольшой сервис)
+SCALE = {
+    "tenants": 200,
+    "landlords": 20,
+    "admins": 1,
+    "listings": 500,
+    "bookings": 2000,
+    "reviews": 1000,
+    "views": 10_000,
+    "searches": 2000,
+}
+
+
+@lru_cache
+def password_hash():
+    return make_password(PASSWORD)
+
+
+class UserFactory(DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f"bench_user_{n}")
+    email = factory.LazyAttribute(lambda user: f"{user.username}@example.com")
+    first_name = factory.Faker("first_name")
+    last_name = factory.Faker("last_name")
+    role = User.Role.TENANT
+    password = factory.LazyFunction(password_hash)
+
+
+class ListingFactory(DjangoModelFactory):
+    class Meta:
+        model = Listing
+
+    title = factory.Faker("sentence", nb_words=4)
+    description = factory.Faker("paragraph", nb_sentences=5)
+    location = factory.Faker("random_element", elements=CITIES)
+    price = factory.Faker("pydecimal", left_digits=3, right_digits=2, min_value=30, max_value=500)
+    rooms = factory.Faker("random_int", min=1, max=6)
+    property_type = factory.Faker("random_element", elements=Listing.PropertyType.values)
+    is_active = factory.Faker("boolean", chance_of_getting_true=90)
+
+
+class BookingFactory(DjangoModelFactory):
+    class Meta:
+        model = Booking
+
+    start_date = factory.Faker("date_between", start_date=date(2030, 1, 1), end_date=date(2030, 12, 31))
+    end_date = factory.LazyAttribute(lambda booking: booking.start_date + timedelta(days=booking.nights))
+    status = Booking.Status.PENDING
+
+    class Params:
+        nights = factory.Faker("random_int", min=1, max=14)
+
+
+class ReviewFactory(DjangoModelFactory):
+    class Meta:
+        model = Review
+
+    rating = factory.Faker("random_int", min=1, max=5)
+    comment = factory.Faker("sentence", nb_words=12)
+
+
+class SearchHistoryFactory(DjangoModelFactory):
+    class Meta:
+        model = SearchHistory
+
+    query = factory.Faker("random_element", elements=QUERIES)
+
+
+def assign_booking_statuses(bookings, rng):
+    """
+    Интервалы бронирований одного объявления пересекаются, но активным
+    (pending/confirmed) остаётся только одно из пересекающихся, остальные
+    отменены — как после проверки в save_booking.
+    """
+    active = {}
+    for booking in sorted(bookings, key=lambda booking: (booking.listing_id, booking.start_date)):
+        end = active.get(booking.listing_id)
+        if end is not None and booking.start_date < end:
+            booking.status = Booking.Status.CANCELED
+            continue
+        booking.status = rng.choice(ACTIVE_STATUSES)
+        active[booking.listing_id] = booking.end_date
+
+
+def create_dataset(scale=1.0, seed=0, batch_size=2000):
+    """Создаёт набор данных масштаба scale, возвращает количество объектов по моделям."""
+    rng = random.Random(seed)
+    factory.random.reseed_random(seed)
+    counts = {name: max(1, int(value * scale)) for name, value in SCALE.items()}
+
+    User.objects.bulk_create([
+        *UserFactory.build_batch(counts["tenants"], role=User.Role.TENANT),
+        *UserFactory.build_batch(counts["landlords"], role=User.Role.LANDLORD),
+        *UserFactory.build_batch(counts["admins"], role=User.Role.ADMIN, is_staff=True, is_superuser=True),
+    ], batch_size=batch_size)
+    # id после bulk_create есть не во всех БД, поэтому перечитываются
+    users = User.objects.filter(username__startswith="bench_user_").order_by("pk")
+    tenant_ids = list(users.filter(role=User.Role.TENANT).values_list("pk", flat=True))
+    landlord_ids = list(users.filter(role=User.Role.LANDLORD).values_list("pk", flat=True))
+
+    Listing.objects.bulk_create([
+        ListingFactory.build(owner_id=rng.choice(landlord_ids)) for _ in range(counts["listings"])
+    ], batch_size=batch_size)
+    listing_ids = list(Listing.objects.order_by("pk").values_list("pk", flat=True))
+
+    bookings = [
+        BookingFactory.build(listing_id=rng.choice(listing_ids), tenant_id=rng.choice(tenant_ids))
+        for _ in range(counts["bookings"])
+    ]
+    assign_booking_statuses(bookings, rng)
+    Booking.objects.bulk_create(bookings, batch_size=batch_size)
+
+    Review.objects.bulk_create([
+        ReviewFactory.build(listing_id=rng.choice(listing_ids), author_id=rng.choice(tenant_ids))
+        for _ in range(counts["reviews"])
+    ], batch_size=batch_size)
+    # Просмотры с перекосом: популярные объявления смотрят чаще
+    weights = [1 / rank for rank in range(1, len(listing_ids) + 1)]
+    ViewHistory.objects.bulk_create([
+        ViewHistory(user_id=rng.choice(tenant_ids), listing_id=listing_id)
+        for listing_id in rng.choices(listing_ids, weights=weights, k=counts["views"])
+    ], batch_size=batch_size)
+    SearchHistory.objects.bulk_create([
+        SearchHistoryFactory.build(user_id=rng.choice(tenant_ids)) for _ in range(counts["searches"])
+    ], batch_size=batch_size)
+
+    rebuild_ratings()
+    rebuild_occupancy()
+    get_search_backend().rebuild()
+    return counts
@@ -0,0 +1,53 @@
+"""
+HTTP-нагрузка из нескольких процессов: каждый процесс держит своё
+keep-alive соединение и отправляет свою часть запросов (RequestSpec)
+последовательно. Модуль не использует Django, процессы запускаются через spawn.
+"""
+import json
+import multiprocessing
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+
+def _send(url, requests):
+    parts = urlsplit(url)
+    connection = HTTPConnection(parts.hostname, parts.port, timeout=60)
+    timings, statuses = [], []
+    try:
+        for method, path, body, cookies in requests:
+            headers = {"Cookie": "; ".join(f"{name}={value}" for name, value in cookies.items())} if cookies else {}
+            if body is not None:
+                body = json.dumps(body)
+                headers["Content-Type"] = "application/json"
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except OSError:
+                connection.close()
+                status = 0
+            timings.append((time.perf_counter() - started) * 1000)
+            statuses.append(status)
+    finally:
+        connection.close()
+    return timings, statuses
+
+
+def run_http(url, requests, processes=4):
+    """
+    Делит requests между processes процессами и отправляет их на url.
+    Возвращает (задержки в мс, статусы, время прогона в секундах).
+    """
+    chunks = [[tuple(spec) for spec in requests[index::processes]] for index in range(processes)]
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        # Процессы запускаются до замера времени
+        pool.map(time.sleep, [0] * processes)
+        started = time.perf_counter()
+        results = pool.starmap(_send, [(url, chunk) for chunk in chunks])
+        elapsed = time.perf_counter() - started
+    timings = [timing for chunk_timings, _ in results for timing in chunk_timings]
+    statuses = [status for _, chunk_statuses in results for status in chunk_statuses]
+    return timings, statuses, elapsed
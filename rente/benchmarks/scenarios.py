@@ -0,0 +1,119 @@
+"""
+Сценарии нагрузки: поиск, страница объявлений, создание бронирования,
+просмотр объявления, обновление access-токена.
+
+Сценарий по контексту (пользователи, объявления, токены из БД) и генератору
+случайных чисел возвращает RequestSpec — описание HTTP-запроса без Django,
+поэтому один и тот же список запросов можно прогнать через тестовый клиент
+(run_client) и через HTTP из нескольких процессов (rente.benchmarks.http).
+"""
+import json
+import random
+import time
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+from django.test import Client
+
+from rente.models import User, Listing
+from rente.tokens import RoleRefreshToken
+
+from . import percentiles
+from .data import CITIES
+from .factories import QUERIES
+
+
+class RequestSpec(NamedTuple):
+    method: str
+    path: str
+    body: dict = None
+    cookies: dict = None
+
+
+class ScenarioContext:
+    """Активные объявления и токены пула арендаторов (cookie access_token/refresh_token)."""
+
+    def __init__(self, users=20):
+        self.listing_ids = list(Listing.objects.filter(is_active=True).order_by("pk").values_list("pk", flat=True))
+        self.tokens = []
+        for user in User.objects.filter(role=User.Role.TENANT).order_by("pk")[:users]:
+            refresh = RoleRefreshToken.for_user(user)
+            self.tokens.append({"access_token": str(refresh.access_token), "refresh_token": str(refresh)})
+
+    def access(self, rng):
+        return {"access_token": rng.choice(self.tokens)["access_token"]}
+
+
+def search(context, rng):
+    return RequestSpec("GET", "/api/listings/?" + urlencode({"q": rng.choice(QUERIES)}), cookies=context.access(rng))
+
+
+def listing_page(context, rng):
+    params = rng.choice(({}, {"location": rng.choice(CITIES)}, {"ordering": "price_asc", "max_price": 300}))
+    return RequestSpec("GET", "/api/listings/?" + urlencode(params), cookies=context.access(rng))
+
+
+def booking_create(context, rng):
+    # Даты после периода набора данных: конфликты только между запросами сценария
+    start_date = date(2031, 1, 1) + timedelta(days=rng.randrange(365))
+    body = {
+        "listing": rng.choice(context.listing_ids),
+        "start_date": start_date.isoformat(),
+        "end_date": (start_date + timedelta(days=rng.randint(1, 7))).isoformat(),
+    }
+    return RequestSpec("POST", "/api/bookings/", body, context.access(rng))
+
+
+def view(context, rng):
+    return RequestSpec("POST", f"/api/listings/{rng.choice(context.listing_ids)}/view/", cookies=context.access(rng))
+
+
+def token_refresh(context, rng):
+    # Только refresh-токен: access выпускает JWTAuthenticationMiddleware
+    token = rng.choice(context.tokens)
+    return RequestSpec("GET", "/api/listings/?page_size=1", cookies={"refresh_token": token["refresh_token"]})
+
+
+# Сценарий и допустимые статусы ответа (403 у бронирования — даты уже заняты)
+SCENARIOS = {
+    "search": (search, (200,)),
+    "listing_page": (listing_page, (200,)),
+    "booking_create": (booking_create, (201, 403)),
+    "view": (view, (200,)),
+    "token_refresh": (token_refresh, (200,)),
+}
+
+
+def build_requests(name, context, count, seed=0):
+    rng = random.Random(f"{name}:{seed}")
+    scenario, _ = SCENARIOS[name]
+    return [scenario(context, rng) for _ in range(count)]
+
+
+def run_client(requests):
+    """Запросы через django.test.Client в текущем процессе. Возвращает (задержки в мс, статусы)."""
+    client = Client()
+    timings, statuses = [], []
+    for spec in requests:
+        client.cookies = SimpleCookie(spec.cookies or {})
+        body = json.dumps(spec.body) if spec.body is not None else ""
+        started = time.perf_counter()
+        response = client.generic(spec.method, spec.path, body, content_type="application/json")
+        timings.append((time.perf_counter() - started) * 1000)
+        statuses.append(response.status_code)
+    return timings, statuses
+
+
+def summarize(scenario, driver, timings, statuses, elapsed):
+    """Результат прогона в виде словаря для JSON-отчёта."""
+    _, expected = SCENARIOS[scenario]
+    return {
+        "scenario": scenario,
+        "driver": driver,
+        "requests": len(timings),
+        "errors": sum(status not in expected for status in statuses),
+        "throughput_rps": round(len(timings) / elapsed, 1),
+        "latency_ms": {name: round(value, 3) for name, value in percentiles(timings).items()},
+    }
@@ -0,0 +1,194 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Listing, ViewHistory, SearchHistory
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter:
+    """
+    Буфер событий в памяти процесса. Фоновый поток сбрасывает его в БД
+    каждые BATCH_SIZE событий или FLUSH_INTERVAL_MS миллисекунд
+    и при завершении процесса. С BACKGROUND=False запись синхронная.
+
+    Если запись не удалась, пакет возвращается в очередь, а фоновый поток
+    повторяет сброс с удваивающейся паузой. После MAX_RETRIES неудач подряд
+    пакет отбрасывается.
+    """
+
+    settings_name = None
+    defaults = {"BATCH_SIZE": 500, "FLUSH_INTERVAL_MS": 1000, "BACKGROUND": True, "MAX_RETRIES": 5}
+    # Наибольшая пауза между повторами, секунды
+    max_backoff = 60
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._failures = 0
+
+    @property
+    def options(self):
+        return {**self.defaults, **getattr(settings, self.settings_name, {})}
+
+    def put(self, item):
+        options = self.options
+        self._queue.put(item)
+        if not options["BACKGROUND"]:
+            self.flush()
+            return
+        self._ensure_thread()
+        if self._queue.qsize() >= options["BATCH_SIZE"]:
+            self._wakeup.set()
+
+    async def aput(self, item):
+        """put для async-представлений: синхронная запись уходит в поток."""
+        if self.options["BACKGROUND"]:
+            self.put(item)
+        else:
+            await sync_to_async(self.put)(item)
+
+    def flush(self):
+        with self._flush_lock:
+            items = []
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not items:
+                return 0
+            try:
+                self.write(items)
+            except Exception:
+                self._failures += 1
+                if self._failures < self.options["MAX_RETRIES"]:
+                    for item in items:
+                        self._queue.put(item)
+                else:
+                    logger.error(
+                        "Буфер %s: %d событий отброшено после %d попыток записи",
+                        type(self).__name__, len(items), self._failures,
+                    )
+                    self._failures = 0
+                raise
+            self._failures = 0
+            return len(items)
+
+    def write(self, items):
+        raise NotImplementedError
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is None:
+                    # Остаток буфера записывается при завершении процесса
+                    atexit.register(self.flush)
+                self._thread = threading.Thread(
+                    target=self._run, name=type(self).__name__, daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            interval = self.options["FLUSH_INTERVAL_MS"] / 1000
+            if self._failures:
+                # Полный буфер не прерывает паузу после ошибки
+                time.sleep(min(interval * 2 ** self._failures, self.max_backoff))
+            else:
+                self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Не удалось записать буфер %s", type(self).__name__)
+            finally:
+                connection.close()
+
+
+class ViewCounter(BufferedWriter):
+    """Просмотры объявлений: (listing_id, user_id)."""
+
+    settings_name = "VIEW_COUNTER"
+
+    def write(self, items):
+        existing = set(
+            Listing.objects.filter(pk__in={listing_id for listing_id, _ in items}).values_list("pk", flat=True)
+        )
+        items = [item for item in items if item[0] in existing]
+
+        # Объявления с одинаковым приростом обновляются одним UPDATE
+        by_increment = defaultdict(list)
+        for listing_id, count in Counter(listing_id for listing_id, _ in items).items():
+            by_increment[count].append(listing_id)
+
+        with transaction.atomic():
+            for increment, listing_ids in by_increment.items():
+                Listing.objects.filter(pk__in=listing_ids).update(views_count=F("views_count") + increment)
+            ViewHistory.objects.bulk_create(
+                [ViewHistory(listing_id=listing_id, user_id=user_id) for listing_id, user_id in items],
+                batch_size=self.options["BATCH_SIZE"],
+            )
+
+
+class SearchLog(BufferedWriter):
+    """
+    История поиска: (user_id, query). Одинаковые запросы пользователя
+    в пределах DEDUPE_SECONDS записываются один раз.
+    """
+
+    settings_name = "SEARCH_LOG"
+    defaults = {**BufferedWriter.defaults, "DEDUPE_SECONDS": 300, "DEDUPE_MAX_KEYS": 100_000}
+    max_length = SearchHistory._meta.get_field("query").max_length
+
+    def __init__(self):
+        super().__init__()
+        self._seen = {}
+        self._seen_lock = threading.Lock()
+
+    def put(self, item):
+        user_id, query = item
+        query = " ".join(query.split())[:self.max_length]
+        if not query or self._is_duplicate(user_id, query):
+            return
+        super().put((user_id, query))
+
+    def _is_duplicate(self, user_id, query):
+        options = self.options
+        key = (user_id, query.lower())
+        now = time.monotonic()
+        with self._seen_lock:
+            last = self._seen.get(key)
+            if last is not None and now - last < options["DEDUPE_SECONDS"]:
+                return True
+            self._seen[key] = now
+            if len(self._seen) > options["DEDUPE_MAX_KEYS"]:
+                self._seen = {
+                    key: seen for key, seen in self._seen.items()
+                    if now - seen < options["DEDUPE_SECONDS"]
+                }
+        return False
+
+    def write(self, items):
+        SearchHistory.objects.bulk_create(
+            [SearchHistory(user_id=user_id, query=query) for user_id, query in items],
+            batch_size=self.options["BATCH_SIZE"],
+        )
+
+
+view_counter = ViewCounter()
+search_log = SearchLog()
@@ -0,0 +1,129 @@
+"""
+Массовый импорт и экспорт объявлений (NDJSON и CSV).
+
+Импорт читает строки потоком и обрабатывает их пачками: каждая строка
+проверяется сериализатором, дубликаты (title, location) ищутся одним
+запросом на пачку, корректные строки сохраняются через bulk_create.
+Ошибки строк попадают в отчёт и не прерывают импорт.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from .cache import response_cache
+from .geo import geohash_for
+from .models import Listing
+from .search import get_search_backend
+from .serializers import ListingImportSerializer, DUPLICATE_LISTING_MESSAGE
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+EXPORT_FIELDS = (
+    "id", "title", "description", "location", "latitude", "longitude", "price", "rooms", "property_type",
+    "is_active", "created_at", "views_count", "reviews_count", "average_rating",
+)
+
+# Сколько ошибок строк возвращать в отчёте; количество считается всегда
+MAX_REPORTED_ERRORS = 1000
+# Пар (title, location) в одном запросе проверки дубликатов: число параметров ограничено
+DUPLICATE_LOOKUP_BATCH = 300
+
+
+def read_rows(lines, format):
+    """
+    Разбирает поток строк (bytes) и возвращает (номер строки, данные, ошибка).
+    Пустые значения CSV пропускаются, чтобы поля получили значения по умолчанию.
+    """
+    lines = codecs.iterdecode(lines, "utf-8")
+    if format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value not in ("", None)}, None
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, {"non_field_errors": [f"Некорректный JSON: {exc}"]}
+            continue
+        if not isinstance(row, dict):
+            yield number, None, {"non_field_errors": ["Ожидается JSON-объект"]}
+            continue
+        yield number, row, None
+
+
+def import_listings(rows, owner, chunk_size=500):
+    """Импортирует строки из read_rows от имени owner, возвращает отчёт."""
+    serializer = ListingImportSerializer()
+    seen = set()
+    report = {"created": 0, "failed": 0, "errors": []}
+
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        failed = []
+        valid = []
+        for number, row, error in chunk:
+            if error is not None:
+                failed.append({"line": number, "errors": error})
+                continue
+            try:
+                valid.append((number, serializer.run_validation(row)))
+            except ValidationError as exc:
+                failed.append({"line": number, "errors": exc.detail})
+
+        # Запрос на DUPLICATE_LOOKUP_BATCH пар вместо проверки в ListingSerializer.validate
+        keys = list({(attrs["title"], attrs["location"]) for _, attrs in valid})
+        for start in range(0, len(keys), DUPLICATE_LOOKUP_BATCH):
+            batch = set(keys[start:start + DUPLICATE_LOOKUP_BATCH])
+            # IN по обоим полям отбирает кандидатов по индексу (location, title), пары сверяются здесь
+            candidates = Listing.objects.filter(
+                location__in={location for _, location in batch}, title__in={title for title, _ in batch}
+            ).values_list("title", "location")
+            seen.update(key for key in candidates if key in batch)
+
+        listings = []
+        for number, attrs in valid:
+            key = (attrs["title"], attrs["location"])
+            if key in seen:
+                failed.append({"line": number, "errors": {"non_field_errors": [DUPLICATE_LISTING_MESSAGE]}})
+                continue
+            seen.add(key)
+            listing = Listing(owner=owner, **attrs)
+            # bulk_create не вызывает save()
+            listing.geohash = geohash_for(listing.latitude, listing.longitude)
+            listings.append(listing)
+
+        if listings:
+            with transaction.atomic():
+                Listing.objects.bulk_create(listings, batch_size=chunk_size)
+                # bulk_create не отправляет post_save: индекс и кэш обновляются здесь
+                if connection.features.can_return_rows_from_bulk_insert:
+                    get_search_backend().index_many(listings)
+                transaction.on_commit(response_cache.bump)
+            report["created"] += len(listings)
+
+        report["failed"] += len(failed)
+        failed.sort(key=lambda error: error["line"])
+        report["errors"].extend(failed[:MAX_REPORTED_ERRORS - len(report["errors"])])
+
+    if not connection.features.can_return_rows_from_bulk_insert and report["created"]:
+        # Без RETURNING у объектов нет id, индекс пересобирается целиком
+        get_search_backend().rebuild()
+    return report
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Строки экспорта без создания моделей, курсором по chunk_size."""
+    return queryset.order_by("pk").values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .replicas import reading_from_replicas
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш в памяти процесса со сроком жизни у каждой записи."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at=None):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LocMemBackend:
+    def __init__(self, options):
+        self._entries = LRUCache(options["MAX_ENTRIES"])
+        self._generation = time.time_ns()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value, timeout):
+        self._entries.set(key, value, time.time() + timeout)
+
+    def generation(self):
+        return self._generation
+
+    def bump(self):
+        with self._lock:
+            self._generation += 1
+
+
+class DjangoCacheBackend:
+    """Кэш Django (CACHES[CACHE_ALIAS]), например Redis, общий для процессов."""
+
+    generation_key = "rente:listings:generation"
+
+    def __init__(self, options):
+        self._cache = caches[options["CACHE_ALIAS"]]
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, timeout):
+        self._cache.set(key, value, timeout)
+
+    def generation(self):
+        # Начальное значение — время, чтобы после потери ключа поколение не вернулось к старому
+        self._cache.add(self.generation_key, time.time_ns(), None)
+        return self._cache.get(self.generation_key)
+
+    def bump(self):
+        try:
+            self._cache.incr(self.generation_key)
+        except ValueError:
+            self._cache.add(self.generation_key, time.time_ns(), None)
+
+
+BACKENDS = {"locmem": LocMemBackend, "django": DjangoCacheBackend}
+
+
+class ResponseCache:
+    """
+    Кэш ответов list/retrieve объявлений по нормализованным параметрам запроса.
+    Ключ включает поколение, которое увеличивается при изменении объявлений,
+    отзывов и бронирований, поэтому старые записи просто перестают читаться.
+
+    Сохраняются только ответы, прочитанные с primary: реплика может отставать
+    и записать под новым поколением данные до изменения, которые затем увидит
+    и сам автор изменения. Поколение бэкенда 'locmem' живёт в памяти процесса,
+    другие воркеры видят сброс только через TIMEOUT.
+    """
+
+    defaults = {
+        "ENABLED": True,
+        "BACKEND": "locmem",
+        "CACHE_ALIAS": "default",
+        "TIMEOUT": 60,
+        "MAX_ENTRIES": 1024,
+    }
+
+    def __init__(self):
+        self._backends = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def options(self):
+        return {**self.defaults, **getattr(settings, "LISTING_RESPONSE_CACHE", {})}
+
+    @property
+    def backend(self):
+        options = self.options
+        name = options["BACKEND"]
+        if name not in self._backends:
+            with self._lock:
+                self._backends.setdefault(name, BACKENDS[name](options))
+        return self._backends[name]
+
+    def make_key(self, request, action, pk=None):
+        params = sorted(
+            (name, value.strip())
+            for name, values in request.query_params.lists()
+            for value in values
+            if value.strip()
+        )
+        raw = repr((request.get_host(), request.accepted_renderer.format, action, pk, params))
+        digest = hashlib.sha1(raw.encode()).hexdigest()
+        return f"rente:listings:{self.backend.generation()}:{digest}"
+
+    def fetch(self, request, action, get_response, pk=None):
+        """Возвращает ответ из кэша или вызывает get_response и кэширует успешный ответ."""
+        if not self.options["ENABLED"]:
+            return get_response()
+
+        key = self.make_key(request, action, pk)
+        cached = self.backend.get(key)
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is not None:
+            return Response(cached, headers={"X-Cache": "HIT"})
+
+        response = get_response()
+        if response.status_code == 200 and not reading_from_replicas():
+            # ReturnDict/ReturnList ссылаются на сериализатор, а через него на запрос:
+            # в кэш идёт простая копия данных
+            data = json.loads(JSONRenderer().render(response.data))
+            self.backend.set(key, data, self.options["TIMEOUT"])
+        response["X-Cache"] = "MISS"
+        return response
+
+    def bump(self):
+        self.backend.bump()
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin:
+    """Кэширование list/retrieve через response_cache."""
+
+    def list(self, request, *args, **kwargs):
+        return response_cache.fetch(request, "list", lambda: super(CachedResponseMixin, self).list(
+            request, *args, **kwargs
+        ))
+
+    def retrieve(self, request, *args, **kwargs):
+        return response_cache.fetch(request, "retrieve", lambda: super(CachedResponseMixin, self).retrieve(
+            request, *args, **kwargs
+        ), pk=kwargs.get(self.lookup_url_kwarg or self.lookup_field))
@@ -0,0 +1,133 @@
+"""
+Быстрый вывод списков: строки values() превращаются в dict того же вида, что
+у ModelSerializer, по заранее составленной схеме полей, без создания полей
+и объектов моделей на каждую строку.
+"""
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .metrics import serializer_timer
+
+# Поля, у которых to_representation для значения из БД ничего не меняет
+IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.BooleanField,
+    serializers.FloatField,
+    serializers.ReadOnlyField,
+)
+
+
+class ValuesSerializer:
+    """
+    Схема вывода, составленная по сериализатору serializer_class:
+    (ключ, путь для values(), преобразование значения или вложенная схема).
+    Поддерживаются поля модели, PrimaryKeyRelatedField, вложенные
+    ModelSerializer и SerializerMethodField (метод получает строку с атрибутами
+    всех полей модели).
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer = serializer_class()
+        self.model = self.serializer.Meta.model
+        self.lookups = []
+        self.schema = self.compile(self.serializer, "")
+        if any(kind == "method" for _, kind, _ in self.schema):
+            for field in self.model._meta.concrete_fields:
+                if field.attname not in self.lookups:
+                    self.lookups.append(field.attname)
+
+    def compile(self, serializer, prefix):
+        schema = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            lookup = prefix + field.source.replace(".", "__")
+            if isinstance(field, serializers.ModelSerializer):
+                schema.append((name, "nested", (lookup + "__pk", self.compile(field, lookup + "__"))))
+                self.lookups.append(lookup + "__pk")
+            elif isinstance(field, serializers.SerializerMethodField):
+                if prefix:
+                    raise ImproperlyConfigured(f"SerializerMethodField во вложенном сериализаторе: {name}")
+                schema.append((name, "method", getattr(serializer, field.method_name)))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                schema.append((name, "value", lookup))
+                self.lookups.append(lookup)
+            elif isinstance(field, IDENTITY_FIELDS):
+                schema.append((name, "value", lookup))
+                self.lookups.append(lookup)
+            elif (
+                isinstance(field, serializers.DateTimeField)
+                and getattr(field, "format", api_settings.DATETIME_FORMAT) == ISO_8601
+                and not hasattr(field, "timezone")
+            ):
+                # DateTimeField.to_representation ищет текущую зону для каждого значения
+                schema.append((name, "datetime", (lookup, field.to_representation)))
+                self.lookups.append(lookup)
+            elif isinstance(field, serializers.Field) and not isinstance(field, serializers.BaseSerializer):
+                schema.append((name, "convert", (lookup, field.to_representation)))
+                self.lookups.append(lookup)
+            else:
+                raise ImproperlyConfigured(f"Поле {name} ({type(field).__name__}) не поддерживается")
+        return schema
+
+    def values(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def to_representation(self, row, schema=None, tz=None):
+        result = {}
+        for name, kind, source in schema or self.schema:
+            if kind == "value":
+                result[name] = row[source]
+            elif kind == "datetime":
+                value = row[source[0]]
+                if value is None or tz is None or timezone.is_naive(value):
+                    result[name] = None if value is None else source[1](value)
+                else:
+                    value = value.astimezone(tz).isoformat()
+                    result[name] = value[:-6] + "Z" if value.endswith("+00:00") else value
+            elif kind == "convert":
+                value = row[source[0]]
+                result[name] = None if value is None else source[1](value)
+            elif kind == "nested":
+                result[name] = None if row[source[0]] is None else self.to_representation(row, source[1], tz)
+            else:
+                result[name] = source(SimpleNamespace(**row))
+        return result
+
+    def serialize(self, rows):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        with serializer_timer():
+            return [self.to_representation(row, tz=tz) for row in rows]
+
+
+class FastListMixin:
+    """
+    list через ValuesSerializer(serializer_class); отключается настройкой
+    FAST_LIST_SERIALIZERS = False. Вывод совпадает с обычным сериализатором.
+    """
+
+    _values_serializers = {}
+
+    def get_values_serializer(self):
+        serializer_class = self.get_serializer_class()
+        if serializer_class not in self._values_serializers:
+            self._values_serializers[serializer_class] = ValuesSerializer(serializer_class)
+        return self._values_serializers[serializer_class]
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, "FAST_LIST_SERIALIZERS", True):
+            return super().list(request, *args, **kwargs)
+        values_serializer = self.get_values_serializer()
+        rows = values_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.serialize(page))
+        return Response(values_serializer.serialize(rows))
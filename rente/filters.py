@@ -0,0 +1,125 @@
+from datetime import timedelta
+
+from django.utils.dateparse import parse_date
+from django.utils.timezone import localdate, now
+from rest_framework.exceptions import ValidationError
+
+from .availability import exclude_booked
+from .geo import filter_near
+from .search import get_search_backend
+
+# Радиус поиска рядом по умолчанию и наибольший, км
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 100
+
+
+def date_param(params, name, default=None):
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Ожидается дата в формате ГГГГ-ММ-ДД"})
+    return parsed
+
+
+def near_param(params):
+    """(широта, долгота, радиус в км) из параметров near=lat,lng и radius= или None."""
+    near = params.get("near")
+    if not near:
+        return None
+    try:
+        latitude, longitude = (float(value) for value in near.split(","))
+    except ValueError:
+        raise ValidationError({"near": "Ожидаются координаты в формате широта,долгота"})
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValidationError({"near": "Координаты вне допустимого диапазона"})
+    try:
+        radius = float(params.get("radius", DEFAULT_RADIUS_KM))
+    except ValueError:
+        raise ValidationError({"radius": "Ожидается число километров"})
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise ValidationError({"radius": f"Радиус должен быть больше 0 и не больше {MAX_RADIUS_KM} км"})
+    return latitude, longitude, radius
+
+
+def check_period(start_date, end_date):
+    """Проверяет период from/to: не в обратном порядке и не больше года."""
+    if end_date < start_date:
+        raise ValidationError({"to": "Дата окончания раньше даты начала"})
+    if (end_date - start_date).days > 366:
+        raise ValidationError({"to": "Период не может быть больше года"})
+    return start_date, end_date
+
+
+def calendar_period(params):
+    """Период календаря занятости из параметров from/to: по умолчанию 30 дней вперёд."""
+    start_date = date_param(params, "from", now().date())
+    end_date = date_param(params, "to", start_date + timedelta(days=30))
+    return check_period(start_date, end_date)
+
+
+def stats_period(params):
+    """Период статистики объявления из параметров from/to: по умолчанию последние 30 дней."""
+    end_date = date_param(params, "to", localdate())
+    start_date = date_param(params, "from", end_date - timedelta(days=30))
+    return check_period(start_date, end_date)
+
+
+def filter_listings(queryset, params):
+    """Поиск, фильтры и сортировка списка объявлений по параметрам запроса."""
+
+    # Поиск по ключевым словам
+    q = params.get("q")
+    if q:
+        queryset = get_search_backend().search(queryset, q)
+
+    # Фильтрация
+    min_price = params.get("min_price")
+    max_price = params.get("max_price")
+    location = params.get("location")
+    rooms = params.get("rooms")
+    property_type = params.get("property_type")
+    min_rating = params.get("min_rating")
+
+    if min_price:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price:
+        queryset = queryset.filter(price__lte=max_price)
+    if location:
+        queryset = queryset.filter(location__icontains=location)
+    near = near_param(params)
+    if near:
+        queryset = filter_near(queryset, *near)
+    if rooms:
+        queryset = queryset.filter(rooms=rooms)
+    if property_type:
+        queryset = queryset.filter(property_type=property_type)
+    if min_rating:
+        queryset = queryset.filter(reviews_count__gt=0, average_rating__gte=min_rating)
+
+    # Свободные на даты заезда и выезда
+    check_in = date_param(params, "check_in")
+    check_out = date_param(params, "check_out")
+    if check_in or check_out:
+        if not (check_in and check_out):
+            raise ValidationError("Нужно указать обе даты: check_in и check_out")
+        if check_out < check_in:
+            raise ValidationError({"check_out": "Дата выезда раньше даты заезда"})
+        queryset = exclude_booked(queryset, check_in, check_out)
+
+    # Сортировка
+    ordering = params.get("ordering")
+    if ordering == "price_asc":
+        queryset = queryset.order_by("price")
+    elif ordering == "price_desc":
+        queryset = queryset.order_by("-price")
+    elif ordering == "date":
+        queryset = queryset.order_by("-created_at")
+    elif ordering == "rating":
+        queryset = queryset.order_by("-average_rating")
+
+    return queryset
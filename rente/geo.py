@@ -0,0 +1,130 @@
+"""
+Поиск объявлений рядом с точкой без GIS-расширений БД.
+
+У объявления хранится geohash координат (Listing.geohash, B-tree индекс).
+Ячейки geohash вложены: все точки ячейки имеют её строку префиксом, а
+префикс строки — диапазон [ячейка, следующая ячейка) в порядке индекса.
+Запрос near покрывает круг поиска несколькими ячейками подходящей точности,
+отбирает строки диапазонами по индексу и затем точно проверяет расстояние
+по формуле гаверсинуса в SQL (функции есть в MySQL, в SQLite их
+регистрирует Django).
+"""
+import math
+from functools import reduce
+from operator import or_
+
+from django.db.models import F, Q
+from django.db.models.functions import Cos, Power, Radians, Sin
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# 9 символов — ячейка около 5 x 5 м
+PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+# Больше ячеек — точнее отбор по индексу, но больше диапазонов в запросе
+MAX_CELLS = 16
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """Geohash точки: биты долготы и широты по очереди, по 5 бит на символ."""
+    lat_low, lat_high = -90.0, 90.0
+    lng_low, lng_high = -180.0, 180.0
+    chars = []
+    value, bits, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            middle = (lng_low + lng_high) / 2
+            bit = longitude >= middle
+            lng_low, lng_high = (middle, lng_high) if bit else (lng_low, middle)
+        else:
+            middle = (lat_low + lat_high) / 2
+            bit = latitude >= middle
+            lat_low, lat_high = (middle, lat_high) if bit else (lat_low, middle)
+        value = value << 1 | bit
+        bits += 1
+        even = not even
+        if bits == 5:
+            chars.append(BASE32[value])
+            value, bits = 0, 0
+    return "".join(chars)
+
+
+def geohash_for(latitude, longitude):
+    """Geohash для Listing.geohash; пустая строка, если координат нет."""
+    if latitude is None or longitude is None:
+        return ""
+    return encode(latitude, longitude)
+
+
+def cell_size(precision):
+    """(высота, ширина) ячейки в градусах."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** (bits - bits // 2)
+
+
+def covering_cells(latitude, longitude, radius_km, max_cells=MAX_CELLS):
+    """Ячейки наибольшей точности, не больше max_cells, покрывающие круг поиска."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    lng_delta = 180.0 if cos_lat < 1e-9 else min(180.0, lat_delta / cos_lat)
+    lat_min, lat_max = max(-90.0, latitude - lat_delta), min(90.0, latitude + lat_delta)
+
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = range(math.floor((lat_min + 90) / height), math.floor(min(lat_max + 90, 180 - height / 2) / height) + 1)
+        columns = range(math.floor((longitude - lng_delta + 180) / width), math.floor((longitude + lng_delta + 180) / width) + 1)
+        total_columns = round(360 / width)
+        if len(rows) * min(len(columns), total_columns) <= max_cells or precision == 1:
+            # Столбцы за ±180° переносятся на другую сторону
+            columns = {column % total_columns for column in columns}
+            return sorted(
+                encode(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width, precision)
+                for row in rows for column in columns
+            )
+
+
+def next_prefix(prefix):
+    """Наименьшая строка больше всех строк с префиксом prefix; None, если такой нет."""
+    while prefix:
+        index = BASE32.index(prefix[-1])
+        if index + 1 < len(BASE32):
+            return prefix[:-1] + BASE32[index + 1]
+        prefix = prefix[:-1]
+    return None
+
+
+def cell_ranges(cells):
+    """Диапазоны [начало, конец) для отсортированных ячеек; соседние в порядке индекса сливаются."""
+    ranges = []
+    for cell in cells:
+        end = next_prefix(cell)
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1][1] = end
+        else:
+            ranges.append([cell, end])
+    return ranges
+
+
+def haversine(latitude, longitude):
+    """
+    Выражение sin²(Δφ/2) + cos φ1 · cos φ2 · sin²(Δλ/2) для точки и координат
+    объявления. Расстояние d ≤ r равносильно значению ≤ sin²(r / 2R), поэтому
+    asin и sqrt в запросе не нужны.
+    """
+    lat = Radians(F("latitude"))
+    lng = Radians(F("longitude"))
+    return (
+        Power(Sin((lat - math.radians(latitude)) / 2), 2)
+        + math.cos(math.radians(latitude)) * Cos(lat) * Power(Sin((lng - math.radians(longitude)) / 2), 2)
+    )
+
+
+def filter_near(queryset, latitude, longitude, radius_km):
+    """Объявления не дальше radius_km от точки: диапазоны geohash по индексу, затем гаверсинус."""
+    ranges = [
+        Q(geohash__gte=start, geohash__lt=end) if end else Q(geohash__gte=start)
+        for start, end in cell_ranges(covering_cells(latitude, longitude, radius_km))
+    ]
+    limit = math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2) ** 2
+    return queryset.filter(reduce(or_, ranges)).alias(
+        haversine=haversine(latitude, longitude)
+    ).filter(haversine__lte=limit)
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory, override_settings
+
+from rente.benchmarks import benchmark_database, percentiles, format_timings, wsgi_load
+from rente.benchmarks.data import create_listings, get_landlord
+from rente.tokens import RoleRefreshToken
+
+QUERY_STRING = "location=Berlin&page_size=20"
+
+
+class Command(BaseCommand):
+    help = (
+        "Пропускная способность списка объявлений при CONCURRENCY одновременных соединениях: "
+        "WSGI (пул потоков) против ASGI (sync- и async-представление)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=5000)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=16, help="Потоков WSGI-сервера")
+        parser.add_argument(
+            "--latency-ms", type=float, default=0,
+            help="Задержка каждого SQL-запроса, имитирует удалённую БД",
+        )
+
+    def handle(self, *args, **options):
+        latency = options["latency_ms"] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            connection.execute_wrappers.append(slow_query)
+
+        with benchmark_database(), override_settings(
+            ALLOWED_HOSTS=["*"], LISTING_RESPONSE_CACHE={"ENABLED": False}
+        ):
+            create_listings(options["listings"])
+            access = str(RoleRefreshToken.for_user(get_landlord()).access_token)
+            cookie = f"access_token={access}"
+            connection.close()
+            if latency:
+                connection_created.connect(add_latency)
+            try:
+                runs = (
+                    ("wsgi sync", self.run_wsgi, "/api/listings/"),
+                    ("asgi sync", self.run_asgi, "/api/listings/"),
+                    ("asgi async", self.run_asgi, "/api/async/listings/"),
+                )
+                for name, run, path in runs:
+                    started = time.perf_counter()
+                    timings, statuses = run(path, cookie, options)
+                    elapsed = time.perf_counter() - started
+                    errors = sum(status != 200 for status in statuses)
+                    self.stdout.write(
+                        f"{name:10} {len(timings) / elapsed:8.0f} req/s errors={errors} "
+                        f"{format_timings(percentiles(timings))}"
+                    )
+            finally:
+                connection_created.disconnect(add_latency)
+
+    def run_wsgi(self, path, cookie, options):
+        handler = WSGIHandler()
+        environ = RequestFactory()._base_environ(PATH_INFO=path, QUERY_STRING=QUERY_STRING, HTTP_COOKIE=cookie)
+        return wsgi_load(handler, environ, options["requests"], options["threads"], options["concurrency"])
+
+    def run_asgi(self, path, cookie, options):
+        handler = ASGIHandler()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": QUERY_STRING.encode(),
+            "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode())],
+            "client": ("127.0.0.1", 0),
+            "server": ("testserver", 80),
+        }
+
+        async def request(semaphore):
+            async with semaphore:
+                started = time.perf_counter()
+                messages = []
+                inbox = asyncio.Queue()
+                inbox.put_nowait({"type": "http.request", "body": b"", "more_body": False})
+
+                async def send(message):
+                    messages.append(message)
+                    if message["type"] == "http.response.body" and not message.get("more_body"):
+                        inbox.put_nowait({"type": "http.disconnect"})
+
+                await handler(dict(scope), inbox.get, send)
+                return (time.perf_counter() - started) * 1000, messages[0]["status"]
+
+        async def run():
+            semaphore = asyncio.Semaphore(options["concurrency"])
+            return await asyncio.gather(*(request(semaphore) for _ in range(options["requests"])))
+
+        results = asyncio.run(run())
+        return [timing for timing, _ in results], [status for _, status in results]
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from rente.authentication import CachedJWTAuthentication, token_user_cache
+from rente.benchmarks import benchmark_database, measure
+from rente.benchmarks.data import get_landlord
+from rente.middleware import JWTAuthenticationMiddleware
+from rente.tokens import RoleRefreshToken
+
+
+class Command(BaseCommand):
+    help = "Накладные расходы JWTAuthenticationMiddleware и JWT-аутентификации DRF на запрос"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        middleware = JWTAuthenticationMiddleware(lambda request: None)
+
+        with benchmark_database():
+            landlord = get_landlord()
+            access = str(RefreshToken.for_user(landlord).access_token)
+            # Токен с ролью и полями пользователя: пользователь собирается без БД
+            claims_access = str(RoleRefreshToken.for_user(landlord).access_token)
+            token_user_cache.clear()
+
+            runs = (
+                ("stock", JWTAuthentication, access),
+                ("cached", CachedJWTAuthentication, access),
+                ("claims", CachedJWTAuthentication, claims_access),
+            )
+            for name, authentication, access in runs:
+                def run():
+                    for _ in range(options["requests"]):
+                        request = factory.get("/api/listings/")
+                        request.COOKIES["access_token"] = access
+                        middleware.process_request(request)
+                        Request(request, authenticators=[authentication()]).user
+
+                with CaptureQueriesContext(connection) as queries:
+                    timings = measure(run, repeat=options["repeat"])
+                per_request = {key: value * 1000 / options["requests"] for key, value in timings.items()}
+                self.stdout.write(
+                    f"{name:7} per request: "
+                    + " ".join(f"{key}={value:.1f}us" for key, value in per_request.items())
+                    + f" queries={len(queries) / options['repeat'] / options['requests']:.2f}"
+                )
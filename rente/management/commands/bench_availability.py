@@ -0,0 +1,67 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from rente.availability import overlapping_bookings, occupancy_calendar, rebuild_occupancy
+from rente.benchmarks import benchmark_database, measure, format_timings
+from rente.benchmarks.data import create_listings, get_landlord
+from rente.models import Listing, Booking
+
+
+def naive_calendar(listing_id, start_date, end_date):
+    """Календарь из самих бронирований — то, что заменяют битовые строки."""
+    occupied = set()
+    for start, end in overlapping_bookings(listing_id, start_date, end_date).values_list("start_date", "end_date"):
+        day = max(start, start_date)
+        while day <= min(end, end_date):
+            occupied.add(day)
+            day += timedelta(days=1)
+    return occupied
+
+
+class Command(BaseCommand):
+    help = "Замер календаря занятости за год для объявлений с тысячами бронирований"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=50)
+        parser.add_argument("--bookings", type=int, default=3000, help="бронирований на объявление")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with benchmark_database():
+            create_listings(options["listings"])
+            tenant = get_landlord("bench_tenant")
+            listing_ids = list(Listing.objects.values_list("pk", flat=True))
+
+            # Короткие непересекающиеся бронирования подряд, начиная с 2000 года
+            for listing_id in listing_ids:
+                day = date(2000, 1, 1)
+                bookings = []
+                for _ in range(options["bookings"]):
+                    day += timedelta(days=rng.randint(0, 3))
+                    end = day + timedelta(days=rng.randint(1, 5))
+                    bookings.append(Booking(
+                        listing_id=listing_id, tenant=tenant, start_date=day, end_date=end,
+                        status=rng.choice(Booking.Status.values),
+                    ))
+                    day = end + timedelta(days=1)
+                Booking.objects.bulk_create(bookings)
+
+            started = time.perf_counter()
+            rebuild_occupancy()
+            self.stdout.write(
+                f"rebuild: {len(listing_ids)} listings x {options['bookings']} bookings "
+                f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+            )
+
+            start_date, end_date = date(2010, 1, 1), date(2010, 12, 31)
+            calendars = {
+                "bookings": lambda: naive_calendar(rng.choice(listing_ids), start_date, end_date),
+                "bitmap": lambda: occupancy_calendar(rng.choice(listing_ids), start_date, end_date),
+            }
+            for name, run in calendars.items():
+                timings = measure(run, repeat=options["repeat"])
+                self.stdout.write(f"  1-year calendar {name:8} {format_timings(timings)}")
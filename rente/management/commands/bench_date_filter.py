@@ -0,0 +1,52 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from rente.availability import exclude_booked
+from rente.benchmarks import benchmark_database, measure, format_timings
+from rente.benchmarks.data import create_listings, get_landlord, random_period
+from rente.models import Listing, Booking
+
+
+class Command(BaseCommand):
+    help = "Замер фильтра check_in/check_out при росте числа бронирований"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=100_000)
+        parser.add_argument("--bookings", type=int, nargs="+", default=[250_000, 500_000, 1_000_000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        with benchmark_database():
+            create_listings(options["listings"])
+            tenant = get_landlord("bench_tenant")
+            listing_ids = list(Listing.objects.values_list("pk", flat=True))
+
+            created = 0
+            for total in sorted(options["bookings"]):
+                # Пересечения допускаются: важен объём таблицы, а не её корректность
+                while created < total:
+                    size = min(10_000, total - created)
+                    Booking.objects.bulk_create(
+                        Booking(
+                            listing_id=rng.choice(listing_ids), tenant=tenant,
+                            status=rng.choice(Booking.Status.values),
+                            **dict(zip(("start_date", "end_date"), random_period(rng))),
+                        )
+                        for _ in range(size)
+                    )
+                    created += size
+
+                def run():
+                    check_in, check_out = random_period(rng, max_length=7)
+                    queryset = exclude_booked(
+                        Listing.objects.filter(is_active=True, rooms=2), check_in, check_out
+                    )
+                    queryset.count()
+                    list(queryset.values_list("pk", flat=True)[:20])
+
+                timings = measure(run, repeat=options["repeat"])
+                self.stdout.write(
+                    f"{options['listings']} listings x {total} bookings: {format_timings(timings)}"
+                )
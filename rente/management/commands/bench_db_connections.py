@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+
+from rente.benchmarks import benchmark_database, percentiles, format_timings, wsgi_load
+from rente.benchmarks.data import create_listings, get_landlord
+from rente.models import Listing
+from rente.tokens import RoleRefreshToken
+
+
+class Command(BaseCommand):
+    help = "Запросы в секунду с новым соединением на каждый запрос и с постоянными соединениями"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=1000)
+        parser.add_argument("--requests", type=int, default=3000)
+        parser.add_argument("--threads", type=int, default=8)
+
+    def handle(self, *args, **options):
+        modes = [
+            ("per-request", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}),
+            ("persistent", {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True}),
+        ]
+        if connection.vendor == "sqlite":
+            modes += [
+                (f"{name} wal", {**mode, "OPTIONS": settings.SQLITE_PRODUCTION_OPTIONS})
+                for name, mode in modes
+            ]
+
+        with benchmark_database(), override_settings(
+            ALLOWED_HOSTS=["*"], LISTING_RESPONSE_CACHE={"ENABLED": False}
+        ):
+            create_listings(options["listings"])
+            listing = Listing.objects.earliest("pk")
+            access = str(RoleRefreshToken.for_user(get_landlord()).access_token)
+            environ = RequestFactory()._base_environ(
+                PATH_INFO=f"/api/listings/{listing.pk}/", HTTP_COOKIE=f"access_token={access}"
+            )
+            handler = WSGIHandler()
+            saved = {key: connection.settings_dict.get(key) for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")}
+            try:
+                for name, mode in modes:
+                    # Словарь настроек общий для соединений всех потоков
+                    connection.settings_dict.update({"OPTIONS": saved["OPTIONS"] or {}, **mode})
+                    connection.close()
+                    started = time.perf_counter()
+                    timings, statuses = wsgi_load(
+                        handler, environ, options["requests"], options["threads"], options["threads"]
+                    )
+                    elapsed = time.perf_counter() - started
+                    errors = sum(status != 200 for status in statuses)
+                    self.stdout.write(
+                        f"{name:16} {len(timings) / elapsed:8.0f} req/s errors={errors} "
+                        f"{format_timings(percentiles(timings))}"
+                    )
+            finally:
+                connection.settings_dict.update(saved)
+                connection.close()
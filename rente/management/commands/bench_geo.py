@@ -0,0 +1,48 @@
+import math
+import random
+
+from django.core.management.base import BaseCommand
+
+from rente.benchmarks import benchmark_database, measure, format_timings
+from rente.benchmarks.data import CITY_CENTERS, create_listings
+from rente.geo import EARTH_RADIUS_KM, filter_near, haversine
+from rente.models import Listing
+
+
+def full_scan(queryset, latitude, longitude, radius_km):
+    """Тот же гаверсинус без отбора по geohash: проверяется каждая строка."""
+    limit = math.sin(radius_km / EARTH_RADIUS_KM / 2) ** 2
+    return queryset.alias(haversine=haversine(latitude, longitude)).filter(haversine__lte=limit)
+
+
+class Command(BaseCommand):
+    help = "Поиск объявлений рядом с точкой: диапазоны geohash по индексу против полного перебора"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=1_000_000)
+        parser.add_argument("--radii", type=float, nargs="+", default=[1, 5, 20])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            create_listings(options["listings"])
+            queryset = Listing.objects.filter(is_active=True)
+            rng = random.Random(0)
+            points = [
+                (rng.gauss(latitude, 0.03), rng.gauss(longitude, 0.05))
+                for latitude, longitude in CITY_CENTERS.values()
+            ]
+            self.stdout.write(f"{options['listings']} listings")
+            self.stdout.write(filter_near(queryset, *points[0], 5).explain())
+
+            for radius in options["radii"]:
+                found = sum(filter_near(queryset, *point, radius).count() for point in points)
+                self.stdout.write(f"radius {radius:g} km, {found / len(points):.0f} listings per point")
+                for name, search in (("geohash", filter_near), ("full scan", full_scan)):
+                    timings = measure(
+                        lambda: [list(search(queryset, *point, radius).values_list("pk", flat=True)) for point in points],
+                        repeat=options["repeat"],
+                    )
+                    per_query = {key: value / len(points) for key, value in timings.items()}
+                    self.stdout.write(f"  {name:10} {format_timings(per_query)}")
+
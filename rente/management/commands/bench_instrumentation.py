@@ -0,0 +1,49 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from rente.benchmarks import benchmark_database
+from rente.benchmarks.data import create_listings, get_landlord
+from rente.metrics import registry
+from rente.models import Listing
+
+ENDPOINTS = ("/api/listings/", "/api/listings/?min_price=100&ordering=price_asc", "/api/listings/{pk}/")
+
+
+class Command(BaseCommand):
+    help = "Накладные расходы InstrumentationMiddleware: медиана времени запроса с метриками и без"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=1000)
+        parser.add_argument("--requests", type=int, default=300)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database(), override_settings(
+            ALLOWED_HOSTS=["*"], LISTING_RESPONSE_CACHE={"ENABLED": False}
+        ):
+            create_listings(options["listings"])
+            client = APIClient()
+            client.force_authenticate(get_landlord())
+            pk = Listing.objects.values_list("pk", flat=True).first()
+
+            for endpoint in ENDPOINTS:
+                url = endpoint.format(pk=pk)
+                timings = {False: [], True: []}
+                # Режимы чередуются, чтобы фоновый шум попадал в оба одинаково
+                for _ in range(options["rounds"]):
+                    for enabled in timings:
+                        with override_settings(INSTRUMENTATION={"ENABLED": enabled}):
+                            for _ in range(options["requests"]):
+                                started = time.perf_counter()
+                                client.get(url)
+                                timings[enabled].append((time.perf_counter() - started) * 1000)
+
+                off, on = statistics.median(timings[False]), statistics.median(timings[True])
+                self.stdout.write(
+                    f"{url:50} off={off:.3f}ms on={on:.3f}ms overhead={(on - off) / off * 100:+.2f}%"
+                )
+            registry.reset()
@@ -0,0 +1,91 @@
+import random
+from datetime import datetime, time as day_time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from rente.benchmarks import benchmark_database, measure, format_timings
+from rente.benchmarks.data import create_listings
+from rente.models import Listing, User, ViewHistory
+from rente.stats import listing_stats, rollup
+
+
+def create_views(count, days, listing_ids, user_ids, rng, batch_size=5000):
+    """count просмотров, равномерно по последним days дням; популярные объявления смотрят чаще."""
+    weights = [1 / rank for rank in range(1, len(listing_ids) + 1)]
+    today = timezone.localdate()
+    per_day = max(1, count // days)
+    for offset in range(days):
+        last_id = ViewHistory.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+        ViewHistory.objects.bulk_create([
+            ViewHistory(user_id=rng.choice(user_ids), listing_id=listing_id)
+            for listing_id in rng.choices(listing_ids, weights=weights, k=per_day)
+        ], batch_size=batch_size)
+        # viewed_at заполняется auto_now_add, дата просмотра ставится отдельно
+        viewed_at = timezone.make_aware(datetime.combine(today - timedelta(days=offset + 1), day_time(12)))
+        ViewHistory.objects.filter(pk__gt=last_id).update(viewed_at=viewed_at)
+
+
+def aggregate_views(listing_id, start_date, end_date):
+    """Просмотры по дням без статистики: по всей истории объявления."""
+    return list(
+        ViewHistory.objects.filter(listing_id=listing_id, viewed_at__date__gte=start_date, viewed_at__date__lte=end_date)
+        .annotate(day=TruncDate("viewed_at"))
+        .values("day")
+        .annotate(views=Count("pk"))
+        .order_by("day")
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Время инкрементального пересчёта статистики объявлений в зависимости от размера истории "
+        "и время ответа статистики по сравнению с агрегацией по ViewHistory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+        parser.add_argument("--increment", type=int, default=10_000, help="Новых просмотров между запусками")
+        parser.add_argument("--listings", type=int, default=1000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            create_listings(options["listings"])
+            listing_ids = list(Listing.objects.order_by("pk").values_list("pk", flat=True))
+            user_ids = [user.pk for user in User.objects.bulk_create(
+                User(username=f"bench_stats_{i}") for i in range(1000)
+            )]
+            rng = random.Random(0)
+            # Самое популярное объявление, последние 90 дней
+            listing_id = listing_ids[0]
+            end_date = timezone.localdate()
+            start_date = end_date - timedelta(days=90)
+
+            created = 0
+            for size in sorted(options["sizes"]):
+                create_views(size - created, options["days"], listing_ids, user_ids, rng)
+                created = size
+                self.stdout.write(f"{size} views, {len(listing_ids)} listings")
+
+                started = timezone.now()
+                rollup(lag=timedelta(0))
+                self.stdout.write(f"  catch-up rollup       {(timezone.now() - started).total_seconds() * 1000:.0f}ms")
+
+                # Новые просмотры за вчера: пересчёт читает только их
+                create_views(options["increment"], 1, listing_ids, user_ids, rng)
+                started = timezone.now()
+                processed = rollup(lag=timedelta(0))
+                self.stdout.write(
+                    f"  incremental rollup    {(timezone.now() - started).total_seconds() * 1000:.0f}ms, "
+                    f"{processed['views']} views"
+                )
+                created += options["increment"]
+
+                timings = measure(lambda: listing_stats(listing_id, start_date, end_date), repeat=options["repeat"])
+                self.stdout.write(f"  stats table           {format_timings(timings)}")
+                timings = measure(lambda: aggregate_views(listing_id, start_date, end_date), repeat=options["repeat"])
+                self.stdout.write(f"  aggregate history     {format_timings(timings)}")
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from rente.benchmarks import benchmark_database, measure, format_timings
+from rente.benchmarks.data import create_listings, get_landlord
+from rente.models import Listing, ViewHistory
+from rente.pagination import KeysetPagination
+
+
+class HistoryView:
+    keyset_ordering = ("-viewed_at", "-id")
+
+
+class Command(BaseCommand):
+    help = "Сравнивает OFFSET-пагинацию и пагинацию по ключу на глубоких страницах истории просмотров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 10_000])
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        total = max(options["pages"]) * page_size + page_size
+        factory = APIRequestFactory()
+
+        with benchmark_database():
+            create_listings(100)
+            user = get_landlord("bench_tenant")
+            listing_ids = list(Listing.objects.values_list("pk", flat=True))
+            for start in range(0, total, 10_000):
+                ViewHistory.objects.bulk_create(
+                    ViewHistory(user=user, listing_id=listing_ids[i % len(listing_ids)])
+                    for i in range(start, min(start + 10_000, total))
+                )
+            history = ViewHistory.objects.filter(user=user)
+            self.stdout.write(f"{total} history rows")
+
+            for page in sorted(options["pages"]):
+                def offset_page():
+                    paginator = PageNumberPagination()
+                    paginator.page_size = page_size
+                    request = Request(factory.get("/api/views/", {"page": page}))
+                    paginator.paginate_queryset(history.order_by("-viewed_at", "-id"), request)
+
+                # Курсор страницы строится по последней строке предыдущей страницы
+                cursor_params = {"page_size": page_size}
+                if page > 1:
+                    keyset = KeysetPagination()
+                    keyset.keys = keyset.get_keys(history, HistoryView())
+                    previous_row = history.order_by("-viewed_at", "-id")[(page - 1) * page_size - 1]
+                    cursor_params["cursor"] = keyset.cursor_token({"k": keyset.key_of(previous_row)})
+
+                def keyset_page():
+                    paginator = KeysetPagination()
+                    request = Request(factory.get("/api/views/", cursor_params))
+                    paginator.paginate_queryset(history, request, HistoryView())
+
+                for name, run in (("offset", offset_page), ("keyset", keyset_page)):
+                    timings = measure(run, repeat=options["repeat"])
+                    self.stdout.write(f"  page {page:>6} {name:6} {format_timings(timings)}")
@@ -0,0 +1,54 @@
+import itertools
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from rente.benchmarks import benchmark_database, measure, format_timings
+from rente.benchmarks.data import create_listings, create_view_history
+from rente.models import Listing, User
+from rente.recommendations import build_neighbors, compute_neighbors, load_views, recommend, numpy
+
+
+class Command(BaseCommand):
+    help = "Время пересчёта похожих объявлений в зависимости от размера истории и время запроса рекомендаций"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+        parser.add_argument("--listings", type=int, default=5000)
+        parser.add_argument("--views-per-user", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        engines = {"python": False}
+        if numpy is not None:
+            engines["numpy"] = True
+        else:
+            self.stdout.write("NumPy не установлен, замер только для python")
+
+        with benchmark_database():
+            create_listings(options["listings"])
+            listing_ids = list(Listing.objects.values_list("pk", flat=True))
+            created, user_ids = 0, []
+            for size in sorted(options["sizes"]):
+                user_ids += create_view_history(
+                    size - created, (size - created) // options["views_per_user"], listing_ids, seed=created
+                )
+                created = size
+                self.stdout.write(f"{size} views, {len(user_ids)} users, {len(listing_ids)} listings")
+
+                started = time.perf_counter()
+                pairs = list(load_views())
+                self.stdout.write(f"  load history          {(time.perf_counter() - started) * 1000:.0f}ms, {len(pairs)} pairs")
+                for name, vectorized in engines.items():
+                    timings = measure(lambda: compute_neighbors(pairs, vectorized=vectorized), repeat=options["repeat"])
+                    self.stdout.write(f"  compute {name:13} {format_timings(timings)}")
+
+                started = time.perf_counter()
+                build_neighbors()
+                self.stdout.write(f"  full build            {(time.perf_counter() - started) * 1000:.0f}ms")
+
+                rng = random.Random(size)
+                users = itertools.cycle(User.objects.filter(pk__in=rng.sample(user_ids, min(50, len(user_ids)))))
+                timings = measure(lambda: recommend(next(users)), repeat=50)
+                self.stdout.write(f"  recommend             {format_timings(timings)}")
@@ -0,0 +1,53 @@
+import itertools
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from rente.benchmarks import benchmark_database
+from rente.benchmarks.data import create_listings, get_landlord
+from rente.cache import response_cache
+
+HOT_QUERIES = (
+    {},
+    {"location": "Berlin"},
+    {"min_price": 100, "max_price": 300, "ordering": "price_asc"},
+    {"rooms": 2, "property_type": "apartment"},
+    {"ordering": "rating"},
+)
+
+
+class Command(BaseCommand):
+    help = "Пропускная способность списка объявлений на повторяющихся запросах с кэшем и без"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--listings", type=int, default=10_000)
+        parser.add_argument("--requests", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        modes = {
+            "disabled": {"ENABLED": False},
+            "locmem": {"BACKEND": "locmem"},
+            "django": {"BACKEND": "django"},
+        }
+        with benchmark_database():
+            create_listings(options["listings"])
+            client = APIClient()
+            client.force_authenticate(get_landlord())
+
+            for mode, cache_settings in modes.items():
+                with override_settings(LISTING_RESPONSE_CACHE=cache_settings, ALLOWED_HOSTS=["*"]):
+                    response_cache.hits = response_cache.misses = 0
+                    response_cache.bump()
+                    queries = itertools.cycle(HOT_QUERIES)
+                    started = time.perf_counter()
+                    for _ in range(options["requests"]):
+                        client.get("/api/listings/", next(queries))
+                    elapsed = time.perf_counter() - started
+
+                stats = response_cache.stats()
+                self.stdout.write(
+                    f"{mode:8} {options['requests'] / elapsed:8.0f} req/s "
+                    f"hits={stats['hits']} misses={stats['misses']} hit_ratio={stats['hit_ratio']:.2f}"
+                )
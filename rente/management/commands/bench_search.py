@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from rente.benchmarks import benchmark_database, measure, format_timings
+from rente.benchmarks.data import create_listings
+from rente.models import Listing
+from rente.search import IContainsSearchBackend, get_search_backend
+
+# Частое слово, редкое слово, два слова, префикс
+QUERIES = ("квартира", "selrekun", "вид море", "bal")
+
+
+class Command(BaseCommand):
+    help = "Сравнивает поиск через icontains и полнотекстовый индекс"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            engines = {"icontains": IContainsSearchBackend(), "index": get_search_backend()}
+            created = 0
+            for size in sorted(options["sizes"]):
+                created += create_listings(size - created, seed=created)
+                engines["index"].rebuild()
+                self.stdout.write(f"{size} listings ({type(engines['index']).__name__})")
+
+                for query in QUERIES:
+                    for name, engine in engines.items():
+                        # Как при постраничном выводе: общее число совпадений и первая страница
+                        def run():
+                            queryset = engine.search(Listing.objects.filter(is_active=True), query)
+                            queryset.count()
+                            list(queryset.values_list("pk", flat=True)[:20])
+
+                        timings = measure(run, repeat=options["repeat"])
+                        self.stdout.write(f"  q={query!r:16} {name:10} {format_timings(timings)}")
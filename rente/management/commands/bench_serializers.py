@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from rente.benchmarks import benchmark_database, measure, format_timings
+from rente.benchmarks.data import create_listings
+from rente.fast_serializers import ValuesSerializer
+from rente.models import Listing
+from rente.serializers import ListingSerializer
+
+
+class Command(BaseCommand):
+    help = "Время сериализации 1000 объявлений: ModelSerializer и ValuesSerializer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            create_listings(options["count"])
+            queryset = Listing.objects.filter(is_active=True).select_related("owner")[:options["count"]]
+            values_serializer = ValuesSerializer(ListingSerializer)
+            instances = list(queryset)
+            rows = list(values_serializer.values(queryset))
+
+            runs = {
+                # Только сериализация уже загруженных строк
+                "serialize ModelSerializer": lambda: ListingSerializer(instances, many=True).data,
+                "serialize ValuesSerializer": lambda: values_serializer.serialize(rows),
+                # Запрос и сериализация
+                "query+serialize ModelSerializer": lambda: ListingSerializer(list(queryset), many=True).data,
+                "query+serialize ValuesSerializer": lambda: values_serializer.serialize(
+                    values_serializer.values(queryset)
+                ),
+            }
+            self.stdout.write(f"{options['count']} listings")
+            for name, run in runs.items():
+                self.stdout.write(f"  {name:34} {format_timings(measure(run, repeat=options['repeat']))}")
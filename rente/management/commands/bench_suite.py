@@ -0,0 +1,144 @@
+import json
+import socket
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from rente.benchmarks import benchmark_database
+from rente.benchmarks.factories import create_dataset
+from rente.benchmarks.http import run_http
+from rente.benchmarks.scenarios import SCENARIOS, ScenarioContext, build_requests, run_client, summarize
+from rente.buffers import view_counter, search_log
+
+DRIVERS = ("client", "http")
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def setup(self):
+        super().setup()
+        # Заголовки и тело уходят отдельными send: без TCP_NODELAY ответ ждёт delayed ACK (~40 мс)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = (
+        "Сценарии нагрузки на синтетическом наборе данных через тестовый клиент и HTTP "
+        "из нескольких процессов; результат в JSON, сравнение с прошлым прогоном"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=float, default=1.0, help="Масштаб набора данных (factories.SCALE)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--requests", type=int, default=500, help="Запросов на сценарий и драйвер")
+        parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument("--drivers", nargs="+", choices=DRIVERS, default=list(DRIVERS))
+        parser.add_argument("--processes", type=int, default=4, help="Процессов HTTP-драйвера")
+        parser.add_argument("--output", help="Записать результат в JSON-файл")
+        parser.add_argument("--compare", help="JSON прошлого прогона: сравнить и упасть при регрессии")
+        parser.add_argument(
+            "--max-regression", type=float, default=10,
+            help="Допустимый рост p50 и падение пропускной способности, %%",
+        )
+
+    def handle(self, *args, **options):
+        report = {
+            "commit": git_commit(),
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "scale": options["scale"],
+            "seed": options["seed"],
+            "results": [],
+        }
+        with benchmark_database(), override_settings(ALLOWED_HOSTS=["*"]):
+            started = time.perf_counter()
+            report["dataset"] = create_dataset(options["scale"], options["seed"])
+            self.stdout.write(f"dataset {report['dataset']} за {time.perf_counter() - started:.1f}s")
+            context = ScenarioContext()
+
+            server = None
+            if "http" in options["drivers"]:
+                server = ThreadedWSGIServer(("127.0.0.1", 0), QuietRequestHandler)
+                server.set_app(get_internal_wsgi_application())
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                for scenario in options["scenarios"]:
+                    for driver in options["drivers"]:
+                        requests = build_requests(
+                            scenario, context, options["requests"], seed=f"{options['seed']}:{driver}"
+                        )
+                        result = self.run(driver, requests, server, options)
+                        result = summarize(scenario, driver, *result)
+                        report["results"].append(result)
+                        self.write_result(result)
+            finally:
+                if server is not None:
+                    server.shutdown()
+                    server.server_close()
+                # Буферы просмотров и поиска пишутся в БД замера, пока она существует
+                view_counter.flush()
+                search_log.flush()
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options["compare"]:
+            self.compare(report, options["compare"], options["max_regression"])
+
+    def run(self, driver, requests, server, options):
+        """(задержки в мс, статусы, время прогона в секундах)"""
+        if driver == "http":
+            host, port = server.server_address
+            return run_http(f"http://{host}:{port}", requests, options["processes"])
+        started = time.perf_counter()
+        timings, statuses = run_client(requests)
+        return timings, statuses, time.perf_counter() - started
+
+    def write_result(self, result):
+        latency = " ".join(f"{name}={value:.2f}ms" for name, value in result["latency_ms"].items())
+        style = self.style.ERROR if result["errors"] else self.style.SUCCESS
+        self.stdout.write(
+            f"{result['scenario']:15} {result['driver']:7} {result['throughput_rps']:8.1f} req/s "
+            f"{latency} " + style(f"errors={result['errors']}")
+        )
+
+    def compare(self, report, path, max_regression):
+        with open(path) as file:
+            baseline = {(result["scenario"], result["driver"]): result for result in json.load(file)["results"]}
+
+        regressions = []
+        self.stdout.write(f"Сравнение с {path}:")
+        for result in report["results"]:
+            old = baseline.get((result["scenario"], result["driver"]))
+            if old is None:
+                continue
+            latency = (result["latency_ms"]["p50"] / old["latency_ms"]["p50"] - 1) * 100
+            throughput = (result["throughput_rps"] / old["throughput_rps"] - 1) * 100
+            regressed = latency > max_regression or throughput < -max_regression
+            style = self.style.ERROR if regressed else self.style.SUCCESS
+            self.stdout.write(style(
+                f"  {result['scenario']:15} {result['driver']:7} p50 {latency:+.1f}% throughput {throughput:+.1f}%"
+            ))
+            if regressed:
+                regressions.append(f"{result['scenario']}/{result['driver']}")
+        if regressions:
+            raise CommandError(f"Регрессия больше {max_regression}%: {', '.join(regressions)}")
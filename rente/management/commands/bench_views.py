@@ -0,0 +1,77 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from rente.benchmarks import benchmark_database, percentiles, format_timings
+from rente.benchmarks.data import create_listings, get_landlord
+from rente.buffers import view_counter
+from rente.models import Listing, ViewHistory
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный тест POST /api/listings/{id}/view/: задержки и потерянные просмотры"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=200, help="запросов на поток")
+        parser.add_argument("--listings", type=int, default=10)
+
+    def handle(self, *args, **options):
+        modes = {
+            "sync": {"BACKGROUND": False},
+            "buffered": {"BACKGROUND": True, "BATCH_SIZE": 500, "FLUSH_INTERVAL_MS": 1000},
+        }
+        with benchmark_database():
+            create_listings(options["listings"])
+            user = get_landlord("bench_tenant")
+            listing_ids = list(Listing.objects.values_list("pk", flat=True))
+
+            for mode, counter_settings in modes.items():
+                Listing.objects.update(views_count=0)
+                ViewHistory.objects.all().delete()
+                with override_settings(VIEW_COUNTER=counter_settings, ALLOWED_HOSTS=["*"]):
+                    timings, errors = self.load(user, listing_ids, options)
+                    view_counter.flush()
+
+                expected = options["threads"] * options["requests"] - errors
+                counted = Listing.objects.aggregate(total=Sum("views_count"))["total"]
+                self.stdout.write(
+                    f"{mode:8} {format_timings(percentiles(timings))} errors={errors} "
+                    f"views={counted}/{expected} history={ViewHistory.objects.count()}/{expected}"
+                )
+
+    def load(self, user, listing_ids, options):
+        timings, errors = [], []
+        barrier = threading.Barrier(options["threads"])
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                for _ in range(options["requests"]):
+                    started = time.perf_counter()
+                    try:
+                        response = client.post(f"/api/listings/{rng.choice(listing_ids)}/view/")
+                        ok = response.status_code == 200
+                    except Exception:
+                        ok = False
+                    timings.append((time.perf_counter() - started) * 1000)
+                    if not ok:
+                        errors.append(1)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, len(errors)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from rente.recommendations import build_neighbors, TOP_K, MAX_ITEMS_PER_USER
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает похожие объявления (ListingNeighbor) по истории просмотров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=TOP_K)
+        parser.add_argument("--max-items-per-user", type=int, default=MAX_ITEMS_PER_USER)
+
+    def handle(self, *args, **options):
+        processed = build_neighbors(top_k=options["top_k"], max_items_per_user=options["max_items_per_user"])
+        self.stdout.write(self.style.SUCCESS(f"Объявлений с соседями: {processed}"))
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Exists, OuterRef
+from django.utils.timezone import now
+
+from rente.models import SearchHistory
+
+
+class Command(BaseCommand):
+    help = (
+        "Сжимает историю поиска: удаляет повторы запросов, записи старше --days "
+        "и оставляет каждому пользователю не больше --keep последних записей"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", type=int, default=200)
+        parser.add_argument("--days", type=int, default=365)
+
+    def handle(self, *args, **options):
+        expired, _ = SearchHistory.objects.filter(
+            searched_at__lt=now() - timedelta(days=options["days"])
+        ).delete()
+
+        # Повторяющийся запрос пользователя: остаётся только самая новая запись
+        newer = SearchHistory.objects.filter(
+            user_id=OuterRef("user_id"), query=OuterRef("query"), id__gt=OuterRef("id")
+        )
+        duplicates, _ = SearchHistory.objects.filter(Exists(newer)).delete()
+
+        capped = 0
+        overflowing = (
+            SearchHistory.objects.values("user_id")
+            .annotate(total=Count("id"))
+            .filter(total__gt=options["keep"])
+            .values_list("user_id", flat=True)
+        )
+        for user_id in list(overflowing):
+            history = SearchHistory.objects.filter(user_id=user_id)
+            boundary = history.order_by("-searched_at", "-id").values_list("searched_at", "id")[options["keep"] - 1]
+            deleted, _ = history.filter(searched_at__lte=boundary[0]).exclude(
+                searched_at=boundary[0], id__gte=boundary[1]
+            ).delete()
+            capped += deleted
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Удалено: устаревших {expired}, повторов {duplicates}, сверх лимита {capped}"
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from rente.bulk import FORMATS, EXPORT_FIELDS, export_rows
+from rente.models import Listing
+from rente.renderers import NDJSONRenderer, CSVRenderer
+
+RENDERERS = {"ndjson": NDJSONRenderer, "csv": CSVRenderer}
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка объявлений в NDJSON или CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="ndjson")
+        parser.add_argument("--owner", help="Только объявления этого пользователя")
+        parser.add_argument("--output", help="Файл; по умолчанию stdout")
+
+    def handle(self, *args, **options):
+        queryset = Listing.objects.all()
+        if options["owner"]:
+            queryset = queryset.filter(owner__username=options["owner"])
+
+        chunks = RENDERERS[options["format"]]().stream(export_rows(queryset), EXPORT_FIELDS)
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(options["output"], "w", encoding="utf-8", newline="") as output:
+            output.writelines(chunks)
@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rente.bulk import FORMATS, read_rows, import_listings
+from rente.models import User
+
+
+class Command(BaseCommand):
+    help = "Импорт объявлений арендодателя из файла NDJSON или CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--owner", required=True, help="Имя пользователя арендодателя")
+        parser.add_argument("--format", choices=FORMATS, help="По умолчанию — по расширению файла")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        format = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+        try:
+            owner = User.objects.get(username=options["owner"], role=User.Role.LANDLORD)
+        except User.DoesNotExist:
+            raise CommandError(f"Арендодатель {options['owner']} не найден")
+
+        with path.open("rb") as lines:
+            report = import_listings(read_rows(lines, format), owner, chunk_size=options["chunk_size"])
+
+        for error in report["errors"]:
+            self.stderr.write(f"строка {error['line']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано объявлений: {report['created']}, строк с ошибками: {report['failed']}"
+        ))
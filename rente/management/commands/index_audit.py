@@ -0,0 +1,117 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from rente.models import User
+from rente.pagination import KeysetPagination
+from rente.views import (
+    ListingViewSet, BookingViewSet, ReviewViewSet, ViewHistoryViewSet, SearchHistoryViewSet
+)
+
+PAGE_2 = KeysetPagination().cursor_token({"k": ["2030-01-01T00:00:00+00:00", 1]})
+
+# (название, viewset, action, параметры запроса, kwargs) — запросы, которые выполняют представления
+SHAPES = (
+    ("listings", ListingViewSet, "list", {}, {}),
+    ("listings page 2", ListingViewSet, "list", {"cursor": PAGE_2}, {}),
+    ("listings by price", ListingViewSet, "list", {"min_price": 100, "max_price": 300, "ordering": "price_asc"}, {}),
+    ("listings by type and rooms", ListingViewSet, "list", {"property_type": "apartment", "rooms": 2}, {}),
+    ("listings by rooms", ListingViewSet, "list", {"rooms": 2}, {}),
+    ("listings by rating", ListingViewSet, "list", {"min_rating": 4, "ordering": "rating"}, {}),
+    ("listings by location", ListingViewSet, "list", {"location": "Berlin"}, {}),
+    ("listings free on dates", ListingViewSet, "list", {"check_in": "2030-07-10", "check_out": "2030-07-17"}, {}),
+    ("listing", ListingViewSet, "retrieve", {}, {"pk": 1}),
+    ("bookings", BookingViewSet, "list", {}, {}),
+    ("reviews", ReviewViewSet, "list", {}, {"listing_pk": 1}),
+    ("view history", ViewHistoryViewSet, "list", {}, {}),
+    ("search history", SearchHistoryViewSet, "list", {}, {}),
+)
+
+
+def sqlite_full_scans(plan):
+    # "SCAN rente_listing" без "USING ... INDEX" — чтение всей таблицы
+    return re.findall(r"\bSCAN (\w+)(?: AS \w+)?$", plan, re.MULTILINE)
+
+
+def mysql_full_scans(plan):
+    tables = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if node.get("access_type") == "ALL":
+                tables.append(node.get("table_name"))
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(json.loads(plan))
+    return tables
+
+
+def postgresql_full_scans(plan):
+    return re.findall(r"Seq Scan on (\w+)", plan)
+
+
+FULL_SCANS = {
+    "sqlite": (sqlite_full_scans, {}),
+    "mysql": (mysql_full_scans, {"format": "json"}),
+    "postgresql": (postgresql_full_scans, {}),
+}
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN для запросов представлений: какие из них читают таблицу целиком"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose-plans", action="store_true", help="Печатать планы целиком")
+        parser.add_argument("--fail", action="store_true", help="Ошибка, если найдено полное сканирование")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in FULL_SCANS:
+            raise CommandError(f"EXPLAIN для {connection.vendor} не поддерживается")
+        full_scans, explain_options = FULL_SCANS[connection.vendor]
+
+        found = 0
+        for name, querysets in self.query_shapes():
+            for query_name, queryset in querysets:
+                plan = queryset.explain(**explain_options)
+                tables = full_scans(plan)
+                found += bool(tables)
+                status = f"FULL SCAN {', '.join(tables)}" if tables else "ok"
+                style = self.style.WARNING if tables else self.style.SUCCESS
+                self.stdout.write(f"{name} [{query_name}]: " + style(status))
+                if options["verbose_plans"]:
+                    self.stdout.write(plan)
+
+        self.stdout.write(f"Запросов с полным сканированием: {found}")
+        if found and options["fail"]:
+            raise CommandError("Найдены запросы с полным сканированием таблиц")
+
+    def query_shapes(self):
+        """Запросы страницы и подсчёта в том виде, в каком их строят viewset'ы и пагинатор."""
+        factory = RequestFactory()
+        user = User(pk=1)
+        for name, viewset, action, params, kwargs in SHAPES:
+            request = Request(factory.get("/", params))
+            request.user = user
+            view = viewset(request=request, action=action, kwargs=kwargs, format_kwarg=None)
+            queryset = view.get_queryset()
+
+            if action == "retrieve":
+                yield name, [("object", queryset.filter(pk=kwargs["pk"]))]
+                continue
+
+            pagination = view.paginator
+            if not isinstance(pagination, KeysetPagination):
+                yield name, [("page", queryset)]
+                continue
+            querysets = [("page", pagination.prepare(queryset, request, view))]
+            if pagination.approximate_count:
+                querysets.append(("count", queryset[:pagination.count_limit + 1]))
+            yield name, querysets
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from rente.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает количество отзывов и средний рейтинг объявлений"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        processed = rebuild_ratings(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Обновлено объявлений: {processed}"))
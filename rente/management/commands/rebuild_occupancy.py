@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from rente.availability import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = "Пересобирает календари занятости объявлений из бронирований"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        processed = rebuild_occupancy(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Обновлено объявлений: {processed}"))
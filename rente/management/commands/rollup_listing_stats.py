@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from rente.stats import rollup, reset_stats, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Досчитывает статистику объявлений по дням (ListingDailyStats) по новым просмотрам и бронированиям"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Удалить статистику и посчитать заново (после загрузки данных через bulk_create)",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            reset_stats()
+        processed = rollup(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Просмотров: {processed['views']}, бронирований: {processed['bookings']}, "
+            f"пересчитано периодов: {processed['invalidations']}"
+        ))
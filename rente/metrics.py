@@ -0,0 +1,226 @@
+"""
+Метрики запросов по маршрутам (rente.middleware.InstrumentationMiddleware):
+общее время, число и время SQL-запросов, время сериализации.
+
+Значения копятся в гистограммах в памяти процесса и отдаются в текстовом
+формате Prometheus (summary с квантилями). Медленные запросы можно писать
+в лог вместе со списком SQL, повторяющиеся запросы отмечаются.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Статистика текущего запроса; через sync_to_async попадает и в потоки
+_current = ContextVar("request_metrics", default=None)
+
+defaults = {"ENABLED": True, "SLOW_REQUEST_MS": 0, "QUANTILES": (0.5, 0.9, 0.99)}
+
+
+def metrics_options():
+    return {**defaults, **getattr(settings, "INSTRUMENTATION", {})}
+
+
+class Histogram:
+    """
+    Гистограмма в духе HDR: корзины растут степенями двойки, каждая степень
+    делится на SUB_BUCKETS частей, относительная погрешность не больше 1/32.
+    Значения — неотрицательные целые (микросекунды, штуки).
+    """
+
+    SUB_BUCKETS = 32
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def bucket(cls, value):
+        if value < cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BUCKETS.bit_length()
+        return cls.SUB_BUCKETS * (shift + 1) + (value >> shift) - cls.SUB_BUCKETS
+
+    @classmethod
+    def upper_bound(cls, bucket):
+        """Наибольшее значение, попадающее в корзину."""
+        if bucket < cls.SUB_BUCKETS:
+            return bucket
+        shift = bucket // cls.SUB_BUCKETS - 1
+        return ((bucket % cls.SUB_BUCKETS + cls.SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, value):
+        self.buckets[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.upper_bound(bucket), self.max)
+        return self.max
+
+
+# (имя метрики, ключ значения, описание, множитель для вывода)
+METRICS = (
+    ("rente_request_duration_seconds", "duration", "Время обработки запроса", 1e-6),
+    ("rente_sql_duration_seconds", "sql_duration", "Время SQL-запросов за запрос", 1e-6),
+    ("rente_sql_queries", "sql_queries", "Число SQL-запросов за запрос", 1),
+    ("rente_serializer_duration_seconds", "serializer_duration", "Время сериализации за запрос", 1e-6),
+)
+
+
+class MetricsRegistry:
+    """Гистограммы METRICS по маршрутам ("ListingViewSet.list")."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, route, values):
+        with self._lock:
+            histograms = self.routes.get(route)
+            if histograms is None:
+                histograms = self.routes[route] = {key: Histogram() for _, key, _, _ in METRICS}
+            for key, value in values.items():
+                histograms[key].record(value)
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+    def prometheus_text(self):
+        quantiles = metrics_options()["QUANTILES"]
+        with self._lock:
+            lines = []
+            for name, key, description, scale in METRICS:
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} summary"]
+                for route, histograms in sorted(self.routes.items()):
+                    histogram = histograms[key]
+                    label = route.replace("\\", "\\\\").replace('"', '\\"')
+                    for q in quantiles:
+                        lines.append(f'{name}{{route="{label}",quantile="{q}"}} {histogram.quantile(q) * scale:g}')
+                    lines.append(f'{name}_sum{{route="{label}"}} {histogram.total * scale:g}')
+                    lines.append(f'{name}_count{{route="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetrics:
+    """Счётчики одного запроса; SQL-тексты собираются, только если нужен лог медленных."""
+
+    __slots__ = ("started", "sql_queries", "sql_duration", "serializer_duration", "statements")
+
+    def __init__(self, keep_statements=False):
+        self.started = time.perf_counter_ns()
+        self.sql_queries = 0
+        self.sql_duration = 0
+        self.serializer_duration = 0
+        self.statements = [] if keep_statements else None
+
+
+@contextmanager
+def measure_request(keep_statements=False):
+    metrics = RequestMetrics(keep_statements)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def record_sql(execute, sql, params, many, context):
+    """execute_wrapper для всех соединений: время и текст запроса в статистику текущего запроса."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter_ns()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_duration += time.perf_counter_ns() - started
+        metrics.sql_queries += 1
+        if metrics.statements is not None:
+            metrics.statements.append(sql)
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+@contextmanager
+def serializer_timer():
+    """Время блока считается временем сериализации текущего запроса."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        metrics.serializer_duration += time.perf_counter_ns() - started
+
+
+def install():
+    """Подключает сбор SQL ко всем соединениям."""
+    connection_created.connect(install_sql_wrapper, dispatch_uid="rente.metrics.record_sql")
+
+
+def route_name(request):
+    """ViewSet.action для DRF, имя представления для остальных."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    view = match.func
+    cls = getattr(view, "cls", None)
+    if cls is None:
+        return match.view_name or view.__qualname__
+    method = request.method.lower()
+    actions = getattr(view, "actions", None) or {}
+    return f"{cls.__name__}.{actions.get(method, method)}"
+
+
+def finish_request(request, metrics, slow_request_ms):
+    duration = (time.perf_counter_ns() - metrics.started) // 1000
+    route = route_name(request)
+    registry.record(route, {
+        "duration": duration,
+        "sql_duration": metrics.sql_duration // 1000,
+        "sql_queries": metrics.sql_queries,
+        "serializer_duration": metrics.serializer_duration // 1000,
+    })
+    if slow_request_ms and duration >= slow_request_ms * 1000:
+        log_slow_request(request, route, duration, metrics)
+
+
+def log_slow_request(request, route, duration, metrics):
+    statements = Counter(metrics.statements or ())
+    lines = [
+        f"{count}x {'DUPLICATE ' if count > 1 else ''}{sql}"
+        for sql, count in sorted(statements.items(), key=lambda item: -item[1])
+    ]
+    logger.warning(
+        "Медленный запрос %s %s (%s): %.1fms, SQL %d за %.1fms, сериализация %.1fms, повторов SQL: %d\n%s",
+        request.method, request.path, route, duration / 1000,
+        metrics.sql_queries, metrics.sql_duration / 1e6, metrics.serializer_duration / 1e6,
+        sum(count - 1 for count in statements.values()), "\n".join(lines),
+    )
@@ -1,54 +1,94 @@
 import datetime
 
-from django.utils.deprecation import MiddlewareMixin
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import TokenError
 
+from .metrics import metrics_options, measure_request, finish_request
+from .replicas import replica_options
+from .tokens import RoleRefreshToken, refresh_coalescer
+
+
+class JWTAuthenticationMiddleware:
+    """
+    Переносит JWT из cookie в заголовок Authorization и обновляет истёкший
+    access-токен. Проверенный токен сохраняется в request._jwt_access_token,
+    чтобы CachedJWTAuthentication не проверял его повторно.
+
+    Работает и в синхронном, и в асинхронном стеке: проверка access-токена
+    не обращается к БД и выполняется в event loop, в поток уходит только
+    обновление по refresh-токену (проверка чёрного списка).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.process_request(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        if not self.authorize_access_cookie(request):
+            await sync_to_async(self.refresh_from_cookie)(request)
+        response = await self.get_response(request)
+        return self.process_response(request, response)
 
-class JWTAuthenticationMiddleware(MiddlewareMixin):
     def process_request(self, request):
-        access_token = request.COOKIES.get('access_token')
-        refresh_token = request.COOKIES.get('refresh_token')
+        if not self.authorize_access_cookie(request):
+            self.refresh_from_cookie(request)
 
-        if access_token:
-            try:
-                token = AccessToken(access_token)
+    def authorize_access_cookie(self, request):
+        access_token = request.COOKIES.get('access_token')
+        if not access_token:
+            return False
 
-                if datetime.datetime.fromtimestamp(
-                    token['exp'], datetime.UTC
-                ) < datetime.datetime.now(tz=datetime.UTC):
-                    raise TokenError('Token expired')
+        try:
+            token = AccessToken(access_token)
 
-                request.META['HTTP_AUTHORIZATION'] = f"Bearer {access_token}"
-            except TokenError:
-                new_access_token = self.refresh_access_token(refresh_token)
+            if datetime.datetime.fromtimestamp(
+                token['exp'], datetime.UTC
+            ) < datetime.datetime.now(tz=datetime.UTC):
+                raise TokenError('Token expired')
+        except TokenError:
+            return False
 
-                if new_access_token:
-                    request.META['HTTP_AUTHORIZATION'] = f"Bearer {new_access_token}"
+        request.META['HTTP_AUTHORIZATION'] = f"Bearer {access_token}"
+        request._jwt_access_token = token
+        return True
 
-                    request._new_access_token = new_access_token
-                else:
-                    self.clear_cookies(request)
+    def refresh_from_cookie(self, request):
+        access_token = request.COOKIES.get('access_token')
+        refresh_token = request.COOKIES.get('refresh_token')
+        if not access_token and not refresh_token:
+            return
 
-        elif refresh_token:
-            new_access_token = self.refresh_access_token(refresh_token)
+        new_access_token = self.refresh_access_token(refresh_token)
 
-            if new_access_token:
-                request.META['HTTP_AUTHORIZATION'] = f"Bearer {new_access_token}"
-                request._new_access_token = new_access_token
-            else:
-                self.clear_cookies(request)
+        if new_access_token:
+            request.META['HTTP_AUTHORIZATION'] = f"Bearer {new_access_token}"
+            request._new_access_token = new_access_token
+            request._jwt_access_token = new_access_token
+        else:
+            self.clear_cookies(request)
 
     def process_response(self, request, response):
         new_access = getattr(request, '_new_access_token', None)
 
         if new_access:
-            access_exp = AccessToken(new_access)['exp']
+            access_exp = new_access['exp']
 
             response.set_cookie(
                 key='access_token',
-                value=new_access,
+                value=str(new_access),
                 httponly=True,
                 secure=False,
                 samesite='Lax',
@@ -61,13 +101,95 @@ class JWTAuthenticationMiddleware(MiddlewareMixin):
 
         return response
 
+    def clear_cookies(self, request):
+        request._clear_cookies = True
+
     def refresh_access_token(self, refresh_token):
+        if not refresh_token:
+            return None
         try:
-            refresh = RefreshToken(refresh_token)
+            refresh = RoleRefreshToken(refresh_token)
+        except TokenError:
+            return None
+        return refresh_coalescer.access_token_for(refresh)
 
-            new_access_token = str(refresh.access_token)
 
-            return new_access_token
+class PrimaryStickinessMiddleware:
+    """
+    После успешного изменяющего запроса ставит cookie READ_REPLICAS['COOKIE_NAME']
+    на STICKY_SECONDS: пока она есть, чтение пользователя идёт на primary
+    и он сразу видит свою запись, даже если реплика отстаёт. Ответы
+    buffered_write cookie не получают.
+    """
 
-        except TokenError:
-            return None
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        options = replica_options()
+        if (
+            options["ALIASES"]
+            and options["STICKY_SECONDS"]
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and not getattr(response, "buffered_write", False)
+        ):
+            response.set_cookie(
+                options["COOKIE_NAME"],
+                "1",
+                max_age=options["STICKY_SECONDS"],
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    Время запроса, число и время SQL, время сериализации по маршрутам
+    в rente.metrics.registry. С INSTRUMENTATION['SLOW_REQUEST_MS'] запросы
+    дольше порога пишутся в лог со списком SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        options = metrics_options()
+        if not options["ENABLED"]:
+            return self.get_response(request)
+        slow_request_ms = options["SLOW_REQUEST_MS"]
+        with measure_request(keep_statements=bool(slow_request_ms)) as metrics:
+            response = self.get_response(request)
+            finish_request(request, metrics, slow_request_ms)
+        return response
+
+    async def __acall__(self, request):
+        options = metrics_options()
+        if not options["ENABLED"]:
+            return await self.get_response(request)
+        slow_request_ms = options["SLOW_REQUEST_MS"]
+        with measure_request(keep_statements=bool(slow_request_ms)) as metrics:
+            response = await self.get_response(request)
+            finish_request(request, metrics, slow_request_ms)
+        return response
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:26
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_summary(apps, schema_editor):
+    Listing = apps.get_model('rente', 'Listing')
+    Review = apps.get_model('rente', 'Review')
+    totals = (
+        Review.objects.values('listing_id')
+        .annotate(count=Count('id'), total=Sum('rating'))
+        .order_by()
+    )
+    for row in totals.iterator():
+        Listing.objects.filter(pk=row['listing_id']).update(
+            reviews_count=row['count'],
+            rating_sum=row['total'],
+            average_rating=row['total'] / row['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0002_alter_listing_property_type_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='average_rating',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', '-average_rating'], name='listing_active_rating_idx'),
+        ),
+        migrations.RunPython(fill_rating_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS rente_listing_fts "
+            "USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO rente_listing_fts (rowid, title, description) "
+            "SELECT id, title, description FROM rente_listing"
+        )
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            "ALTER TABLE rente_listing ADD FULLTEXT INDEX rente_listing_fulltext (title, description)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS rente_listing_fts")
+    elif vendor == 'mysql':
+        schema_editor.execute("ALTER TABLE rente_listing DROP INDEX rente_listing_fulltext")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0003_listing_average_rating_listing_rating_sum_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
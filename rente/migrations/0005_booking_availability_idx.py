@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0004_listing_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['listing', 'status', 'start_date', 'end_date'], name='booking_availability_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0005_booking_availability_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('days', models.BinaryField(max_length=46)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='rente.listing')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('listing', 'year'), name='occupancy_listing_year_uniq')],
+            },
+        ),
+    ]
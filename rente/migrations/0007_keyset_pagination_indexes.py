@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0006_listingoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='listing_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchhistory',
+            index=models.Index(fields=['user', '-searched_at', '-id'], name='searchhistory_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='viewhistory',
+            index=models.Index(fields=['user', '-viewed_at', '-id'], name='viewhistory_user_viewed_idx'),
+        ),
+    ]
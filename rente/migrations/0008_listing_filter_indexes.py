@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:50
+
+import rente.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_active_rating_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_active_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=rente.models.ActiveListingIndex(fields=['-average_rating'], name='listing_active_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=rente.models.ActiveListingIndex(fields=['-created_at', '-id'], name='listing_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=rente.models.ActiveListingIndex(fields=['price', 'id'], name='listing_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=rente.models.ActiveListingIndex(fields=['property_type', 'rooms'], name='listing_active_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=rente.models.ActiveListingIndex(fields=['rooms'], name='listing_active_rooms_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['listing', '-created_at'], name='review_listing_created_idx'),
+        ),
+    ]
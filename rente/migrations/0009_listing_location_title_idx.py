@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0008_listing_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['location', 'title'], name='listing_location_title_idx'),
+        ),
+    ]
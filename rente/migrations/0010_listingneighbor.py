@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0009_listing_location_title_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='rente.listing')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rente.listing')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('listing', 'neighbor'), name='neighbor_listing_neighbor_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0010_listingneighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ListingStatsInvalidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rente.listing')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ListingDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('nights', models.PositiveSmallIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='rente.listing')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('listing', 'date'), name='dailystats_listing_date_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rente', '0012_listing_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingSearchIndex',
+            fields=[
+                ('listing', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='rente.listing')),
+                ('document', models.TextField(db_column='rente_listing_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'rente_listing_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .geo import geohash_for
+
 
 # Расширенный пользователь
 class User(AbstractUser):
@@ -32,6 +34,29 @@ def save(self, *args, **kwargs):
     super().save(*args, **kwargs)
 
 
+class ActiveListingIndex(models.Index):
+    """
+    Индекс только по активным объявлениям: частичный (WHERE is_active) там, где
+    БД их поддерживает, иначе составной с is_active первым полем (MySQL).
+    SQLite не использует составной индекс для условия "WHERE is_active",
+    которое Django строит для filter(is_active=True).
+    """
+
+    def __init__(self, *, fields, name):
+        super().__init__(fields=fields, name=name, condition=models.Q(is_active=True))
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.features.supports_partial_indexes:
+            return super().create_sql(model, schema_editor, using=using, **kwargs)
+        index = models.Index(fields=["is_active", *self.fields], name=self.name)
+        return index.create_sql(model, schema_editor, using=using, **kwargs)
+
+    def deconstruct(self):
+        path, args, kwargs = super().deconstruct()
+        kwargs.pop("condition")
+        return path, args, kwargs
+
+
 # Объявления
 class Listing(models.Model):
     class PropertyType(models.TextChoices):
@@ -52,16 +77,49 @@ class Listing(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     location = models.CharField(max_length=255)
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # Ячейка координат для поиска рядом (rente.geo), заполняется в save()
+    geohash = models.CharField(max_length=12, blank=True, default="", editable=False)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     rooms = models.PositiveIntegerField()
     property_type = models.CharField(max_length=20, choices=PropertyType.choices)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     views_count = models.PositiveIntegerField(default=0)
+    # Сводка по отзывам, обновляется в rente.ratings при изменении отзывов
+    reviews_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            ActiveListingIndex(fields=["-average_rating"], name="listing_active_rating_idx"),
+            ActiveListingIndex(fields=["-created_at", "-id"], name="listing_active_created_idx"),
+            ActiveListingIndex(fields=["price", "id"], name="listing_active_price_idx"),
+            ActiveListingIndex(fields=["property_type", "rooms"], name="listing_active_type_idx"),
+            ActiveListingIndex(fields=["rooms"], name="listing_active_rooms_idx"),
+            # Поиск рядом: диапазоны по префиксу geohash через OR. Обычный индекс, не частичный:
+            # частичный SQLite для OR из нескольких диапазонов не использует
+            models.Index(fields=["geohash"], name="listing_geohash_idx"),
+            # Проверка дубликатов (title, location) при создании и импорте
+            models.Index(fields=["location", "title"], name="listing_location_title_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.geohash = geohash_for(self.latitude, self.longitude)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
+
 
 # Бронирования
 class Booking(models.Model):
@@ -78,6 +136,26 @@ class Booking(models.Model):
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["listing", "status", "start_date", "end_date"],
+                name="booking_availability_idx",
+            ),
+        ]
+
+# Занятость объявления по дням года: бит i соответствует дню i от 1 января
+class ListingOccupancy(models.Model):
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='occupancy')
+    year = models.PositiveSmallIntegerField()
+    days = models.BinaryField(max_length=46)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "year"], name="occupancy_listing_year_uniq"),
+        ]
+
+
 class Review(models.Model):
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='reviews')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -85,6 +163,69 @@ class Review(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "-created_at"], name="review_listing_created_idx"),
+        ]
+
+
+# Таблица FTS5 поиска на SQLite (rente.search.SQLiteFTSSearchBackend), создаётся миграцией 0004.
+# Модель нужна только для JOIN в запросах поиска, Django таблицу не создаёт
+class ListingSearchIndex(models.Model):
+    listing = models.OneToOneField(
+        Listing, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_index',
+    )
+    # Скрытый столбец FTS5 с именем таблицы: условие MATCH по всем полям
+    document = models.TextField(db_column='rente_listing_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'rente_listing_fts'
+
+
+# Похожие объявления по совместным просмотрам, строятся командой build_listing_neighbors
+class ListingNeighbor(models.Model):
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "neighbor"], name="neighbor_listing_neighbor_uniq"),
+        ]
+
+
+# Статистика объявления по дням, заполняется командой rollup_listing_stats (rente.stats)
+class ListingDailyStats(models.Model):
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    # Бронирования, созданные в этот день
+    bookings = models.PositiveIntegerField(default=0)
+    # Ночь с этой даты продана (подтверждённое бронирование) и выручка за неё
+    nights = models.PositiveSmallIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["listing", "date"], name="dailystats_listing_date_uniq"),
+        ]
+
+
+# Периоды, в которых изменились подтверждённые бронирования: ночи и выручка пересчитываются
+class ListingStatsInvalidation(models.Model):
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='+')
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+
+# Последний обработанный id таблицы событий для rente.stats
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+
 
 # История просмотров
 class ViewHistory(models.Model):
@@ -92,9 +233,19 @@ class ViewHistory(models.Model):
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE)
     viewed_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-viewed_at", "-id"], name="viewhistory_user_viewed_idx"),
+        ]
+
 
 # История поиска
 class SearchHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     query = models.CharField(max_length=255)
-    searched_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    searched_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-searched_at", "-id"], name="searchhistory_user_idx"),
+        ]
@@ -0,0 +1,204 @@
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по ключу сортировки (например (created_at, id))
+    без COUNT(*) и OFFSET: время получения страницы не зависит от её номера.
+
+    Ключ берётся из сортировки queryset, а если её нет — из keyset_ordering
+    представления или ordering пагинатора; id добавляется для однозначности.
+    Если сортировка идёт не по полям модели (релевантность поиска),
+    курсор хранит смещение. Курсор другого вида отклоняется (404).
+
+    Ответ — объект {next, previous, results}, а не список.
+    """
+
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Некорректный курсор"
+
+    # Приблизительное количество: COUNT по не более чем count_limit строкам
+    approximate_count = False
+    count_limit = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.prepare(queryset, request, view)
+        if self.approximate_count:
+            self.count = queryset[:self.count_limit + 1].count()
+        return self.finish(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант paginate_queryset для async-представлений."""
+        page = self.prepare(queryset, request, view)
+        if self.approximate_count:
+            self.count = await queryset[:self.count_limit + 1].acount()
+        return self.finish([row async for row in page.aiterator()])
+
+    def prepare(self, queryset, request, view=None):
+        """Queryset страницы: на одну строку больше page_size, чтобы узнать о следующей."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        self.cursor = self.decode_cursor(request)
+        self.keys = self.get_keys(queryset, view)
+        if self.keys is None:
+            self.offset = self.cursor.get("o") if self.cursor is not None else 0
+            if not isinstance(self.offset, int) or self.offset < 0:
+                raise NotFound(self.invalid_cursor_message)
+            return queryset[self.offset:self.offset + self.page_size + 1]
+
+        queryset = queryset.order_by(*[("-" if desc else "") + field.name for field, desc in self.keys])
+        self.backwards = self.cursor is not None and self.cursor.get("d") == "p"
+        if self.cursor is not None:
+            values = self.cursor.get("k")
+            if not isinstance(values, list):
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self.after(values, self.backwards))
+            if self.backwards:
+                queryset = queryset.reverse()
+        return queryset[:self.page_size + 1]
+
+    def finish(self, rows):
+        """Обрезает страницу до page_size и вычисляет курсоры соседних страниц."""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.keys is None:
+            self.next_cursor = {"o": self.offset + self.page_size} if has_more else None
+            self.previous_cursor = {"o": max(self.offset - self.page_size, 0)} if self.offset else None
+            return rows
+
+        if self.backwards:
+            rows.reverse()
+        has_next = has_more if not self.backwards else True
+        has_previous = self.cursor is not None if not self.backwards else has_more
+        self.next_cursor = {"k": self.key_of(rows[-1])} if rows and has_next else None
+        self.previous_cursor = {"k": self.key_of(rows[0]), "d": "p"} if rows and has_previous else None
+        return rows
+
+    def get_keys(self, queryset, view):
+        if queryset.query.extra_order_by:
+            return None
+        ordering = queryset.query.order_by or getattr(view, "keyset_ordering", None) or self.ordering
+        opts = queryset.model._meta
+        keys = []
+        for name in ordering:
+            if not isinstance(name, str):
+                return None
+            desc = name.startswith("-")
+            try:
+                field = opts.get_field(name.lstrip("-"))
+            except FieldDoesNotExist:
+                return None
+            if field.is_relation or field.null:
+                return None
+            keys.append((field, desc))
+        if not any(field.primary_key for field, _ in keys):
+            keys.append((opts.pk, keys[-1][1] if keys else False))
+        return keys
+
+    def after(self, values, backwards):
+        """Условие "строго после ключа" для лексикографического порядка ключей."""
+        try:
+            values = [field.to_python(value) for (field, _), value in zip(self.keys, values, strict=True)]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        def lookup(field, desc, strict=True):
+            return ("lt" if desc != backwards else "gt") + ("" if strict else "e")
+
+        condition = Q()
+        equal = Q()
+        for (field, desc), value in zip(self.keys, values):
+            condition |= equal & Q(**{f"{field.attname}__{lookup(field, desc)}": value})
+            equal &= Q(**{field.attname: value})
+        # Нестрогое условие по первому полю даёт индексу диапазон для поиска
+        first, desc = self.keys[0]
+        return Q(**{f"{first.attname}__{lookup(first, desc, strict=False)}": values[0]}) & condition
+
+    def key_of(self, row):
+        if isinstance(row, dict):
+            return [_encode_value(row[field.attname]) for field, _ in self.keys]
+        return [_encode_value(getattr(row, field.attname)) for field, _ in self.keys]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(cursor, dict):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def cursor_token(self, cursor):
+        return base64.urlsafe_b64encode(json.dumps(cursor, separators=(",", ":")).encode()).decode()
+
+    def encode_cursor(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.cursor_token(cursor)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        payload = {}
+        if self.count is not None:
+            payload["count"] = min(self.count, self.count_limit)
+            payload["count_is_exact"] = self.count <= self.count_limit
+        payload["next"] = self.encode_cursor(self.next_cursor)
+        payload["previous"] = self.encode_cursor(self.previous_cursor)
+        payload["results"] = data
+        return payload
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer"},
+                "count_is_exact": {"type": "boolean"},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class ListingPagination(KeysetPagination):
+    approximate_count = True
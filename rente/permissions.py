@@ -50,12 +50,21 @@ class IsTenant(permissions.BasePermission):
 class IsOwnerOrAdminOrReadOnly(permissions.BasePermission):
     """
     Разрешает изменение объекта только владельцу или администратору,
-    просмотр — всем.
+    просмотр — всем. Владелец сравнивается по owner_id, без загрузки owner.
     """
 
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
         return (
-                obj.owner == request.user or
-                request.user.role == User.Role.ADMIN)
\ No newline at end of file
+                obj.owner_id == request.user.pk or
+                request.user.role == User.Role.ADMIN)
+
+class IsOwnerOrAdmin(permissions.BasePermission):
+    """
+    Разрешает доступ к объекту только владельцу или администратору,
+    в том числе на чтение.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        return obj.owner_id == request.user.pk or request.user.role == User.Role.ADMIN
@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.models import F, Count, Sum, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .models import Listing, Review
+
+
+def apply_review_change(listing_id, count_delta, rating_delta):
+    """
+    Атомарно обновляет сводку по отзывам объявления.
+    Средний рейтинг пересчитывается отдельным UPDATE, т.к. MySQL
+    вычисляет присваивания в SET слева направо по уже новым значениям.
+    """
+    listings = Listing.objects.filter(pk=listing_id)
+    with transaction.atomic():
+        listings.update(
+            reviews_count=F("reviews_count") + count_delta,
+            rating_sum=F("rating_sum") + rating_delta,
+        )
+        listings.update(
+            average_rating=Coalesce(
+                Cast("rating_sum", FloatField()) / NullIf("reviews_count", 0),
+                Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+
+
+def rebuild_ratings(batch_size=1000):
+    """
+    Пересчитывает сводку по отзывам для всех объявлений пачками.
+    Возвращает количество обработанных объявлений.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        listings = list(
+            Listing.objects.filter(pk__gt=last_id)
+            .order_by("pk")
+            .only("pk")[:batch_size]
+        )
+        if not listings:
+            return processed
+
+        totals = {
+            row["listing_id"]: row
+            for row in Review.objects.filter(listing__in=listings)
+            .values("listing_id")
+            .annotate(count=Count("id"), total=Sum("rating"))
+            .order_by()
+        }
+        for listing in listings:
+            row = totals.get(listing.pk)
+            listing.reviews_count = row["count"] if row else 0
+            listing.rating_sum = row["total"] if row else 0
+            listing.average_rating = listing.rating_sum / listing.reviews_count if row else 0
+
+        Listing.objects.bulk_update(listings, ["reviews_count", "rating_sum", "average_rating"])
+        processed += len(listings)
+        last_id = listings[-1].pk
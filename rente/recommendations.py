@@ -0,0 +1,181 @@
+"""
+Рекомендации объявлений по истории просмотров и поиска.
+
+Офлайн (build_neighbors, команда build_listing_neighbors): по ViewHistory
+считается, сколько пользователей смотрели каждую пару объявлений, сходство —
+косинус co(i, j) / sqrt(n(i) * n(j)), для каждого объявления сохраняются
+top_k соседей в ListingNeighbor. Счёт векторный на NumPy, если он
+установлен, иначе через Counter — результат одинаковый.
+
+В запросе (recommend) берутся последние просмотры и поиски пользователя,
+их соседи читаются одним запросом и складываются с весами по давности.
+"""
+import math
+from collections import Counter, defaultdict
+from itertools import combinations, groupby
+from operator import itemgetter
+
+from django.db import transaction
+
+from .models import Listing, ListingNeighbor, ViewHistory, SearchHistory
+from .search import get_search_backend
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TOP_K = 20
+# Сколько последних объявлений пользователя учитывать: пар растёт квадратично
+MAX_ITEMS_PER_USER = 50
+
+# Запрос рекомендаций: последние просмотры и поиски пользователя
+SEED_VIEWS = 20
+SEED_SEARCHES = 3
+SEARCH_HITS = 5
+SEARCH_WEIGHT = 0.5
+
+
+def load_views(max_items_per_user=MAX_ITEMS_PER_USER, chunk_size=10_000):
+    """(user_id, listing_id) без повторов: последние max_items_per_user объявлений каждого пользователя."""
+    rows = (
+        ViewHistory.objects.order_by("user_id", "-viewed_at", "-id")
+        .values_list("user_id", "listing_id")
+        .iterator(chunk_size=chunk_size)
+    )
+    current, seen = None, set()
+    for user_id, listing_id in rows:
+        if user_id != current:
+            current, seen = user_id, set()
+        if listing_id in seen or len(seen) >= max_items_per_user:
+            continue
+        seen.add(listing_id)
+        yield user_id, listing_id
+
+
+def python_neighbors(pairs, top_k=TOP_K):
+    """{listing_id: [(neighbor_id, score), ...]} по парам (user_id, listing_id), отсортированным по user_id."""
+    views = Counter()
+    co_views = Counter()
+    for _, group in groupby(pairs, key=itemgetter(0)):
+        items = sorted(listing_id for _, listing_id in group)
+        views.update(items)
+        co_views.update(combinations(items, 2))
+
+    neighbors = defaultdict(list)
+    for (first, second), count in co_views.items():
+        score = count / math.sqrt(views[first] * views[second])
+        neighbors[first].append((second, score))
+        neighbors[second].append((first, score))
+    return {
+        listing_id: sorted(candidates, key=lambda candidate: (-candidate[1], candidate[0]))[:top_k]
+        for listing_id, candidates in neighbors.items()
+    }
+
+
+def numpy_neighbors(pairs, top_k=TOP_K):
+    """То же, что python_neighbors, счёт пар через numpy.unique по кодам (i * n + j)."""
+    data = numpy.fromiter((value for pair in pairs for value in pair), dtype=numpy.int64).reshape(-1, 2)
+    if not len(data):
+        return {}
+    users = data[:, 0]
+    listing_ids, items = numpy.unique(data[:, 1], return_inverse=True)
+    views = numpy.bincount(items)
+
+    # Пары внутри пользователя: каждый элемент с каждым следующим в той же группе
+    starts = numpy.flatnonzero(numpy.r_[True, users[1:] != users[:-1]])
+    ends = numpy.repeat(numpy.r_[starts[1:], len(users)], numpy.diff(numpy.r_[starts, len(users)]))
+    positions = numpy.arange(len(users))
+    later = ends - positions - 1
+    left = numpy.repeat(positions, later)
+    offsets = numpy.arange(len(left)) - numpy.repeat(numpy.cumsum(later) - later, later)
+    right = left + 1 + offsets
+
+    first = numpy.minimum(items[left], items[right])
+    second = numpy.maximum(items[left], items[right])
+    codes, counts = numpy.unique(first * len(listing_ids) + second, return_counts=True)
+    if not len(codes):
+        return {}
+    first, second = numpy.divmod(codes, len(listing_ids))
+    scores = counts / numpy.sqrt(views[first] * views[second])
+
+    source = numpy.r_[first, second]
+    target = numpy.r_[second, first]
+    scores = numpy.r_[scores, scores]
+    # Сортировка по объявлению, затем по убыванию сходства и id соседа
+    order = numpy.lexsort((listing_ids[target], -scores, source))
+    source, target, scores = source[order], target[order], scores[order]
+    group_starts = numpy.flatnonzero(numpy.r_[True, source[1:] != source[:-1]])
+    rank = numpy.arange(len(source)) - numpy.repeat(group_starts, numpy.diff(numpy.r_[group_starts, len(source)]))
+    keep = rank < top_k
+
+    neighbors = defaultdict(list)
+    for listing_id, neighbor_id, score in zip(
+        listing_ids[source[keep]].tolist(), listing_ids[target[keep]].tolist(), scores[keep].tolist()
+    ):
+        neighbors[listing_id].append((neighbor_id, score))
+    return dict(neighbors)
+
+
+def compute_neighbors(pairs, top_k=TOP_K, vectorized=None):
+    if vectorized is None:
+        vectorized = numpy is not None
+    return (numpy_neighbors if vectorized else python_neighbors)(pairs, top_k)
+
+
+def build_neighbors(top_k=TOP_K, max_items_per_user=MAX_ITEMS_PER_USER, vectorized=None, batch_size=5000):
+    """Пересчитывает ListingNeighbor целиком. Возвращает количество объявлений с соседями."""
+    neighbors = compute_neighbors(load_views(max_items_per_user), top_k, vectorized)
+    with transaction.atomic():
+        ListingNeighbor.objects.all().delete()
+        ListingNeighbor.objects.bulk_create(
+            (
+                ListingNeighbor(listing_id=listing_id, neighbor_id=neighbor_id, score=score)
+                for listing_id, candidates in neighbors.items()
+                for neighbor_id, score in candidates
+            ),
+            batch_size=batch_size,
+        )
+    return len(neighbors)
+
+
+def recommend(user, limit=20):
+    """
+    Объявления для user: соседи последних просмотренных и найденных объявлений
+    с весом 1 / (место от конца истории). Уже просмотренные исключаются;
+    если кандидатов не хватает, список дополняется самыми просматриваемыми.
+    """
+    viewed = list(dict.fromkeys(
+        ViewHistory.objects.filter(user=user).order_by("-viewed_at", "-id")
+        .values_list("listing_id", flat=True)[:SEED_VIEWS * 5]
+    ))[:SEED_VIEWS]
+    weights = {listing_id: 1 / rank for rank, listing_id in enumerate(viewed, start=1)}
+
+    queries = list(dict.fromkeys(
+        SearchHistory.objects.filter(user=user).order_by("-searched_at", "-id")
+        .values_list("query", flat=True)[:SEED_SEARCHES * 5]
+    ))[:SEED_SEARCHES]
+    backend = get_search_backend()
+    for rank, query in enumerate(queries, start=1):
+        hits = backend.search(Listing.objects.filter(is_active=True), query).values_list("pk", flat=True)
+        for listing_id in hits[:SEARCH_HITS]:
+            weights.setdefault(listing_id, SEARCH_WEIGHT / rank)
+
+    scores = Counter()
+    for listing_id, neighbor_id, score in ListingNeighbor.objects.filter(
+        listing_id__in=weights
+    ).values_list("listing_id", "neighbor_id", "score"):
+        scores[neighbor_id] += weights[listing_id] * score
+    # Найденные поиском, но ещё не просмотренные объявления — тоже кандидаты
+    for listing_id, weight in weights.items():
+        scores[listing_id] += weight
+    for listing_id in viewed:
+        del scores[listing_id]
+
+    ranked = sorted(scores, key=lambda listing_id: (-scores[listing_id], listing_id))[:limit * 2]
+    active = Listing.objects.filter(is_active=True).select_related("owner")
+    found = active.in_bulk(ranked)
+    listings = [found[listing_id] for listing_id in ranked if listing_id in found][:limit]
+    if len(listings) < limit:
+        listings += active.exclude(pk__in=[*viewed, *found]).order_by("-views_count", "-id")[:limit - len(listings)]
+    return listings
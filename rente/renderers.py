@@ -0,0 +1,101 @@
+import csv
+import itertools
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .replicas import preserve_routing
+
+
+class _Line:
+    """Файлоподобный объект для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Один JSON-объект на строку (application/x-ndjson)."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def stream(self, rows, fields=None):
+        for row in rows:
+            yield json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + "\n"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return "".join(self.stream(rows)).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV с заголовком; колонки — fields или ключи первой строки."""
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def stream(self, rows, fields=None):
+        writer = csv.writer(_Line())
+        rows = iter(rows)
+        if fields is None:
+            first = next(rows, None)
+            if first is None:
+                return
+            fields = list(first)
+            rows = itertools.chain([first], rows)
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([row.get(field) for field in fields])
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return "".join(self.stream(rows)).encode(self.charset)
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Текстовый формат Prometheus; ошибки (dict) выводятся как JSON."""
+
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, str):
+            data = json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+        return data.encode(self.charset)
+
+
+def streaming_response(renderer, rows, fields=None, filename=None):
+    """Потоковый ответ: строки выгружаются по мере чтения, без загрузки в память."""
+    response = StreamingHttpResponse(
+        (chunk.encode(renderer.charset) for chunk in renderer.stream(rows, fields)),
+        content_type=f"{renderer.media_type}; charset={renderer.charset}",
+    )
+    if filename:
+        response["Content-Disposition"] = f'attachment; filename="{filename}.{renderer.format}"'
+    return response
+
+
+class StreamingExportMixin:
+    """
+    ?format=ndjson|csv у списка: все строки queryset потоком, значения
+    берутся через values() без сериализатора, память не растёт с числом строк.
+    """
+
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer, CSVRenderer]
+    export_fields = None
+    export_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, (NDJSONRenderer, CSVRenderer)):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).order_by(*self.keyset_ordering)
+        rows = queryset.values(*self.export_fields).iterator(chunk_size=self.export_chunk_size)
+        return streaming_response(renderer, preserve_routing(rows), self.export_fields, filename=self.basename)
@@ -0,0 +1,107 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Включается на время чтения в представлениях, которым разрешены реплики
+_replica_reads = ContextVar("replica_reads", default=False)
+
+defaults = {"ALIASES": [], "STICKY_SECONDS": 5, "COOKIE_NAME": "use_primary"}
+
+
+def replica_options():
+    return {**defaults, **getattr(settings, "READ_REPLICAS", {})}
+
+
+@contextmanager
+def use_replicas():
+    """Запросы на чтение внутри блока могут идти на реплики."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def preserve_routing(rows):
+    """
+    Итерация потокового ответа идёт уже после выхода из представления:
+    чтение остаётся на той же БД, что выбрана для запроса.
+    """
+    replica_reads = _replica_reads.get()
+
+    def iterate():
+        iterator = iter(rows)
+        while True:
+            # Между yield генератор может продолжиться в другом контексте (ASGI)
+            token = _replica_reads.set(replica_reads)
+            try:
+                row = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _replica_reads.reset(token)
+            yield row
+
+    return iterate()
+
+
+def reading_from_replicas():
+    """Чтение в текущем контексте может идти на реплику (см. ReplicaRouter)."""
+    return _replica_reads.get() and bool(replica_options()["ALIASES"])
+
+
+def buffered_write(response):
+    """
+    Помечает ответ на запись через буфер (rente.buffers): она попадает в БД
+    позже, поэтому PrimaryStickinessMiddleware не переводит чтение на primary.
+    """
+    response.buffered_write = True
+    return response
+
+
+def can_read_from_replica(request):
+    """
+    Безопасный запрос без метки недавней записи: пока метка жива,
+    пользователь читает с primary и видит свои изменения.
+    """
+    options = replica_options()
+    return (
+        bool(options["ALIASES"])
+        and request.method in SAFE_METHODS
+        and options["COOKIE_NAME"] not in request.COOKIES
+    )
+
+
+class ReplicaRouter:
+    """
+    Чтение внутри use_replicas() уходит на случайную реплику из READ_REPLICAS,
+    всё остальное — на default. Внутри транзакции на default читается тоже
+    default: блокировки и только что записанные строки есть только там.
+    """
+
+    def db_for_read(self, model, **hints):
+        aliases = replica_options()["ALIASES"]
+        if not aliases or not _replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и default
+        return True
+
+
+class ReplicaReadMixin:
+    """Чтение viewset'а с реплик, если у пользователя нет недавней записи."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not can_read_from_replica(request):
+            return super().dispatch(request, *args, **kwargs)
+        with use_replicas():
+            return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,215 @@
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Lookup, Q, Case, When, Value, BooleanField, IntegerField, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Listing, ListingSearchIndex
+
+TOKEN_RE = re.compile(r"\w+")
+FTS_TABLE = "rente_listing_fts"
+FULLTEXT_INDEX = "rente_listing_fulltext"
+INDEXED_FIELDS = ("title", "description")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+@ListingSearchIndex._meta.get_field("document").register_lookup
+class Match(Lookup):
+    """document__match: полнотекстовое условие FTS5."""
+
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class BaseSearchBackend:
+    """
+    Поиск объявлений по параметру q.
+    search() возвращает queryset, отсортированный по релевантности
+    (аннотация search_rank), остальные методы синхронизируют индекс.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index(self, listing):
+        pass
+
+    def remove(self, listing_id):
+        pass
+
+    def index_many(self, listings):
+        for listing in listings:
+            self.index(listing)
+
+    def rebuild(self):
+        pass
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """Прежний поиск через LIKE '%q%', без индекса и ранжирования."""
+
+    def search(self, queryset, query):
+        return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """
+    Виртуальная таблица FTS5 (создаётся миграцией), rowid совпадает с id объявления.
+    Каждое слово запроса ищется как префикс, порядок — по встроенному rank (bm25).
+    Таблица присоединяется через модель ListingSearchIndex.
+    """
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        expression = " ".join(f'"{token}"*' for token in tokens)
+        return queryset.filter(search_index__document__match=expression).annotate(
+            search_rank=F("search_index__rank")
+        ).order_by("search_rank")
+
+    def index(self, listing):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [listing.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)",
+                [listing.pk, listing.title, listing.description],
+            )
+
+    def index_many(self, listings):
+        rows = [(listing.pk, listing.title, listing.description) for listing in listings]
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [row[:1] for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)", rows
+            )
+
+    def remove(self, listing_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [listing_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description) "
+                f"SELECT id, title, description FROM {Listing._meta.db_table}"
+            )
+
+
+class MySQLFulltextSearchBackend(BaseSearchBackend):
+    """
+    FULLTEXT-индекс InnoDB по (title, description), создаётся миграцией
+    и поддерживается самим MySQL, поэтому index/remove ничего не делают.
+    """
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+        expression = " ".join(f"+{token}*" for token in tokens)
+        table = Listing._meta.db_table
+        match = f"MATCH ({table}.title, {table}.description) AGAINST (%s IN BOOLEAN MODE)"
+        # MATCH прямо в WHERE: так MySQL отбирает строки по FULLTEXT-индексу
+        return queryset.filter(
+            RawSQL(match, [expression], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(match, [expression], output_field=FloatField())
+        ).order_by("-search_rank")
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """
+    Инвертированный индекс в памяти процесса, для тестов и разработки.
+    Релевантность — суммарная частота совпавших слов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(dict)
+        self._documents = {}
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+
+        scores = None
+        with self._lock:
+            for token in tokens:
+                matches = Counter()
+                for word, postings in self._postings.items():
+                    if word.startswith(token):
+                        matches.update(postings)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = Counter({pk: scores[pk] + n for pk, n in matches.items() if pk in scores})
+
+        ranked = [pk for pk, _ in scores.most_common()]
+        if not ranked:
+            return queryset.none()
+        return queryset.filter(pk__in=ranked).annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ranked)],
+                output_field=IntegerField(),
+            )
+        ).order_by("search_rank")
+
+    def index(self, listing):
+        words = Counter(tokenize(f"{listing.title} {listing.description}"))
+        with self._lock:
+            self._remove(listing.pk)
+            for word, count in words.items():
+                self._postings[word][listing.pk] = count
+            self._documents[listing.pk] = set(words)
+
+    def remove(self, listing_id):
+        with self._lock:
+            self._remove(listing_id)
+
+    def _remove(self, listing_id):
+        for word in self._documents.pop(listing_id, ()):
+            postings = self._postings[word]
+            postings.pop(listing_id, None)
+            if not postings:
+                del self._postings[word]
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+
+    def rebuild(self):
+        self.clear()
+        self.index_many(Listing.objects.only("pk", *INDEXED_FIELDS).iterator(chunk_size=2000))
+
+
+DEFAULT_BACKENDS = {
+    "sqlite": "rente.search.SQLiteFTSSearchBackend",
+    "mysql": "rente.search.MySQLFulltextSearchBackend",
+}
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_search_backend():
+    path = getattr(settings, "LISTING_SEARCH_BACKEND", None) or DEFAULT_BACKENDS.get(
+        connection.vendor, "rente.search.IContainsSearchBackend"
+    )
+    return _load_backend(path)
@@ -1,11 +1,36 @@
 from rest_framework import serializers
+from .metrics import serializer_timer
 from .models import User, Listing, Booking, Review, ViewHistory, SearchHistory
 from django.contrib.auth.password_validation import validate_password
 
 
+# Время .data считается временем сериализации запроса (rente.metrics).
+# Вложенные сериализаторы вызывают to_representation, а не .data: время не удваивается
+
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
+class TimedModelSerializer(serializers.ModelSerializer):
+    def __init_subclass__(cls, **kwargs):
+        # many=True создаёт Meta.list_serializer_class
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, "Meta", None)
+        if meta is not None and not hasattr(meta, "list_serializer_class"):
+            meta.list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
 # Сериализатор для регистрации пользователя
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(TimedModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True)
 
@@ -26,7 +51,7 @@ class RegisterSerializer(serializers.ModelSerializer):
 
 # Сериализатор для профиля пользователя (вывод информации)
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedModelSerializer):
     class Meta:
         model = User
         fields = ("id", "username", "email", "role")
@@ -34,14 +59,17 @@ class UserSerializer(serializers.ModelSerializer):
 
 # Объявления
 
-class ListingSerializer(serializers.ModelSerializer):
+DUPLICATE_LISTING_MESSAGE = "Tacoi obiect uje sushestvuet"
+
+
+class ListingSerializer(TimedModelSerializer):
     owner = UserSerializer(read_only=True)
-    reviews_count = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
 
     class Meta:
         model = Listing
-        fields = "__all__"
+        exclude = ("rating_sum", "geohash")
+        read_only_fields = ("reviews_count",)
 
     def validate(self, attrs):
         title = attrs["title"]
@@ -49,22 +77,28 @@ class ListingSerializer(serializers.ModelSerializer):
 
         listing = Listing.objects.filter(title=title, location=location)
         if listing.exists():
-            raise  serializers.ValidationError("Tacoi obiect uje sushestvuet")
+            raise  serializers.ValidationError(DUPLICATE_LISTING_MESSAGE)
         return attrs
 
-    def get_reviews_count(self, obj):
-        return obj.reviews.count()
-
     def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews.exists():
-            return round(sum([r.rating for r in reviews]) / reviews.count(), 1)
-        return None
+        if not obj.reviews_count:
+            return None
+        return round(obj.average_rating, 1)
+
+
+class ListingImportSerializer(ListingSerializer):
+    """Строка массового импорта: дубликаты проверяются сразу для пачки (rente.bulk)."""
+
+    class Meta(ListingSerializer.Meta):
+        read_only_fields = ("reviews_count", "views_count", "average_rating", "created_at")
+
+    def validate(self, attrs):
+        return attrs
 
 
 # Бронирование
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(TimedModelSerializer):
     tenant = UserSerializer(read_only=True)
     listing = serializers.PrimaryKeyRelatedField(queryset=Listing.objects.all())
 
@@ -73,10 +107,17 @@ class BookingSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ("status", "created_at")
 
+    def validate(self, attrs):
+        start_date = attrs.get("start_date") or self.instance.start_date
+        end_date = attrs.get("end_date") or self.instance.end_date
+        if start_date > end_date:
+            raise serializers.ValidationError({"end_date": "Дата выезда раньше даты заезда"})
+        return attrs
+
 
 # Отзывы
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedModelSerializer):
     author = UserSerializer(read_only=True)
 
     class Meta:
@@ -87,7 +128,7 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 # История просмотров
 
-class ViewHistorySerializer(serializers.ModelSerializer):
+class ViewHistorySerializer(TimedModelSerializer):
     class Meta:
         model = ViewHistory
         fields = "__all__"
@@ -95,7 +136,7 @@ class ViewHistorySerializer(serializers.ModelSerializer):
 
 # История поиска
 
-class SearchHistorySerializer(serializers.ModelSerializer):
+class SearchHistorySerializer(TimedModelSerializer):
     class Meta:
         model = SearchHistory
         fields = "__all__"
\ No newline at end of file
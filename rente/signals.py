@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import response_cache
+from .models import Listing, Review, Booking
+from .search import get_search_backend, INDEXED_FIELDS
+
+
+@receiver(post_save, sender=Listing)
+def index_listing(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(INDEXED_FIELDS):
+        return
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Listing)
+def unindex_listing(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Listing)
+@receiver(post_delete, sender=Listing)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_listing_responses(sender, **kwargs):
+    # Второй сброс после коммита: иначе параллельный запрос может
+    # закэшировать ещё не закоммиченные данные под новым поколением
+    response_cache.bump()
+    transaction.on_commit(response_cache.bump)
@@ -0,0 +1,219 @@
+"""
+Статистика объявлений по дням (ListingDailyStats) для кабинета арендодателя.
+
+Просмотры и созданные бронирования — журналы, которые только растут: команда
+rollup_listing_stats читает строки с id больше отметки (RollupWatermark),
+группирует их по (объявление, день) одним GROUP BY в БД и прибавляет к
+счётчикам; отметка сдвигается в той же транзакции, поэтому повторный запуск
+ничего не считает дважды.
+
+Проданные ночи и выручка зависят от статуса бронирования, который меняется.
+save_booking, set_booking_status и delete_booking записывают изменённый
+период в ListingStatsInvalidation, а rollup пересчитывает ночи и выручку
+в этих периодах по подтверждённым бронированиям.
+
+Эндпоинт статистики читает только ListingDailyStats по индексу
+(listing, date): время ответа зависит от длины периода, а не от истории.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Min, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Booking, ViewHistory, ListingDailyStats, ListingStatsInvalidation, RollupWatermark,
+)
+
+CHUNK_SIZE = 10_000
+# Строки моложе LAG не берутся: транзакции с меньшими id могут быть ещё не закоммичены
+LAG = timedelta(seconds=30)
+
+# (отметка, модель журнала, поле времени, поле статистики)
+EVENT_LOGS = (
+    ("views", ViewHistory, "viewed_at", "views"),
+    ("bookings", Booking, "created_at", "bookings"),
+)
+
+
+def invalidate_booking(booking, *statuses):
+    """
+    Отмечает период бронирования для пересчёта ночей и выручки, если один из
+    статусов (до и после изменения) — подтверждённое. Вызывается в транзакции
+    изменения бронирования.
+    """
+    if Booking.Status.CONFIRMED in statuses:
+        ListingStatsInvalidation.objects.create(
+            listing_id=booking.listing_id, start_date=booking.start_date, end_date=booking.end_date
+        )
+
+
+def booked_nights(start_date, end_date):
+    """Ночи бронирования: с даты заезда до даты выезда, не включая её."""
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days)]
+
+
+def _merge(cells, fields, increment):
+    """
+    Записывает cells {(listing_id, date): {поле: значение}} в ListingDailyStats:
+    прибавляет к существующим строкам (increment) или заменяет значения.
+    """
+    if not cells:
+        return
+    listing_ids = {listing_id for listing_id, _ in cells}
+    days = [day for _, day in cells]
+    existing = {
+        (row.listing_id, row.date): row
+        for row in ListingDailyStats.objects.filter(
+            listing_id__in=listing_ids, date__gte=min(days), date__lte=max(days)
+        )
+    }
+    created, updated = [], []
+    for (listing_id, day), values in cells.items():
+        row = existing.get((listing_id, day))
+        if row is None:
+            created.append(ListingDailyStats(listing_id=listing_id, date=day, **values))
+            continue
+        for field, value in values.items():
+            setattr(row, field, getattr(row, field) + value if increment else value)
+        updated.append(row)
+    ListingDailyStats.objects.bulk_create(created)
+    ListingDailyStats.objects.bulk_update(updated, fields)
+
+
+def rollup_events(name, model, date_field, field, cutoff, chunk_size=CHUNK_SIZE):
+    """Прибавляет к полю field строки журнала model после отметки name. Возвращает число строк."""
+    processed = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=name)
+            rows = model.objects.filter(pk__gt=watermark.last_id, **{f"{date_field}__lte": cutoff})
+            chunk = list(rows.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+            if not chunk:
+                return processed
+
+            counts = (
+                rows.filter(pk__lte=chunk[-1])
+                .annotate(day=TruncDate(date_field))
+                .values("listing_id", "day")
+                .annotate(count=Count("pk"))
+                .order_by()
+            )
+            _merge({(row["listing_id"], row["day"]): {field: row["count"]} for row in counts}, [field], True)
+            watermark.last_id = chunk[-1]
+            watermark.save(update_fields=["last_id"])
+        processed += len(chunk)
+
+
+def recompute_nights(periods):
+    """
+    Пересчитывает ночи и выручку в периодах {listing_id: (start_date, end_date)}
+    по подтверждённым бронированиям и текущей цене объявления.
+    """
+    cells = {}
+    for listing_id, (start_date, end_date) in periods.items():
+        for day in booked_nights(start_date, end_date + timedelta(days=1)):
+            cells[listing_id, day] = {"nights": 0, "revenue": Decimal(0)}
+
+    bookings = Booking.objects.filter(
+        listing_id__in=periods,
+        status=Booking.Status.CONFIRMED,
+        start_date__lte=max(end for _, end in periods.values()),
+        end_date__gt=min(start for start, _ in periods.values()),
+    ).values_list("listing_id", "start_date", "end_date", "listing__price")
+    for listing_id, start_date, end_date, price in bookings.iterator(chunk_size=5000):
+        for day in booked_nights(start_date, end_date):
+            values = cells.get((listing_id, day))
+            if values is not None:
+                values["nights"] += 1
+                values["revenue"] += price
+
+    # Пустые дни без строки статистики не создаются
+    existing = set(
+        ListingDailyStats.objects.filter(listing_id__in=periods).filter(
+            date__gte=min(day for _, day in cells), date__lte=max(day for _, day in cells)
+        ).values_list("listing_id", "date")
+    )
+    _merge(
+        {key: values for key, values in cells.items() if values["nights"] or key in existing},
+        ["nights", "revenue"], False,
+    )
+
+
+def rollup_invalidations(chunk_size=1000):
+    """Пересчитывает периоды из ListingStatsInvalidation и удаляет их. Возвращает число периодов."""
+    processed = 0
+    while True:
+        with transaction.atomic():
+            invalidations = list(
+                ListingStatsInvalidation.objects.select_for_update().order_by("pk")[:chunk_size]
+            )
+            if not invalidations:
+                return processed
+            periods = {}
+            for invalidation in invalidations:
+                start_date, end_date = periods.get(
+                    invalidation.listing_id, (invalidation.start_date, invalidation.end_date)
+                )
+                periods[invalidation.listing_id] = (
+                    min(start_date, invalidation.start_date), max(end_date, invalidation.end_date)
+                )
+            recompute_nights(periods)
+            ListingStatsInvalidation.objects.filter(pk__in=[row.pk for row in invalidations]).delete()
+        processed += len(invalidations)
+
+
+def rollup(chunk_size=CHUNK_SIZE, lag=LAG):
+    """Досчитывает статистику после отметок. Возвращает число обработанных строк по журналам."""
+    cutoff = timezone.now() - lag
+    result = {
+        name: rollup_events(name, model, date_field, field, cutoff, chunk_size)
+        for name, model, date_field, field in EVENT_LOGS
+    }
+    result["invalidations"] = rollup_invalidations()
+    return result
+
+
+def reset_stats(batch_size=500):
+    """
+    Удаляет статистику и отметки и ставит в очередь пересчёт ночей по всем
+    подтверждённым бронированиям: нужен после загрузки данных через
+    bulk_create, которая не пишет ListingStatsInvalidation.
+    """
+    periods = (
+        Booking.objects.filter(status=Booking.Status.CONFIRMED)
+        .values("listing_id")
+        .annotate(start_date=Min("start_date"), end_date=Max("end_date"))
+        .order_by()
+    )
+    with transaction.atomic():
+        ListingDailyStats.objects.all().delete()
+        RollupWatermark.objects.all().delete()
+        ListingStatsInvalidation.objects.all().delete()
+        ListingStatsInvalidation.objects.bulk_create(
+            (ListingStatsInvalidation(**period) for period in periods), batch_size=batch_size
+        )
+
+
+def listing_stats(listing_id, start_date, end_date):
+    """Итоги и ненулевые дни периода (границы включительно) одним запросом к ListingDailyStats."""
+    days = list(
+        ListingDailyStats.objects.filter(listing_id=listing_id, date__gte=start_date, date__lte=end_date)
+        .order_by("date")
+        .values("date", "views", "bookings", "nights", "revenue")
+    )
+    period_days = (end_date - start_date).days + 1
+    nights = sum(day["nights"] for day in days)
+    return {
+        "listing": listing_id,
+        "from": start_date,
+        "to": end_date,
+        "views": sum(day["views"] for day in days),
+        "bookings": sum(day["bookings"] for day in days),
+        "nights": nights,
+        "occupancy_rate": round(nights / period_days, 4),
+        "revenue": sum((day["revenue"] for day in days), Decimal(0)),
+        "days": days,
+    }
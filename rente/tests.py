@@ -1,3 +1,1209 @@
-from django.test import TestCase
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+
+from .authentication import token_user_cache
+from .availability import BookingConflict, rebuild_occupancy, set_booking_status
+from .benchmarks.factories import create_dataset
+from .benchmarks.scenarios import SCENARIOS, ScenarioContext, build_requests, run_client, summarize
+from . import geo
+from .buffers import ViewCounter, SearchLog
+from .bulk import import_listings
+from .cache import response_cache
+from .tokens import RoleRefreshToken, refresh_coalescer
+from .models import (
+    User, Listing, Review, Booking, ListingOccupancy, ListingNeighbor, ViewHistory, SearchHistory,
+    ListingDailyStats, ListingStatsInvalidation,
+)
+from .metrics import Histogram, measure_request, registry
+from .pagination import KeysetPagination
+from .ratings import rebuild_ratings
+from .recommendations import build_neighbors, compute_neighbors, load_views, numpy
+from .replicas import use_replicas
+from .search import get_search_backend
+from .serializers import ListingSerializer
+from .stats import rollup
+
+def haversine_km(first, second):
+    (lat1, lng1), (lat2, lng2) = (map(math.radians, point) for point in (first, second))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def make_listing(owner, **kwargs):
+    data = {
+        "title": "Квартира",
+        "description": "Светлая квартира в центре",
+        "location": "Berlin",
+        "price": "100.00",
+        "rooms": 2,
+        "property_type": Listing.PropertyType.APARTMENT,
+    }
+    data.update(kwargs)
+    return Listing.objects.create(owner=owner, **data)
+
+
+class ListingQueryCountTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listings = [make_listing(self.landlord, title=f"Listing {i}") for i in range(20)]
+        for listing in self.listings:
+            for rating in (3, 4, 4):
+                Review.objects.create(listing=listing, author=self.tenant, rating=rating, comment="ok")
+        rebuild_ratings()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def test_list_does_not_query_reviews_per_listing(self):
+        # Приблизительное количество и страница
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/listings/")
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual(len(results), 20)
+        self.assertEqual(results[0]["reviews_count"], 3)
+        self.assertEqual(results[0]["average_rating"], 3.7)
+        self.assertEqual(results[0]["owner"]["username"], "landlord")
+
+    def test_detail_is_a_single_query(self):
+        listing = self.listings[0]
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/listings/{listing.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["reviews_count"], 3)
+        self.assertEqual(response.data["average_rating"], 3.7)
+
+    def test_listing_without_reviews(self):
+        listing = make_listing(self.landlord, title="Пустое")
+        response = self.client.get(f"/api/listings/{listing.pk}/")
+        self.assertEqual(response.data["reviews_count"], 0)
+        self.assertIsNone(response.data["average_rating"])
+
+
+class IndexAuditTests(TestCase):
+    def test_view_queries_do_not_scan_tables(self):
+        out = StringIO()
+        call_command("index_audit", "--fail", stdout=out)
+        self.assertIn("Запросов с полным сканированием: 0", out.getvalue())
+
+
+class ListingRatingSummaryTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listing = make_listing(self.landlord)
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def post_review(self, listing, rating):
+        return self.client.post(
+            f"/api/listings/{listing.pk}/reviews/", {"rating": rating, "comment": "ok"}
+        )
+
+    def test_summary_follows_review_create_update_delete(self):
+        first = self.post_review(self.listing, 5).data
+        self.post_review(self.listing, 2)
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.reviews_count, self.listing.rating_sum), (2, 7))
+        self.assertEqual(self.listing.average_rating, 3.5)
+
+        self.client.patch(f"/api/listings/{self.listing.pk}/reviews/{first['id']}/", {"rating": 3})
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.reviews_count, self.listing.rating_sum), (2, 5))
+
+        self.client.delete(f"/api/listings/{self.listing.pk}/reviews/{first['id']}/")
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.reviews_count, self.listing.rating_sum), (1, 2))
+        self.assertEqual(self.listing.average_rating, 2)
+
+    def test_ordering_and_min_rating(self):
+        best = make_listing(self.landlord, title="Лучшее")
+        make_listing(self.landlord, title="Без отзывов")
+        self.post_review(self.listing, 3)
+        self.post_review(best, 5)
+
+        response = self.client.get("/api/listings/", {"ordering": "rating"})
+        self.assertEqual([row["title"] for row in response.data["results"]][:2], ["Лучшее", "Квартира"])
+
+        response = self.client.get("/api/listings/", {"min_rating": 4})
+        self.assertEqual([row["title"] for row in response.data["results"]], ["Лучшее"])
+
+    def test_rebuild_command(self):
+        Review.objects.create(listing=self.listing, author=self.tenant, rating=4, comment="ok")
+        Review.objects.create(listing=self.listing, author=self.tenant, rating=1, comment="ok")
+        call_command("rebuild_listing_ratings", batch_size=1, stdout=StringIO())
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.reviews_count, self.listing.rating_sum), (2, 5))
+        self.assertEqual(self.listing.average_rating, 2.5)
+
+
+class ListingSearchTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.client = APIClient()
+        self.client.force_authenticate(self.landlord)
+
+    def search(self, q):
+        response = self.client.get("/api/listings/", {"q": q})
+        return [row["title"] for row in response.data["results"]]
+
+    def check_search(self):
+        make_listing(self.landlord, title="Дом у моря", description="Вид на море и море рядом")
+        make_listing(self.landlord, title="Квартира", description="Вид на парк, до моря час")
+        lodge = make_listing(self.landlord, title="Студия", description="Тихий двор")
+
+        self.assertEqual(self.search("море"), ["Дом у моря"])
+        self.assertEqual(self.search("мор"), ["Дом у моря", "Квартира"])
+        self.assertEqual(self.search("вид парк"), ["Квартира"])
+        self.assertEqual(self.search("!!!"), [])
+
+        lodge.description = "Вид на море"
+        lodge.save()
+        self.assertIn("Студия", self.search("море"))
+        lodge.delete()
+        self.assertNotIn("Студия", self.search("море"))
+
+    def test_default_backend(self):
+        self.check_search()
+
+    @override_settings(LISTING_SEARCH_BACKEND="rente.search.InMemorySearchBackend")
+    def test_in_memory_backend(self):
+        get_search_backend().clear()
+        self.check_search()
+
+
+class BookingAvailabilityTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listing = make_listing(self.landlord)
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def book(self, start_date, end_date):
+        return self.client.post(
+            "/api/bookings/",
+            {"listing": self.listing.pk, "start_date": start_date, "end_date": end_date},
+        )
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.book("2030-07-10", "2030-07-17").status_code, 201)
+        self.assertEqual(self.book("2030-07-17", "2030-07-20").status_code, 403)
+        self.assertEqual(self.book("2030-07-18", "2030-07-20").status_code, 201)
+
+    def test_canceled_booking_frees_dates(self):
+        Booking.objects.create(
+            listing=self.listing, tenant=self.tenant, status=Booking.Status.CANCELED,
+            start_date=date(2030, 7, 10), end_date=date(2030, 7, 17),
+        )
+        self.assertEqual(self.book("2030-07-12", "2030-07-14").status_code, 201)
+
+    def test_end_before_start_is_invalid(self):
+        self.assertEqual(self.book("2030-07-17", "2030-07-10").status_code, 400)
+
+    def test_status_change_uses_current_status(self):
+        self.assertEqual(self.book("2030-07-10", "2030-07-17").status_code, 201)
+        stale = Booking.objects.get(listing=self.listing)
+        set_booking_status(Booking.objects.get(pk=stale.pk), Booking.Status.CANCELED)
+        self.assertEqual(self.book("2030-07-12", "2030-07-14").status_code, 201)
+        # Объект со статусом до отмены: возврат в активное всё равно проверяет пересечения
+        with self.assertRaises(BookingConflict):
+            set_booking_status(stale, Booking.Status.CONFIRMED)
+
+
+class AvailabilityCalendarTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listing = make_listing(self.landlord)
+        self.client = APIClient()
+
+    def calendar(self, start, end):
+        self.client.force_authenticate(self.tenant)
+        response = self.client.get(
+            f"/api/listings/{self.listing.pk}/availability/", {"from": start, "to": end}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [day.isoformat() for day in response.data["occupied"]]
+
+    def test_calendar_follows_bookings(self):
+        self.client.force_authenticate(self.tenant)
+        booking = self.client.post(
+            "/api/bookings/",
+            {"listing": self.listing.pk, "start_date": "2030-12-30", "end_date": "2031-01-02"},
+        ).data
+        self.assertEqual(
+            self.calendar("2030-12-29", "2031-01-03"),
+            ["2030-12-30", "2030-12-31", "2031-01-01", "2031-01-02"],
+        )
+
+        self.client.force_authenticate(self.landlord)
+        self.client.post(f"/api/bookings/{booking['id']}/confirm/")
+        self.assertEqual(len(self.calendar("2030-12-29", "2031-01-03")), 4)
+
+        self.client.force_authenticate(self.tenant)
+        self.client.post(f"/api/bookings/{booking['id']}/cancel/")
+        self.assertEqual(self.calendar("2030-12-29", "2031-01-03"), [])
+
+    def test_calendar_reads_only_bitmaps(self):
+        self.client.force_authenticate(self.tenant)
+        with self.assertNumQueries(2):
+            self.client.get(
+                f"/api/listings/{self.listing.pk}/availability/", {"from": "2030-01-01", "to": "2030-12-31"}
+            )
+
+    def test_invalid_period(self):
+        self.client.force_authenticate(self.tenant)
+        url = f"/api/listings/{self.listing.pk}/availability/"
+        self.assertEqual(self.client.get(url, {"from": "2030-02-30"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"from": "2030-01-01", "to": "2031-06-01"}).status_code, 400)
+
+    def test_rebuild(self):
+        Booking.objects.create(
+            listing=self.listing, tenant=self.tenant, start_date=date(2030, 7, 10), end_date=date(2030, 7, 11)
+        )
+        Booking.objects.create(
+            listing=self.listing, tenant=self.tenant, status=Booking.Status.CANCELED,
+            start_date=date(2030, 7, 12), end_date=date(2030, 7, 13),
+        )
+        rebuild_occupancy(batch_size=1)
+        self.assertEqual(ListingOccupancy.objects.count(), 1)
+        self.assertEqual(self.calendar("2030-07-09", "2030-07-14"), ["2030-07-10", "2030-07-11"])
+
+
+class ListingDateFilterTests(TestCase):
+    def setUp(self):
+        landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.free = make_listing(landlord, title="Свободно")
+        self.booked = make_listing(landlord, title="Занято")
+        self.canceled = make_listing(landlord, title="Отменено")
+        Booking.objects.create(
+            listing=self.booked, tenant=self.tenant, start_date=date(2030, 7, 15), end_date=date(2030, 7, 20)
+        )
+        Booking.objects.create(
+            listing=self.canceled, tenant=self.tenant, status=Booking.Status.CANCELED,
+            start_date=date(2030, 7, 10), end_date=date(2030, 7, 17),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def titles(self, **params):
+        return sorted(row["title"] for row in self.client.get("/api/listings/", params).data["results"])
+
+    def test_excludes_listings_with_active_overlap(self):
+        self.assertEqual(
+            self.titles(check_in="2030-07-10", check_out="2030-07-17"), ["Отменено", "Свободно"]
+        )
+        self.assertEqual(
+            self.titles(check_in="2030-07-21", check_out="2030-07-25"), ["Занято", "Отменено", "Свободно"]
+        )
+
+    def test_single_query(self):
+        with self.assertNumQueries(2):
+            self.client.get("/api/listings/", {"check_in": "2030-07-10", "check_out": "2030-07-17"})
+
+    def test_both_dates_required(self):
+        response = self.client.get("/api/listings/", {"check_in": "2030-07-10"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ViewCounterTests(TestCase):
+    def setUp(self):
+        landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listings = [make_listing(landlord, title=f"Listing {i}") for i in range(3)]
+
+    def test_view_action(self):
+        client = APIClient()
+        client.force_authenticate(self.tenant)
+        for _ in range(3):
+            self.assertEqual(client.post(f"/api/listings/{self.listings[0].pk}/view/").status_code, 200)
+        self.listings[0].refresh_from_db()
+        self.assertEqual(self.listings[0].views_count, 3)
+        self.assertEqual(ViewHistory.objects.filter(listing=self.listings[0]).count(), 3)
+
+    @override_settings(VIEW_COUNTER={"BATCH_SIZE": 1000, "FLUSH_INTERVAL_MS": 3_600_000, "BACKGROUND": False})
+    def test_events_are_buffered_and_aggregated(self):
+        counter = ViewCounter()
+        first, second, deleted = self.listings
+        events = [(first.pk, self.tenant.pk)] * 5 + [(second.pk, self.tenant.pk)] * 2
+        # Без фонового потока put сбрасывает буфер сразу
+        with mock.patch.object(counter, "flush"):
+            for event in events + [(deleted.pk, self.tenant.pk)]:
+                counter.put(event)
+        deleted.delete()
+        self.assertEqual(ViewHistory.objects.count(), 0)
+
+        with self.assertNumQueries(6):
+            self.assertEqual(counter.flush(), 8)
+        self.assertEqual(
+            dict(Listing.objects.values_list("title", "views_count")), {"Listing 0": 5, "Listing 1": 2}
+        )
+        self.assertEqual(ViewHistory.objects.count(), 7)
+
+    @override_settings(VIEW_COUNTER={"BACKGROUND": False, "MAX_RETRIES": 2})
+    def test_failed_batch_is_requeued(self):
+        counter = ViewCounter()
+        listing = self.listings[0]
+        with mock.patch.object(counter, "flush"):
+            counter.put((listing.pk, self.tenant.pk))
+            counter.put((listing.pk, self.tenant.pk))
+
+        with mock.patch.object(ViewCounter, "write", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                counter.flush()
+        self.assertEqual(counter.flush(), 2)
+        listing.refresh_from_db()
+        self.assertEqual(listing.views_count, 2)
+
+        # После MAX_RETRIES неудач подряд пакет отбрасывается
+        with mock.patch.object(counter, "flush"):
+            counter.put((listing.pk, self.tenant.pk))
+        with mock.patch.object(ViewCounter, "write", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                counter.flush()
+            with self.assertRaises(RuntimeError), self.assertLogs("rente.buffers", "ERROR"):
+                counter.flush()
+        self.assertEqual(counter.flush(), 0)
+
+
+class SearchLogTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+
+    def test_only_list_searches_are_logged(self):
+        listing = make_listing(self.landlord)
+        client = APIClient()
+        client.force_authenticate(self.tenant)
+        client.get("/api/listings/", {"q": "квартира у парка"})
+        client.get(f"/api/listings/{listing.pk}/", {"q": "квартира в центре"})
+        self.assertEqual(list(SearchHistory.objects.values_list("query", flat=True)), ["квартира у парка"])
+
+    @override_settings(SEARCH_LOG={"BATCH_SIZE": 1000, "FLUSH_INTERVAL_MS": 3_600_000, "BACKGROUND": False})
+    def test_duplicates_within_window_are_dropped(self):
+        log = SearchLog()
+        with mock.patch.object(log, "flush"):
+            for query in ("Вид на море", "вид  на море", "центр", "Вид на море"):
+                log.put((self.tenant.pk, query))
+            log.put((self.landlord.pk, "центр"))
+        self.assertEqual(SearchHistory.objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(log.flush(), 3)
+        self.assertEqual(SearchHistory.objects.filter(user=self.tenant).count(), 2)
+
+    def test_compaction(self):
+        for i in range(5):
+            SearchHistory.objects.create(user=self.tenant, query=f"запрос {i}")
+        SearchHistory.objects.create(user=self.tenant, query="запрос 4")
+        SearchHistory.objects.create(user=self.landlord, query="центр")
+
+        call_command("compact_search_history", keep=3, stdout=StringIO())
+        self.assertEqual(
+            list(SearchHistory.objects.filter(user=self.tenant).order_by("id").values_list("query", flat=True)),
+            ["запрос 2", "запрос 3", "запрос 4"],
+        )
+        self.assertTrue(SearchHistory.objects.filter(user=self.landlord).exists())
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listings = [make_listing(self.landlord, title=f"Listing {i}") for i in range(5)]
+        a, b, c, d, _ = self.listings
+        # b смотрят вместе с a чаще, чем c и d; e не смотрел никто
+        for i, viewed in enumerate(([a, b], [a, b], [a, c, d], [c, d])):
+            user = User.objects.create_user(f"user{i}")
+            for listing in viewed:
+                ViewHistory.objects.create(user=user, listing=listing)
+
+    def test_neighbors_are_built_from_co_views(self):
+        a, b, c, d, _ = self.listings
+        self.assertEqual(build_neighbors(top_k=2), 4)
+        neighbors = list(
+            ListingNeighbor.objects.filter(listing=a).order_by("-score").values_list("neighbor_id", "score")
+        )
+        self.assertEqual([neighbor for neighbor, _ in neighbors], [b.pk, c.pk])
+        self.assertAlmostEqual(neighbors[0][1], 2 / (3 * 2) ** 0.5)
+        self.assertEqual(ListingNeighbor.objects.filter(listing=d).count(), 2)
+
+    @skipUnless(numpy, "NumPy не установлен")
+    def test_vectorized_build_matches_python(self):
+        pairs = list(load_views())
+        self.assertEqual(compute_neighbors(pairs, vectorized=True), compute_neighbors(pairs, vectorized=False))
+
+    def test_recommended_endpoint(self):
+        a, b, c, d, e = self.listings
+        build_neighbors()
+        ViewHistory.objects.create(user=self.tenant, listing=a)
+        client = APIClient()
+        client.force_authenticate(self.tenant)
+
+        # Соседи a по убыванию сходства, затем популярные; просмотренное исключено
+        with self.assertNumQueries(5):
+            response = client.get("/api/listings/recommended/", {"limit": 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([listing["id"] for listing in response.data], [b.pk, c.pk, d.pk, e.pk])
+
+        new_user = User.objects.create_user("new")
+        client.force_authenticate(new_user)
+        self.assertEqual(len(client.get("/api/listings/recommended/").data), 5)
+        self.assertEqual(client.get("/api/listings/recommended/", {"limit": "x"}).status_code, 400)
+
+
+class ListingStatsTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listing = make_listing(self.landlord, price=100)
+        self.today = timezone.localdate()
+        for _ in range(3):
+            ViewHistory.objects.create(user=self.tenant, listing=self.listing)
+        self.booking = Booking.objects.create(
+            listing=self.listing, tenant=self.tenant,
+            start_date=self.today + timedelta(days=1), end_date=self.today + timedelta(days=4),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.landlord)
+
+    def stats(self, client=None, **params):
+        return (client or self.client).get(f"/api/listings/{self.listing.pk}/stats/", params)
+
+    def test_rollup_is_incremental(self):
+        self.assertEqual(rollup(lag=timedelta(0)), {"views": 3, "bookings": 1, "invalidations": 0})
+        ViewHistory.objects.create(user=self.tenant, listing=self.listing)
+        # Повторный запуск учитывает только новые строки
+        self.assertEqual(rollup(lag=timedelta(0)), {"views": 1, "bookings": 0, "invalidations": 0})
+        row = ListingDailyStats.objects.get(listing=self.listing)
+        self.assertEqual((row.views, row.bookings), (4, 1))
+        # Строки моложе задержки ждут следующего запуска
+        ViewHistory.objects.create(user=self.tenant, listing=self.listing)
+        self.assertEqual(rollup()["views"], 0)
+
+    def test_nights_follow_booking_status(self):
+        response = self.client.post(f"/api/bookings/{self.booking.pk}/confirm/")
+        self.assertEqual(response.status_code, 200)
+        rollup(lag=timedelta(0))
+        upcoming = {"from": self.today.isoformat(), "to": (self.today + timedelta(days=30)).isoformat()}
+        data = self.stats(**upcoming).data
+        self.assertEqual((data["views"], data["bookings"], data["nights"]), (3, 1, 3))
+        self.assertEqual(data["revenue"], 300)
+        self.assertAlmostEqual(data["occupancy_rate"], 3 / 31, places=4)
+
+        self.booking.refresh_from_db()
+        set_booking_status(self.booking, Booking.Status.CANCELED)
+        self.assertEqual(ListingStatsInvalidation.objects.count(), 1)
+        rollup(lag=timedelta(0))
+        data = self.stats(**upcoming).data
+        self.assertEqual((data["nights"], data["revenue"]), (0, 0))
+        self.assertFalse(ListingStatsInvalidation.objects.exists())
+
+    def test_stats_endpoint(self):
+        rollup(lag=timedelta(0))
+        # Объявление и статистика за период, независимо от объёма истории
+        with self.assertNumQueries(2):
+            response = self.stats(**{"from": self.today.isoformat(), "to": self.today.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["days"][0]["views"], 3)
+        # По умолчанию — последние 30 дней, включая сегодня
+        data = self.stats().data
+        self.assertEqual((data["from"], data["to"]), (self.today - timedelta(days=30), self.today))
+        self.assertEqual(data["views"], 3)
+
+        client = APIClient()
+        client.force_authenticate(self.tenant)
+        self.assertEqual(self.stats(client).status_code, 403)
+        self.assertEqual(self.stats(**{"from": "x"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/listings/0/stats/").status_code, 404)
+
+
+class GeoSearchTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.client = APIClient()
+        self.client.force_authenticate(self.landlord)
+
+    def near(self, **params):
+        response = self.client.get("/api/listings/", {"page_size": 100, **params})
+        self.assertEqual(response.status_code, 200)
+        return {listing["id"] for listing in response.data["results"]}
+
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(geo.next_prefix("u4z"), "u5")
+        self.assertIsNone(geo.next_prefix("zz"))
+
+    def test_near_matches_haversine(self):
+        rng = random.Random(0)
+        center = (52.52, 13.405)
+        listings = [
+            make_listing(
+                self.landlord, title=f"Listing {i}",
+                latitude=center[0] + rng.uniform(-0.2, 0.2), longitude=center[1] + rng.uniform(-0.3, 0.3),
+            )
+            for i in range(200)
+        ]
+        make_listing(self.landlord, title="Без координат")
+        for radius in (1, 5, 15):
+            expected = {
+                listing.pk for listing in listings
+                if haversine_km(center, (listing.latitude, listing.longitude)) <= radius
+            }
+            self.assertEqual(self.near(near="52.52,13.405", radius=radius), expected)
+        self.assertTrue(expected)
+
+    def test_geohash_follows_coordinates(self):
+        listing = make_listing(self.landlord, latitude=52.52, longitude=13.405)
+        self.assertEqual(listing.geohash, geo.encode(52.52, 13.405))
+        listing.latitude, listing.longitude = 48.137, 11.575
+        listing.save(update_fields=["latitude", "longitude"])
+        listing.refresh_from_db()
+        self.assertTrue(listing.geohash.startswith("u28"))
+        self.assertEqual(self.near(near="48.137,11.575", radius=1), {listing.pk})
+
+    def test_invalid_params(self):
+        for params in ({"near": "x"}, {"near": "91,0"}, {"near": "1,2", "radius": "0"}, {"near": "1,2", "radius": "y"}):
+            self.assertEqual(self.client.get("/api/listings/", params).status_code, 400)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.admin = User.objects.create_user("admin", is_staff=True)
+        listing = make_listing(self.landlord)
+        Booking.objects.create(
+            listing=listing, tenant=self.tenant, start_date=date(2030, 1, 1), end_date=date(2030, 1, 5)
+        )
+        self.client = APIClient()
+
+    def test_metrics_per_route_in_prometheus_format(self):
+        self.client.force_authenticate(self.tenant)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/bookings/")
+        query_count = len(queries)
+        self.client.get("/api/bookings/")
+        self.assertEqual(self.client.get("/api/admin/metrics/").status_code, 403)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/api/admin/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        self.assertIn("# TYPE rente_request_duration_seconds summary", text)
+        self.assertIn('rente_request_duration_seconds_count{route="BookingViewSet.list"} 2', text)
+        self.assertIn(f'rente_sql_queries_sum{{route="BookingViewSet.list"}} {2 * query_count}', text)
+        self.assertIn(f'rente_sql_queries{{route="BookingViewSet.list",quantile="0.99"}} {query_count}', text)
+        self.assertIn('rente_serializer_duration_seconds_count{route="MetricsAPIView.get"}', text)
+
+    @override_settings(INSTRUMENTATION={"SLOW_REQUEST_MS": 0.001})
+    def test_slow_requests_are_logged(self):
+        self.client.force_authenticate(self.tenant)
+        with self.assertLogs("rente.metrics", "WARNING") as logs:
+            self.client.get("/api/listings/recommended/")
+        self.assertIn("(ListingViewSet.recommended)", logs.output[0])
+        self.assertIn("1x SELECT", logs.output[0])
+
+    def test_serializer_time(self):
+        listing = Listing.objects.get()
+        for serializer in (ListingSerializer(listing), ListingSerializer([listing], many=True)):
+            with measure_request() as metrics:
+                serializer.data
+            self.assertGreater(metrics.serializer_duration, 0)
+
+    def test_histogram_precision(self):
+        histogram = Histogram()
+        for value in range(1, 100_001):
+            histogram.record(value)
+        for q in (0.5, 0.9, 0.99):
+            self.assertLess(abs(histogram.quantile(q) - q * 100_000) / (q * 100_000), 1 / 32)
+        self.assertEqual(histogram.quantile(1), 100_000)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_dataset_keeps_active_bookings_disjoint(self):
+        counts = create_dataset(scale=0.05, seed=1)
+        self.assertEqual(Listing.objects.count(), counts["listings"])
+        self.assertEqual(User.objects.filter(role=User.Role.LANDLORD).count(), counts["landlords"])
+        self.assertEqual(ViewHistory.objects.count(), counts["views"])
+
+        bookings = Booking.objects.order_by("listing_id", "start_date")
+        self.assertTrue(bookings.filter(status=Booking.Status.CANCELED).exists())
+        previous = {}
+        for booking in bookings.exclude(status=Booking.Status.CANCELED):
+            self.assertGreaterEqual(booking.start_date, previous.get(booking.listing_id, booking.start_date))
+            previous[booking.listing_id] = booking.end_date
+
+    def test_scenarios_run_through_client(self):
+        create_dataset(scale=0.05)
+        context = ScenarioContext(users=3)
+        for scenario in SCENARIOS:
+            requests = build_requests(scenario, context, 5)
+            self.assertEqual(requests, build_requests(scenario, context, 5))
+            result = summarize(scenario, "client", *run_client(requests), 1)
+            self.assertEqual(result["errors"], 0, scenario)
+            self.assertEqual(result["requests"], 5)
+
+
+class BulkListingTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        make_listing(self.landlord, title="Существующая")
+        self.client = APIClient()
+        self.client.force_authenticate(self.landlord)
+
+    def test_ndjson_import_reports_row_errors(self):
+        rows = [
+            {"title": "Дом у моря", "description": "Тихо", "location": "Sochi", "price": "90", "rooms": 3,
+             "property_type": "house"},
+            {"title": "Существующая", "description": "Дубликат", "location": "Berlin", "price": "100",
+             "rooms": 2, "property_type": "apartment"},
+            {"title": "Без цены", "description": "x", "location": "Riga", "rooms": 1, "property_type": "room"},
+        ]
+        body = "\n".join(json.dumps(row, ensure_ascii=False) for row in rows) + "\n{oops\n"
+
+        with self.assertNumQueries(6):
+            # Дубликаты, bulk_create и поисковый индекс — на всю пачку (+ SAVEPOINT/RELEASE)
+            response = self.client.post(
+                "/api/listings/import/", body.encode(), content_type="application/x-ndjson"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([error["line"] for error in response.data["errors"]], [2, 3, 4])
+        self.assertIn("price", response.data["errors"][1]["errors"])
+
+        listing = Listing.objects.get(title="Дом у моря")
+        self.assertEqual(listing.owner, self.landlord)
+        self.assertIn(listing, get_search_backend().search(Listing.objects.all(), "моря"))
+
+    def test_csv_export_round_trips_through_import(self):
+        response = self.client.get("/api/listings/export/", {"format": "csv"})
+        self.assertTrue(response.streaming)
+        exported = b"".join(response.streaming_content).decode()
+        self.assertTrue(exported.startswith("id,title,description"))
+
+        Listing.objects.all().delete()
+        out = StringIO()
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as file:
+            file.write(exported)
+        self.addCleanup(os.remove, file.name)
+        call_command("import_listings", file.name, owner="landlord", stdout=out)
+        self.assertIn("Создано объявлений: 1", out.getvalue())
+        self.assertTrue(Listing.objects.filter(title="Существующая", price=100).exists())
+
+    def test_large_chunk_matches_duplicate_pairs(self):
+        make_listing(self.landlord, title="Дом", location="Riga")
+        row = {"description": "x", "price": "50", "rooms": 1, "property_type": "room"}
+        rows = [{**row, "title": f"Квартира {i}", "location": "Riga"} for i in range(1500)]
+        # Совпадают поля по отдельности, но не пара: не дубликат
+        rows += [{**row, "title": "Дом", "location": "Berlin"}, {**row, "title": "Существующая", "location": "Riga"}]
+        rows.append({**row, "title": "Существующая", "location": "Berlin"})
+
+        report = import_listings(((i, row, None) for i, row in enumerate(rows, 1)), self.landlord, chunk_size=2000)
+        self.assertEqual((report["created"], report["failed"]), (1502, 1))
+        self.assertEqual(report["errors"][0]["line"], 1503)
+
+    def test_import_requires_supported_format(self):
+        response = self.client.post("/api/listings/import/", {"title": "x"}, format="json")
+        self.assertEqual(response.status_code, 415)
+
+
+class HistoryExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tenant")
+        SearchHistory.objects.bulk_create(SearchHistory(user=self.user, query=f"запрос {i}") for i in range(50))
+        SearchHistory.objects.create(user=User.objects.create_user("other"), query="чужой")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ndjson_export_streams_all_rows(self):
+        response = self.client.get("/api/searches/", {"format": "ndjson"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        with self.assertNumQueries(1):
+            rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 50)
+        self.assertEqual(set(rows[0]), {"id", "user", "query", "searched_at"})
+        self.assertEqual(rows[0]["user"], self.user.pk)
+
+    def test_csv_export_has_header(self):
+        ViewHistory.objects.create(user=self.user, listing=make_listing(User.objects.get(username="other")))
+        response = self.client.get("/api/views/", {"format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,user,listing,viewed_at")
+        self.assertEqual(len(lines), 2)
+
+    def test_json_stays_paginated(self):
+        response = self.client.get("/api/searches/")
+        self.assertEqual(len(response.data["results"]), 20)
+
+
+@override_settings(LISTING_RESPONSE_CACHE={"ENABLED": False})
+class FastListSerializerContractTests(TestCase):
+    """Быстрый вывод списков должен совпадать с ModelSerializer байт в байт."""
+
+    def setUp(self):
+        landlord = User.objects.create_user("landlord", email="l@example.com", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        listings = [
+            make_listing(landlord, title=f"Квартира {i}", price=f"{i}9.50", rooms=i, is_active=i != 3)
+            for i in range(1, 6)
+        ]
+        Review.objects.create(listing=listings[0], author=self.tenant, rating=4, comment="ok")
+        Review.objects.create(listing=listings[0], author=self.tenant, rating=5, comment="")
+        rebuild_ratings()
+        Booking.objects.create(
+            listing=listings[1], tenant=self.tenant, start_date=date(2030, 1, 1), end_date=date(2030, 1, 5)
+        )
+        ViewHistory.objects.create(user=self.tenant, listing=listings[0])
+        SearchHistory.objects.create(user=self.tenant, query="квартира")
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+        self.urls = [
+            ("/api/listings/", {}),
+            ("/api/listings/", {"q": "квартира", "ordering": "price_desc"}),
+            ("/api/listings/", {"ordering": "rating", "page_size": 2}),
+            ("/api/bookings/", {}),
+            (f"/api/listings/{listings[0].pk}/reviews/", {}),
+            ("/api/views/", {}),
+            ("/api/searches/", {}),
+        ]
+
+    def test_output_matches_model_serializers(self):
+        for url, params in self.urls:
+            with self.subTest(url=url, params=params):
+                with override_settings(FAST_LIST_SERIALIZERS=True):
+                    fast = self.client.get(url, params)
+                with override_settings(FAST_LIST_SERIALIZERS=False):
+                    slow = self.client.get(url, params)
+                self.assertEqual(fast.status_code, 200)
+                data = fast.json()
+                self.assertTrue(data["results"] if isinstance(data, dict) else data)
+                self.assertEqual(fast.content, slow.content)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.client = APIClient()
+        self.client.force_authenticate(self.landlord)
+
+    def walk(self, url, params):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            if not response.data["next"]:
+                return pages
+            response = self.client.get(response.data["next"])
+
+    def test_listings_by_date_and_price(self):
+        listings = [make_listing(self.landlord, title=f"L{i}", price=100 + i % 3) for i in range(25)]
+
+        pages = self.walk("/api/listings/", {"page_size": 10})
+        self.assertEqual([len(page["results"]) for page in pages], [10, 10, 5])
+        ids = [row["id"] for page in pages for row in page["results"]]
+        self.assertEqual(ids, [listing.pk for listing in reversed(listings)])
+        self.assertEqual(pages[0]["count"], 25)
+        self.assertTrue(pages[0]["count_is_exact"])
+
+        pages = self.walk("/api/listings/", {"page_size": 7, "ordering": "price_asc"})
+        rows = [row for page in pages for row in page["results"]]
+        self.assertEqual(len({row["id"] for row in rows}), 25)
+        self.assertEqual(
+            [(row["price"], row["id"]) for row in rows], sorted((row["price"], row["id"]) for row in rows)
+        )
+
+        previous = self.client.get(pages[2]["previous"]).data
+        self.assertEqual(previous["results"], pages[1]["results"])
+
+    def test_search_results_use_offset_cursor(self):
+        for i in range(5):
+            make_listing(self.landlord, title=f"Дом {i}")
+        pages = self.walk("/api/listings/", {"q": "дом", "page_size": 2})
+        self.assertEqual(len({row["id"] for page in pages for row in page["results"]}), 5)
+        # Курсор keyset в выдаче по смещению, как и наоборот, отклоняется
+        for cursor in ({}, {"k": [1]}):
+            response = self.client.get("/api/listings/", {"q": "дом", "cursor": KeysetPagination().cursor_token(cursor)})
+            self.assertEqual(response.status_code, 404)
+
+    def test_history_and_invalid_cursor(self):
+        listing = make_listing(self.landlord)
+        for _ in range(5):
+            ViewHistory.objects.create(user=self.landlord, listing=listing)
+        pages = self.walk("/api/views/", {"page_size": 2})
+        ids = [row["id"] for page in pages for row in page["results"]]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(self.client.get("/api/views/", {"cursor": "garbage"}).status_code, 404)
+        # Корректный base64 и JSON, но без ключа keyset
+        for cursor in ({}, {"o": 2}, {"k": "x"}):
+            response = self.client.get("/api/views/", {"cursor": KeysetPagination().cursor_token(cursor)})
+            self.assertEqual(response.status_code, 404)
+
+
+class ListingResponseCacheTests(TestCase):
+    def setUp(self):
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listing = make_listing(self.landlord)
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def check_cache(self):
+        first = self.client.get("/api/listings/", {"rooms": 2, "ordering": "date"})
+        self.assertEqual(first["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/listings/", {"ordering": "date", "rooms": " 2 "})
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.client.get("/api/listings/", {"rooms": 3})["X-Cache"], "MISS")
+
+        self.assertEqual(self.client.get(f"/api/listings/{self.listing.pk}/")["X-Cache"], "MISS")
+        response = self.client.get(f"/api/listings/{self.listing.pk}/")
+        self.assertEqual(response["X-Cache"], "HIT")
+        # В кэше простой dict, а не ReturnDict со ссылкой на сериализатор
+        self.assertIs(type(response.data), dict)
+
+        # Отзыв и бронирование сбрасывают кэш
+        self.client.post(f"/api/listings/{self.listing.pk}/reviews/", {"rating": 5, "comment": "ok"})
+        response = self.client.get(f"/api/listings/{self.listing.pk}/")
+        self.assertEqual((response["X-Cache"], response.data["reviews_count"]), ("MISS", 1))
+        self.client.post(
+            "/api/bookings/",
+            {"listing": self.listing.pk, "start_date": "2030-07-10", "end_date": "2030-07-17"},
+        )
+        response = self.client.get("/api/listings/", {"check_in": "2030-07-10", "check_out": "2030-07-11"})
+        self.assertEqual((response["X-Cache"], response.data["results"]), ("MISS", []))
+
+    def test_locmem_backend(self):
+        self.check_cache()
+
+    @override_settings(LISTING_RESPONSE_CACHE={"BACKEND": "django"})
+    def test_django_cache_backend(self):
+        self.check_cache()
+
+
+class CookieJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        token_user_cache.clear()
+        self.user = User.objects.create_user("tenant")
+        self.refresh = RefreshToken.for_user(self.user)
+
+    def test_user_is_loaded_once_per_token(self):
+        self.client.cookies["access_token"] = str(self.refresh.access_token)
+        # Пользователь и история
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get("/api/searches/").status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/searches/").status_code, 200)
+
+    def test_expired_access_cookie_is_refreshed(self):
+        expired = AccessToken.for_user(self.user)
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        self.client.cookies["access_token"] = str(expired)
+        self.client.cookies["refresh_token"] = str(self.refresh)
+
+        response = self.client.get("/api/searches/")
+        self.assertEqual(response.status_code, 200)
+        new_access = AccessToken(response.cookies["access_token"].value)
+        self.assertEqual(new_access["user_id"], self.user.pk)
+
+    def test_invalid_cookies_are_cleared(self):
+        self.client.cookies["access_token"] = "garbage"
+        response = self.client.get("/api/searches/")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.cookies["access_token"].value, "")
+
+
+@override_settings(LISTING_RESPONSE_CACHE={"ENABLED": False})
+class RoleClaimPermissionTests(TestCase):
+    """Роль и владелец проверяются без запросов: роль из токена, владелец по *_id."""
+
+    def setUp(self):
+        token_user_cache.clear()
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.other = User.objects.create_user("other")
+        self.admin = User.objects.create_user("admin", role=User.Role.ADMIN)
+        self.listing = make_listing(self.landlord)
+        self.booking = Booking.objects.create(
+            listing=self.listing, tenant=self.tenant, start_date=date(2030, 1, 1), end_date=date(2030, 1, 5)
+        )
+        # Токены выпускаются заранее: выпуск пишет OutstandingToken
+        self.tenant_client, self.landlord_client, self.other_client, self.admin_client = (
+            self.client_for(user) for user in (self.tenant, self.landlord, self.other, self.admin)
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RoleRefreshToken.for_user(user).access_token}")
+        return client
+
+    def test_role_checks(self):
+        # Приблизительное количество и страница, пользователь не загружается
+        with self.assertNumQueries(2):
+            self.assertEqual(self.tenant_client.get("/api/listings/").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.tenant_client.post("/api/listings/", {}).status_code, 403)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.admin_client.get("/api/admin/metrics/").status_code, 200)
+
+    def test_booking_ownership_checks(self):
+        url = f"/api/bookings/{self.booking.pk}/"
+        with self.assertNumQueries(1):
+            response = self.tenant_client.get(url)
+        self.assertEqual(response.data["tenant"]["username"], "tenant")
+        # Арендатор не может подтвердить: бронирование с объявлением одним запросом
+        with self.assertNumQueries(1):
+            self.assertEqual(self.tenant_client.post(url + "confirm/").status_code, 403)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.other_client.post(url + "cancel/").status_code, 404)
+        # Бронирование, блокировка объявления, статус под блокировкой, период для статистики,
+        # новый статус (и SAVEPOINT/RELEASE)
+        with self.assertNumQueries(7):
+            self.assertEqual(self.landlord_client.post(url + "confirm/").status_code, 200)
+        self.assertEqual(self.tenant_client.post(url + "cancel/").status_code, 200)
+
+    def test_refresh_rereads_user(self):
+        refresh = RoleRefreshToken.for_user(self.landlord)
+        self.assertNotIn("role", refresh.payload)
+        client = Client()
+        client.cookies["refresh_token"] = str(refresh)
+
+        # Понижение роли действует с первого обновления access-токена
+        self.landlord.role = User.Role.TENANT
+        self.landlord.save()
+        response = client.post("/api/listings/", {"title": ""})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(AccessToken(response.cookies["access_token"].value)["role"], User.Role.TENANT)
+
+        # Заблокированный пользователь новый access-токен не получает.
+        # В пределах WINDOW запросы получают уже выпущенный токен: окно сбрасывается
+        self.landlord.is_active = False
+        self.landlord.save()
+        refresh_coalescer._tokens.clear()
+        client.cookies["refresh_token"] = str(refresh)
+        del client.cookies["access_token"]
+        response = client.get("/api/searches/")
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.cookies["refresh_token"].value, "")
+
+    def test_token_claims_build_user(self):
+        client = self.landlord_client
+        with self.assertNumQueries(0):
+            response = client.post("/api/listings/", {"title": ""})
+        self.assertEqual(response.status_code, 400)
+
+        # Старые токены без claims: пользователь загружается из БД один раз
+        legacy_token = RefreshToken.for_user(self.landlord).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {legacy_token}")
+        with self.assertNumQueries(1):
+            self.assertEqual(client.post("/api/listings/", {"title": ""}).status_code, 400)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.post("/api/listings/", {"title": ""}).status_code, 400)
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        token_user_cache.clear()
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listings = [make_listing(self.landlord, title=f"Listing {i}") for i in range(3)]
+        self.async_client.cookies["access_token"] = str(RefreshToken.for_user(self.tenant).access_token)
+
+    async def test_list_matches_sync_view(self):
+        response = await self.async_client.get("/api/async/listings/", {"page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([item["title"] for item in data["results"]], ["Listing 2", "Listing 1"])
+        self.assertEqual(data["count"], 3)
+
+        response = await self.async_client.get(data["next"])
+        self.assertEqual([item["title"] for item in response.json()["results"]], ["Listing 0"])
+
+    async def test_list_logs_search(self):
+        response = await self.async_client.get("/api/async/listings/", {"q": "квартира асинхронно"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(await SearchHistory.objects.filter(user=self.tenant, query="квартира асинхронно").aexists())
+
+    async def test_detail_and_availability(self):
+        listing = self.listings[0]
+        response = await self.async_client.get(f"/api/async/listings/{listing.pk}/")
+        self.assertEqual(response.json()["owner"]["username"], "landlord")
+
+        response = await self.async_client.get(
+            f"/api/async/listings/{listing.pk}/availability/", {"from": "2030-01-01", "to": "2030-01-05"}
+        )
+        self.assertEqual(len(response.json()["free"]), 5)
+
+        response = await self.async_client.get("/api/async/listings/0/")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_history_requires_authentication(self):
+        await SearchHistory.objects.acreate(user=self.tenant, query="Berlin")
+        response = await self.async_client.get("/api/async/searches/")
+        self.assertEqual([item["query"] for item in response.json()["results"]], ["Berlin"])
+
+        self.async_client.cookies.clear()
+        response = await self.async_client.get("/api/async/searches/")
+        self.assertEqual(response.status_code, 401)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        replicas = override_settings(READ_REPLICAS={"ALIASES": ["replica"], "STICKY_SECONDS": 5})
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        response_cache.bump()
+        self.landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        self.tenant = User.objects.create_user("tenant")
+        self.listing = make_listing(self.landlord)
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def test_reads_go_to_replica_until_user_writes(self):
+        self.assertEqual(self.client.get("/api/listings/").data["results"], [])
+
+        response = self.client.post(
+            "/api/bookings/",
+            {"listing": self.listing.pk, "start_date": "2030-07-10", "end_date": "2030-07-17"},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("use_primary", response.cookies)
+        self.assertFalse(Booking.objects.using("replica").exists())
+
+        # Пока cookie жива, пользователь читает с primary
+        results = self.client.get("/api/listings/").data["results"]
+        self.assertEqual([item["id"] for item in results], [self.listing.pk])
+
+    def test_buffered_writes_do_not_stick_to_primary(self):
+        response = self.client.post(f"/api/listings/{self.listing.pk}/view/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("use_primary", response.cookies)
+
+    def test_replica_responses_are_not_cached(self):
+        self.assertEqual(self.client.get("/api/listings/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/api/listings/")["X-Cache"], "MISS")
+        # С primary (после записи) ответ кэшируется
+        self.client.cookies["use_primary"] = "1"
+        self.assertEqual(self.client.get("/api/listings/")["X-Cache"], "MISS")
+        response = self.client.get("/api/listings/")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual([item["id"] for item in response.data["results"]], [self.listing.pk])
+
+    def test_other_viewsets_and_transactions_use_primary(self):
+        with use_replicas():
+            self.assertEqual(Listing.objects.count(), 0)
+            with transaction.atomic():
+                self.assertEqual(Listing.objects.count(), 1)
+        self.assertEqual(Listing.objects.count(), 1)
+        self.assertEqual(self.client.get("/api/bookings/").status_code, 200)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def test_parallel_requests_book_listing_once(self):
+        landlord = User.objects.create_user("landlord", role=User.Role.LANDLORD)
+        listing = make_listing(landlord)
+        tenants = [User.objects.create_user(f"tenant{i}") for i in range(8)]
+        barrier = threading.Barrier(len(tenants))
+        statuses = []
+
+        def book(tenant):
+            client = APIClient()
+            client.force_authenticate(tenant)
+            barrier.wait()
+            try:
+                response = client.post(
+                    "/api/bookings/",
+                    {"listing": listing.pk, "start_date": "2030-07-10", "end_date": "2030-07-17"},
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(tenant,)) for tenant in tenants]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [201] + [403] * (len(tenants) - 1))
+        self.assertEqual(Booking.objects.filter(listing=listing).count(), 1)
+
+
+class ConcurrentTokenRefreshTests(TransactionTestCase):
+    def setUp(self):
+        user = User.objects.create_user("tenant")
+        self.refresh = str(RefreshToken.for_user(user))
+        self.expired = AccessToken.for_user(user)
+        self.expired.set_exp(lifetime=-timedelta(minutes=1))
+
+    def fire(self, requests=50):
+        barrier = threading.Barrier(requests)
+        cookies = []
+
+        def request():
+            client = Client()
+            client.cookies["access_token"] = str(self.expired)
+            client.cookies["refresh_token"] = self.refresh
+            barrier.wait()
+            try:
+                response = client.get("/api/searches/")
+                if response.status_code == 200:
+                    cookies.append(response.cookies["access_token"].value)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=request) for _ in range(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return cookies
+
+    def test_parallel_refreshes_share_one_access_token(self):
+        with mock.patch.object(
+            RoleRefreshToken, "load_user", autospec=True, side_effect=RoleRefreshToken.load_user
+        ) as load_user:
+            cookies = self.fire()
+        self.assertEqual(len(cookies), 50)
+        self.assertEqual(len(set(cookies)), 1)
+        # Пользователя читает только запрос, выпустивший токен
+        self.assertEqual(load_user.call_count, 1)
+
+    @override_settings(JWT_REFRESH_COALESCING={"BACKEND": "django"})
+    def test_shared_cache_backend(self):
+        cache.clear()
+        cookies = self.fire()
+        self.assertEqual(len(cookies), 50)
+        # Другой процесс: локального кэша нет, токен берётся из общего
+        refresh_coalescer._tokens.clear()
+        cookies += self.fire(requests=5)
+        self.assertEqual(len(set(cookies)), 1)
@@ -0,0 +1,127 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .cache import LRUCache
+from .models import User
+
+# Поля пользователя в access-токене: по ним CachedJWTAuthentication собирает
+# пользователя без запроса к БД. Изменения вступают в силу со следующим
+# access-токеном, при обновлении пользователь читается из БД заново.
+TOKEN_USER_CLAIMS = ("username", "email", "role", "is_staff", "is_superuser", "is_active")
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh-токен, выпускающий access-токены с полями TOKEN_USER_CLAIMS.
+    Сам refresh-токен их не хранит: поля берутся из пользователя, заданного
+    for_user или load_user, а без него access-токен выпускается без них.
+    """
+
+    user = None
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.user = user
+        return token
+
+    def load_user(self):
+        """Читает пользователя токена из БД; None, если он удалён или заблокирован."""
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: self.payload.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            return None
+        self.user = user
+        return user
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        # Токены, выпущенные раньше, несут поля в самом refresh-токене: они не копируются
+        for claim in TOKEN_USER_CLAIMS:
+            if self.user is not None:
+                access[claim] = getattr(self.user, claim)
+            elif claim in access:
+                del access[claim]
+        return access
+
+
+class RefreshCoalescer:
+    """
+    Один выпуск access-токена на refresh-токен (по jti): параллельные запросы
+    с одним истёкшим cookie в течение WINDOW секунд получают тот же токен.
+    Внутри процесса запросы ждут на блокировке по jti, между процессами —
+    на ключе в кэше Django (BACKEND='django'). Пользователя из БД читает
+    только запрос, выпускающий токен, поэтому смена роли и блокировка
+    учитываются не раньше, чем через WINDOW секунд после выпуска.
+    """
+
+    defaults = {"BACKEND": "locmem", "CACHE_ALIAS": "default", "WINDOW": 10, "WAIT": 2.0}
+
+    def __init__(self):
+        self._tokens = LRUCache(10_000)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def options(self):
+        return {**self.defaults, **getattr(settings, "JWT_REFRESH_COALESCING", {})}
+
+    def access_token_for(self, refresh):
+        """Access-токен для refresh; None, если пользователь удалён или заблокирован."""
+        jti = refresh[api_settings.JTI_CLAIM]
+        token = self._tokens.get(jti)
+        if token is not None:
+            return token
+
+        with self._lock_for(jti):
+            token = self._tokens.get(jti)
+            if token is None:
+                token = self._shared(refresh) if self.options["BACKEND"] == "django" else self._issue(refresh)
+                if token is not None:
+                    self._tokens.set(jti, token, time.time() + self.options["WINDOW"])
+        with self._locks_guard:
+            self._locks.pop(jti, None)
+        return token
+
+    def _lock_for(self, jti):
+        with self._locks_guard:
+            return self._locks.setdefault(jti, threading.Lock())
+
+    def _issue(self, refresh):
+        # Поля access-токена берутся из БД: роль и блокировка действуют с этого обновления
+        if refresh.load_user() is None:
+            return None
+        return refresh.access_token
+
+    def _shared(self, refresh):
+        options = self.options
+        cache = caches[options["CACHE_ALIAS"]]
+        jti = refresh[api_settings.JTI_CLAIM]
+        token_key = f"rente:jwt-refresh:{jti}"
+        lock_key = f"{token_key}:lock"
+
+        deadline = time.monotonic() + options["WAIT"]
+        while True:
+            encoded = cache.get(token_key)
+            if encoded is not None:
+                return AccessToken(encoded)
+            if cache.add(lock_key, 1, options["WAIT"]):
+                token = self._issue(refresh)
+                if token is None:
+                    cache.delete(lock_key)
+                else:
+                    cache.set(token_key, str(token), options["WINDOW"])
+                return token
+            if time.monotonic() >= deadline:
+                return self._issue(refresh)
+            time.sleep(0.01)
+
+
+refresh_coalescer = RefreshCoalescer()
@@ -5,17 +5,36 @@ from datetime import timedelta
 from django.contrib.auth import authenticate
 from django.utils.timezone import now
 from rest_framework import viewsets, permissions, status, filters
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, UnsupportedMediaType, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.db import transaction
 from django.db.models import Q
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from .availability import (
+    save_booking, set_booking_status, delete_booking, occupancy_calendar, BookingConflict
+)
+from .buffers import view_counter, search_log
+from .bulk import MEDIA_TYPES, read_rows, import_listings, export_rows, EXPORT_FIELDS
+from .cache import CachedResponseMixin
+from .fast_serializers import FastListMixin
+from .filters import filter_listings, calendar_period, stats_period
 from .models import User, Listing, Booking, Review, ViewHistory, SearchHistory
-from .permissions import IsLandlord
+from .pagination import KeysetPagination, ListingPagination
+from .metrics import registry
+from .permissions import IsAdmin, IsLandlord, IsOwnerOrAdmin
+from .ratings import apply_review_change
+from .recommendations import recommend
+from .stats import listing_stats
+from .renderers import (
+    NDJSONRenderer, CSVRenderer, PrometheusRenderer, StreamingExportMixin, streaming_response
+)
+from .replicas import ReplicaReadMixin, buffered_write
+from .tokens import RoleRefreshToken
 from .serializers import (
     UserSerializer, RegisterSerializer,
     ListingSerializer, BookingSerializer,
@@ -59,7 +78,7 @@ class LogInAPIView(APIView):
                 status=status.HTTP_200_OK
             )
 
-            refresh_token = RefreshToken.for_user(user)
+            refresh_token = RoleRefreshToken.for_user(user)
             access_token = refresh_token.access_token
 
             access_expiry = datetime.datetime.fromtimestamp(access_token['exp'], datetime.timezone.utc)
@@ -105,6 +124,15 @@ class LogOutAPIView(APIView):
         return response
 
 
+# Метрики запросов по маршрутам (rente.metrics) для Prometheus
+class MetricsAPIView(APIView):
+    permission_classes = [permissions.IsAdminUser | IsAdmin]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request: Request) -> Response:
+        return Response(registry.prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # Профили пользователей (для примера/админов)
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
@@ -113,15 +141,20 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 # Объявления
-class ListingViewSet(viewsets.ModelViewSet):
+class ListingViewSet(ReplicaReadMixin, CachedResponseMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Listing.objects.all()
     serializer_class = ListingSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ListingPagination
+    keyset_ordering = ("-created_at", "-id")
 
 
 
     def get_permissions(self):
-        if self.request.method in permissions.SAFE_METHODS:
+        if self.action == "stats":
+            return [permissions.IsAuthenticated(), IsOwnerOrAdmin()]
+        # Просмотр объявления может записать любой авторизованный пользователь
+        if self.request.method in permissions.SAFE_METHODS or self.action == "view":
             return [permissions.IsAuthenticated()]
         return [IsLandlord()]
 
@@ -129,130 +162,176 @@ class ListingViewSet(viewsets.ModelViewSet):
 
         serializer.save(owner=self.request.user)
 
-    def get_queryset(self):
-        queryset = Listing.objects.filter(is_active=True)
+    def list(self, request, *args, **kwargs):
+        # История поиска пишется в фоне и только для списка, не для detail/view
+        q = request.query_params.get("q")
+        if q and request.user.is_authenticated:
+            search_log.put((request.user.pk, q))
+        return super().list(request, *args, **kwargs)
 
-        # Поиск по ключевым словам
-        q = self.request.query_params.get("q")
-        if q:
-            queryset = queryset.filter(
-                Q(title__icontains=q) | Q(description__icontains=q)
-            )
-            if self.request.user.is_authenticated:
-                SearchHistory.objects.create(user=self.request.user, query=q)
-
-        # Фильтрация
-        min_price = self.request.query_params.get("min_price")
-        max_price = self.request.query_params.get("max_price")
-        location = self.request.query_params.get("location")
-        rooms = self.request.query_params.get("rooms")
-        property_type = self.request.query_params.get("property_type")
-
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        if location:
-            queryset = queryset.filter(location__icontains=location)
-        if rooms:
-            queryset = queryset.filter(rooms=rooms)
-        if property_type:
-            queryset = queryset.filter(property_type=property_type)
-
-        # Сортировка
-        ordering = self.request.query_params.get("ordering")
-        if ordering == "price_asc":
-            queryset = queryset.order_by("price")
-        elif ordering == "price_desc":
-            queryset = queryset.order_by("-price")
-        elif ordering == "date":
-            queryset = queryset.order_by("-created_at")
-
-        return queryset
+    def get_queryset(self):
+        # Количество отзывов и средний рейтинг хранятся в самом объявлении
+        queryset = Listing.objects.filter(is_active=True).select_related("owner")
+        return filter_listings(queryset, self.request.query_params)
 
     @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
     def view(self, request, pk=None):
         listing = self.get_object()
-        listing.views_count += 1
-        listing.save()
-        ViewHistory.objects.create(user=request.user, listing=listing)
-        return Response({"status": "view recorded"})
+        view_counter.put((listing.pk, request.user.pk))
+        return buffered_write(Response({"status": "view recorded"}))
+
+    @action(detail=False, methods=["get"])
+    def recommended(self, request):
+        """Похожие на просмотренные и найденные пользователем объявления (?limit=, до 50)."""
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 50)
+        except ValueError:
+            raise ValidationError({"limit": "Ожидается целое число"})
+        listings = recommend(request.user, limit=limit)
+        return Response(self.get_serializer(listings, many=True).data)
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def bulk_import(self, request):
+        """Импорт объявлений из NDJSON или CSV (по Content-Type), тело читается потоком."""
+        format = MEDIA_TYPES.get(request.content_type.split(";")[0].strip())
+        if format is None:
+            raise UnsupportedMediaType(request.content_type)
+        report = import_listings(read_rows(request._request, format), owner=request.user)
+        return Response(report)
+
+    @action(detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Потоковая выгрузка своих объявлений: ?format=ndjson или ?format=csv."""
+        queryset = filter_listings(Listing.objects.filter(owner=request.user), request.query_params)
+        return streaming_response(
+            request.accepted_renderer, export_rows(queryset), EXPORT_FIELDS, filename="listings"
+        )
+
+    @action(detail=True, methods=["get"])
+    def availability(self, request, pk=None):
+        listing = self.get_object()
+        start_date, end_date = calendar_period(request.query_params)
+        free, occupied = occupancy_calendar(listing.pk, start_date, end_date)
+        return Response({
+            "listing": listing.pk,
+            "from": start_date,
+            "to": end_date,
+            "free": free,
+            "occupied": occupied,
+        })
+
+    @action(detail=True, methods=["get"])
+    def stats(self, request, pk=None):
+        """Статистика объявления по дням за ?from=&to= (по умолчанию последние 30 дней), только владельцу."""
+        # Владельцу нужна статистика и снятых с публикации объявлений, поэтому не get_queryset
+        listing = get_object_or_404(Listing.objects.only("id", "owner_id"), pk=pk)
+        self.check_object_permissions(request, listing)
+        start_date, end_date = stats_period(request.query_params)
+        return Response(listing_stats(listing.pk, start_date, end_date))
 
 
 # Бронирования
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(FastListMixin, viewsets.ModelViewSet):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         user = self.request.user
 
-        return Booking.objects.filter(Q(listing__owner=user) | Q(tenant=user))
+        # Подзапрос вместо JOIN: оба условия OR идут по индексам rente_booking.
+        # listing и tenant нужны проверкам доступа и сериализатору карточки
+        return Booking.objects.filter(
+            Q(listing__in=Listing.objects.filter(owner=user)) | Q(tenant=user)
+        ).select_related("listing", "tenant")
 
 
     def perform_create(self, serializer):
+        try:
+            save_booking(serializer, tenant=self.request.user)
+        except BookingConflict:
+            raise PermissionDenied("Жильё на текущую дату уже забронировано.")
 
-        listing = serializer.validated_data.get("listing")
-        start_date = serializer.validated_data.get("start_date")
-        end_date = serializer.validated_data.get("end_date")
-
-        booking = Booking.objects.filter(listing=listing, start_date__lte=end_date, end_date__gte=start_date)
-        if booking.exists():
+    def perform_update(self, serializer):
+        try:
+            save_booking(serializer)
+        except BookingConflict:
             raise PermissionDenied("Жильё на текущую дату уже забронировано.")
-        serializer.save(tenant=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_booking(instance)
 
     @action(detail=True, methods=["post"])
     def confirm(self, request, pk=None):
         booking = self.get_object()
-        if booking.listing.owner != request.user:
+        if booking.listing.owner_id != request.user.pk:
             return Response({"error": "Нет доступа"}, status=403)
-        booking.status = Booking.Status.CONFIRMED
-        booking.save()
+        try:
+            set_booking_status(booking, Booking.Status.CONFIRMED)
+        except BookingConflict:
+            raise PermissionDenied("Жильё на текущую дату уже забронировано.")
         return Response({"status": "confirmed"})
 
     @action(detail=True, methods=["post"])
     def cancel(self, request, pk=None):
         booking = self.get_object()
-        if booking.tenant != request.user and booking.listing.owner != request.user:
+        if booking.tenant_id != request.user.pk and booking.listing.owner_id != request.user.pk:
             return Response({"error": "Нет доступа"}, status=403)
-        print(now().date() > booking.start_date - timedelta(days=2))
         if ( now().date()) > booking.start_date - timedelta(days=2):
             return Response({'detail': 'Отмена возможна не позднее, чем за 2 дня до заезда.'},
                             status=status.HTTP_403_FORBIDDEN)
 
-        booking.status = Booking.Status.CANCELED
-        booking.save()
+        set_booking_status(booking, Booking.Status.CANCELED)
         return  Response({'detail': 'Бронирование успешно отменено.'}, status=status.HTTP_200_OK)
 
 
 
 
 # Отзывы
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ReplicaReadMixin, FastListMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
         return Review.objects.filter(listing_id=self.kwargs["listing_pk"])
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, listing_id=self.kwargs["listing_pk"])
+        review = serializer.save(author=self.request.user, listing_id=self.kwargs["listing_pk"])
+        apply_review_change(review.listing_id, 1, review.rating)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        old_rating = serializer.instance.rating
+        review = serializer.save()
+        apply_review_change(review.listing_id, 0, review.rating - old_rating)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        apply_review_change(instance.listing_id, -1, -instance.rating)
+        instance.delete()
 
 
 # История просмотров
-class ViewHistoryViewSet(viewsets.ReadOnlyModelViewSet):
+class ViewHistoryViewSet(ReplicaReadMixin, StreamingExportMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ViewHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-viewed_at", "-id")
+    export_fields = ("id", "user", "listing", "viewed_at")
 
     def get_queryset(self):
         return ViewHistory.objects.filter(user=self.request.user)
 
 
 # История поиска
-class SearchHistoryViewSet(viewsets.ReadOnlyModelViewSet):
+class SearchHistoryViewSet(ReplicaReadMixin, StreamingExportMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = SearchHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-searched_at", "-id")
+    export_fields = ("id", "user", "query", "searched_at")
 
     def get_queryset(self):
         return SearchHistory.objects.filter(user=self.request.user)
\ No newline at end of file